@@ -1,3 +1,4 @@
+import json
 import os
 from dotenv import load_dotenv
 
@@ -30,4 +31,91 @@ PINECONE_INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
 # Langfuse Configuration
 LANGFUSE_SECRET_KEY=os.getenv("LANGFUSE_SECRET_KEY")
 LANGFUSE_PUBLIC_KEY=os.getenv("LANGFUSE_PUBLIC_KEY")
-LANGFUSE_BASE_URL=os.getenv("LANGFUSE_BASE_URL")
\ No newline at end of file
+LANGFUSE_BASE_URL=os.getenv("LANGFUSE_BASE_URL")
+
+# Analysis Cache Configuration
+ANALYSIS_CACHE_TTL_SECONDS = int(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", 7 * 24 * 3600))
+ANALYSIS_CACHE_MAX_ENTRIES = int(os.getenv("ANALYSIS_CACHE_MAX_ENTRIES", 5000))
+
+# Dashboard Generation: "parallel" (one focused LLM call per section, run
+# concurrently) or "single" (one call for all sections)
+DASHBOARD_GENERATION_MODE = os.getenv("DASHBOARD_GENERATION_MODE", "parallel")
+
+# Chat Context: recent turns sent verbatim (count and token budget); older
+# turns are folded into a rolling summary in the background
+CHAT_CONTEXT_MAX_TURNS = int(os.getenv("CHAT_CONTEXT_MAX_TURNS", 6))
+CHAT_CONTEXT_TOKEN_BUDGET = int(os.getenv("CHAT_CONTEXT_TOKEN_BUDGET", 3000))
+CHAT_SUMMARY_MODEL = os.getenv("CHAT_SUMMARY_MODEL", "gpt-4o-mini")
+CHAT_SUMMARY_BATCH_TURNS = int(os.getenv("CHAT_SUMMARY_BATCH_TURNS", 20))
+
+# Chat Retrieval: report text is split into chunks at upload; each question
+# pulls the top-k most similar chunks into the prompt
+RAG_ENABLED = os.getenv("RAG_ENABLED", "true").lower() == "true"
+RAG_TOP_K = int(os.getenv("RAG_TOP_K", 4))
+RAG_CHUNK_SIZE = int(os.getenv("RAG_CHUNK_SIZE", 800))
+RAG_CHUNK_OVERLAP = int(os.getenv("RAG_CHUNK_OVERLAP", 100))
+RAG_LOCAL_INDEX_MAX_REPORTS = int(os.getenv("RAG_LOCAL_INDEX_MAX_REPORTS", 256))
+
+# Chat Answer Cache (opt-in): reuse a previous answer for a near-identical
+# question about the same report
+CHAT_ANSWER_CACHE_ENABLED = os.getenv("CHAT_ANSWER_CACHE_ENABLED", "false").lower() == "true"
+CHAT_ANSWER_CACHE_THRESHOLD = float(os.getenv("CHAT_ANSWER_CACHE_THRESHOLD", 0.95))
+CHAT_ANSWER_CACHE_MAX_PER_REPORT = int(os.getenv("CHAT_ANSWER_CACHE_MAX_PER_REPORT", 50))
+CHAT_ANSWER_CACHE_MAX_REPORTS = int(os.getenv("CHAT_ANSWER_CACHE_MAX_REPORTS", 512))
+
+# Suggested Questions: answered in one batched call after analysis
+CHAT_FAQ_ENABLED = os.getenv("CHAT_FAQ_ENABLED", "true").lower() == "true"
+CHAT_FAQ_COUNT = int(os.getenv("CHAT_FAQ_COUNT", 5))
+
+# Dashboard Read Cache (serialized responses kept in process memory)
+DASHBOARD_RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("DASHBOARD_RESPONSE_CACHE_MAX_ENTRIES", 512))
+
+# Client Disconnects: how often long LLM-backed requests check the connection,
+# and whether analysis / dashboard creation finish in the background (and are
+# stored) when the client leaves. Chat answers are always cancelled.
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", 0.5))
+ANALYSIS_DETACH_ON_DISCONNECT = os.getenv("ANALYSIS_DETACH_ON_DISCONNECT", "true").lower() == "true"
+DASHBOARD_DETACH_ON_DISCONNECT = os.getenv("DASHBOARD_DETACH_ON_DISCONNECT", "true").lower() == "true"
+
+# Chat Model Routing: simple or definitional questions go to the fast model,
+# everything else to the default one. Per report type (lower-cased name) the
+# routing can be fixed: {"blood report": "default"}; modes are "auto" (the
+# classifier decides), "fast" and "default".
+CHAT_ROUTING_ENABLED = os.getenv("CHAT_ROUTING_ENABLED", "true").lower() == "true"
+CHAT_DEFAULT_MODEL = os.getenv("CHAT_DEFAULT_MODEL", "gpt-4o")
+CHAT_FAST_MODEL = os.getenv("CHAT_FAST_MODEL", "gpt-4o-mini")
+CHAT_ROUTING_BY_REPORT_TYPE = json.loads(os.getenv("CHAT_ROUTING_BY_REPORT_TYPE", "{}"))
+
+# Prompt Token Budgets: prompts are measured locally and trimmed by priority
+# to these sizes (further capped by the model's context window)
+CHAT_PROMPT_TOKEN_BUDGET = int(os.getenv("CHAT_PROMPT_TOKEN_BUDGET", 16000))
+ANALYSIS_PROMPT_TOKEN_BUDGET = int(os.getenv("ANALYSIS_PROMPT_TOKEN_BUDGET", 60000))
+DASHBOARD_PROMPT_TOKEN_BUDGET = int(os.getenv("DASHBOARD_PROMPT_TOKEN_BUDGET", 16000))
+
+# Vector Cleanup Outbox: Pinecone namespaces of deleted reports are removed
+# by a background worker (poll interval and retry backoff in seconds)
+VECTOR_CLEANUP_POLL_INTERVAL = float(os.getenv("VECTOR_CLEANUP_POLL_INTERVAL", 30))
+VECTOR_CLEANUP_BATCH_SIZE = int(os.getenv("VECTOR_CLEANUP_BATCH_SIZE", 20))
+VECTOR_CLEANUP_MAX_BACKOFF = int(os.getenv("VECTOR_CLEANUP_MAX_BACKOFF", 3600))
+
+# Bulk Report Operations: at most this many reports per request; queued
+# re-analyses run this many at a time
+BULK_REPORT_MAX_ITEMS = int(os.getenv("BULK_REPORT_MAX_ITEMS", 100))
+BULK_REANALYZE_CONCURRENCY = int(os.getenv("BULK_REANALYZE_CONCURRENCY", 3))
+
+# Password Hashing (Argon2id): costs are picked per deployment with
+# `python -m src.auth.hash_bench`; stored hashes are upgraded on login when
+# they change. Hashing runs in a pool of PASSWORD_HASH_WORKERS threads.
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", 3))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", 65536))  # KiB
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", 4))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+
+# Principal Cache: authenticated users (user_id, user_email) kept per worker
+# for get_current_user; invalidations reach other workers via Postgres NOTIFY
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", 60))
+PRINCIPAL_CACHE_MAX_ENTRIES = int(os.getenv("PRINCIPAL_CACHE_MAX_ENTRIES", 10000))
+
+# Metrics Endpoint: /metrics requires "Authorization: Bearer <METRICS_TOKEN>";
+# it is disabled (404) when no token is configured
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
@@ -6,3 +6,6 @@ from .report_type import ReportType
 from .dashboard import Dashboard
 from .chat import Chat
 from .message import Message
+from .llm_cache import LLMCache
+from .biomarker_observation import BiomarkerObservation
+from .vector_cleanup import VectorCleanup
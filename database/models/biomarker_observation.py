@@ -0,0 +1,48 @@
+"""
+Defines the BiomarkerObservation model for a PostgreSQL database using SQLAlchemy ORM.
+
+- One row per biomarker value measured in a report (normalized out of Dashboard.middle_section).
+- Linked to the User and the Report the value came from.
+- Stores canonical marker code, value, unit, status and the observation timestamp.
+- Composite index on (user_id, marker_code, observed_at) serves trend queries with one range scan.
+"""
+
+from sqlalchemy import String, Float, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+from datetime import datetime, timezone
+import uuid
+from database.base import Base
+
+
+class BiomarkerObservation(Base):
+    __tablename__ = "biomarker_observation"
+    __table_args__ = (
+        Index("ix_biomarker_observation_user_marker_observed", "user_id", "marker_code", "observed_at"),
+    )
+
+    # Primary key UUID
+    observation_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # Foreign keys
+    user_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.user_id"), nullable=False)
+    report_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("report.report_id"), nullable=False, index=True
+    )
+
+    # Observation details
+    marker_code: Mapped[str] = mapped_column(String(64), nullable=False)
+    marker_name: Mapped[str] = mapped_column(String, nullable=False)
+    value: Mapped[float] = mapped_column(Float, nullable=False)
+    unit: Mapped[str] = mapped_column(String, nullable=True)
+    status: Mapped[str] = mapped_column(String, nullable=True)
+
+    # Timestamps
+    observed_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+
+    # Relationships
+    user = relationship("User")
+    report = relationship("Report")
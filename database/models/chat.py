@@ -3,19 +3,29 @@ Defines the Chat model for a PostgreSQL database using SQLAlchemy ORM.
 
 - Each chat has a unique UUID as primary key.
 - Stores chat name, context, timestamps, creator, and optional linked report.
+- Keeps a rolling summary of the turns that fell out of the prompt window.
+- Denormalizes last_message_at / message_count for the activity-ordered chat list.
 - Linked to User (creator), Report, and contains multiple Messages (one-to-many).
 """
 
-from sqlalchemy import String, DateTime, ForeignKey, JSON,Boolean
+from sqlalchemy import String, DateTime, ForeignKey, JSON,Boolean,Text,Integer,Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone
 import uuid
 from database.base import Base
-from sqlalchemy.sql import func
+from sqlalchemy.sql import func, text
 
 class Chat(Base):
     __tablename__ = "chat"
+    __table_args__ = (
+        # Recent chats by activity: keyset scan that also covers the listed columns
+        Index(
+            "ix_chat_created_by_last_message",
+            "created_by", text("last_message_at DESC"), text("chat_id DESC"),
+            postgresql_include=["chat_name", "is_valid_chat", "message_count"],
+        ),
+    )
 
     # Primary key UUID
     chat_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -26,13 +36,24 @@ class Chat(Base):
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True),server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), 
-        default=datetime.now(timezone.utc), 
-        onupdate=datetime.now(timezone.utc)
+        default=lambda: datetime.now(timezone.utc),
+        onupdate=lambda: datetime.now(timezone.utc)
+    )
+
+    # Activity, maintained when a message is stored (a new chat counts as active at creation)
+    last_message_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True),
+        default=lambda: datetime.now(timezone.utc)
     )
+    message_count: Mapped[int] = mapped_column(Integer, default=0, server_default="0")
+
+    # Rolling summary of older turns and the created_at of the last turn folded into it
+    summary: Mapped[str] = mapped_column(Text, nullable=True)
+    summarized_until: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=True)
 
     # Foreign keys
     created_by: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("user.user_id"))
-    file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("report.report_id"), nullable=True)
+    file_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("report.report_id"), nullable=True, index=True)
 
     # Relationships
     user = relationship("User", back_populates="chats")  # Chat creator
@@ -0,0 +1,37 @@
+"""
+Defines the LLMCache model for a PostgreSQL database using SQLAlchemy ORM.
+
+- Each entry is keyed by a SHA-256 hash of the LLM inputs (messages, model, params, prompt version).
+- Stores the parsed LLM result as JSON together with its report type and prompt version.
+- Tracks creation, expiry and last access timestamps for TTL and size-based eviction.
+"""
+
+from sqlalchemy import String, DateTime, Integer, JSON
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime, timezone
+from database.base import Base
+
+
+class LLMCache(Base):
+    __tablename__ = "llm_cache"
+
+    # Primary key: hash of all inputs
+    cache_key: Mapped[str] = mapped_column(String(64), primary_key=True)
+
+    # What produced the entry
+    report_type: Mapped[str] = mapped_column(String, nullable=False, index=True)
+    prompt_version: Mapped[str] = mapped_column(String, nullable=False)
+    model: Mapped[str] = mapped_column(String, nullable=False)
+
+    # Cached result
+    response: Mapped[dict] = mapped_column(JSON, nullable=False)
+    hit_count: Mapped[int] = mapped_column(Integer, default=0)
+
+    # Timestamps
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
+    expires_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False, index=True)
+    last_accessed_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True
+    )
@@ -6,7 +6,7 @@ Defines the Message model for a PostgreSQL database using SQLAlchemy ORM.
 - Stores user query, bot response, metadata, and creation timestamp.
 """
 
-from sqlalchemy import ForeignKey, DateTime, Text, JSON, String,Boolean
+from sqlalchemy import ForeignKey, DateTime, Text, JSON, String,Boolean,Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from datetime import datetime, timezone
@@ -15,6 +15,10 @@ from database.base import Base
 
 class Message(Base):
     __tablename__ = "message"
+    __table_args__ = (
+        # Keyset pagination / recent-window lookups per chat
+        Index("ix_message_chat_created_id", "chat_id", "created_at", "message_id"),
+    )
 
     # Primary key UUID
     message_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -29,7 +33,7 @@ class Message(Base):
     metadatas: Mapped[dict] = mapped_column(JSON)  # optional metadata
     is_valid: Mapped[bool] = mapped_column(Boolean, default=True)
     # Timestamp
-    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=datetime.now(timezone.utc))
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
 
     # Relationship to Chat
     chat = relationship("Chat", back_populates="messages")  # Each message belongs to a chat
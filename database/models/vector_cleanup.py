@@ -0,0 +1,35 @@
+"""
+Defines the VectorCleanup model (outbox) for a PostgreSQL database using SQLAlchemy ORM.
+
+- One row per Pinecone namespace that must be deleted (e.g. of a deleted report).
+- Written in the same transaction as the deletion; drained by a background worker.
+- Tracks attempts, the last error and when the next attempt is due.
+"""
+
+from sqlalchemy import String, DateTime, Integer, Text
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, mapped_column
+from datetime import datetime, timezone
+import uuid
+from database.base import Base
+
+
+class VectorCleanup(Base):
+    __tablename__ = "vector_cleanup"
+
+    cleanup_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+
+    # What to delete; report_id is informational (the report row is gone)
+    namespace: Mapped[str] = mapped_column(String, nullable=False)
+    report_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=True)
+
+    # Retry state
+    attempts: Mapped[int] = mapped_column(Integer, default=0)
+    last_error: Mapped[str] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc), index=True
+    )
+
+    created_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), default=lambda: datetime.now(timezone.utc)
+    )
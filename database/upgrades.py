@@ -0,0 +1,76 @@
+"""
+Schema upgrades applied at startup, after create_all.
+
+create_all only creates missing tables; columns and indexes added to existing
+tables are listed here so databases created by an older version catch up.
+Upgrades run in list order, each at most once: applied names are recorded in
+the schema_upgrade table. Startup holds SCHEMA_LOCK_KEY as a transaction-level
+advisory lock around create_all and the upgrades, so workers starting at the
+same time run them one after another instead of racing on the same DDL.
+Statements stay idempotent (IF [NOT] EXISTS) because databases that ran them
+before the table existed run them once more. Upgrades are forward-only; undo
+one by appending a new upgrade.
+"""
+
+from sqlalchemy import text
+
+# Arbitrary application-wide advisory lock key for schema changes
+SCHEMA_LOCK_KEY = 4_711_202_501
+
+# (name, statements); append only, never reorder or rename
+SCHEMA_UPGRADES = [
+    # Rolling chat summary (src/chat/context.py)
+    ("0001_chat_summary", [
+        "ALTER TABLE chat ADD COLUMN IF NOT EXISTS summary TEXT",
+        "ALTER TABLE chat ADD COLUMN IF NOT EXISTS summarized_until TIMESTAMP WITH TIME ZONE",
+    ]),
+    # Keyset pagination of chat history and recent chats
+    ("0002_message_keyset_index", [
+        "CREATE INDEX IF NOT EXISTS ix_message_chat_created_id ON message (chat_id, created_at, message_id)",
+    ]),
+    # Activity-ordered recent chats; replaces the created_at index
+    ("0003_chat_activity", [
+        "ALTER TABLE chat ADD COLUMN IF NOT EXISTS last_message_at TIMESTAMP WITH TIME ZONE",
+        "ALTER TABLE chat ADD COLUMN IF NOT EXISTS message_count INTEGER NOT NULL DEFAULT 0",
+        """
+        UPDATE chat SET
+            last_message_at = COALESCE(
+                (SELECT max(message.created_at) FROM message WHERE message.chat_id = chat.chat_id),
+                chat.created_at
+            ),
+            message_count = (SELECT count(*) FROM message WHERE message.chat_id = chat.chat_id)
+        WHERE chat.last_message_at IS NULL
+        """,
+        "DROP INDEX IF EXISTS ix_chat_created_by_created_id",
+        """
+        CREATE INDEX IF NOT EXISTS ix_chat_created_by_last_message
+        ON chat (created_by, last_message_at DESC, chat_id DESC)
+        INCLUDE (chat_name, is_valid_chat, message_count)
+        """,
+    ]),
+    # Set-based soft delete of a report's chats
+    ("0004_chat_file_id_index", [
+        "CREATE INDEX IF NOT EXISTS ix_chat_file_id ON chat (file_id)",
+    ]),
+]
+
+
+async def lock_schema(conn):
+    """Serialize schema changes across workers until conn's transaction ends."""
+    await conn.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": SCHEMA_LOCK_KEY})
+
+
+async def apply_schema_upgrades(conn):
+    """Run the upgrades not yet recorded; call with the schema lock held."""
+    await conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS schema_upgrade ("
+        "name VARCHAR PRIMARY KEY, applied_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now())"
+    ))
+    applied = set((await conn.execute(text("SELECT name FROM schema_upgrade"))).scalars())
+
+    for name, statements in SCHEMA_UPGRADES:
+        if name in applied:
+            continue
+        for statement in statements:
+            await conn.execute(text(statement))
+        await conn.execute(text("INSERT INTO schema_upgrade (name) VALUES (:name)"), {"name": name})
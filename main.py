@@ -1,9 +1,12 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Header, HTTPException
 from starlette.middleware.sessions import SessionMiddleware
 from fastapi.middleware.cors import CORSMiddleware
 from database.settings import engine
 from database.models import *
+import asyncio
+import secrets
 import config
+import metrics
 from slowapi import Limiter
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
@@ -69,12 +72,46 @@ async def root():
 async def health_check():
     return {"status":"Healthy","version":"1.0.0"}
 
+@app.get("/metrics", include_in_schema=False)
+async def metrics_snapshot(authorization: str = Header(None)):
+    # Internal counters (LLM usage and cost, cache stats) are for operators only
+    if not config.METRICS_TOKEN:
+        raise HTTPException(404, "Not Found")
+    if not secrets.compare_digest(authorization or "", f"Bearer {config.METRICS_TOKEN}"):
+        raise HTTPException(401, "Invalid metrics token")
+    return metrics.snapshot()
+
 @app.on_event("startup")
 async def startup_event():
     # Async Table creation
     from database.base import Base
+    from database.upgrades import lock_schema, apply_schema_upgrades
     from sqlalchemy.ext.asyncio import AsyncEngine
 
     if isinstance(engine,AsyncEngine):
         async with engine.begin() as conn:
-            await conn.run_sync(Base.metadata.create_all)
\ No newline at end of file
+            # One worker at a time creates tables and applies upgrades
+            await lock_schema(conn)
+            await conn.run_sync(Base.metadata.create_all)
+            await apply_schema_upgrades(conn)
+
+    # Tokenizers used for prompt budgets; loading may download the BPE file
+    from src.llm.serializer import load_encodings, DEFAULT_TOKENIZER_MODEL
+    await load_encodings([
+        DEFAULT_TOKENIZER_MODEL, config.CHAT_DEFAULT_MODEL, config.CHAT_FAST_MODEL, config.CHAT_SUMMARY_MODEL,
+    ])
+
+    # Drains the vector_cleanup outbox (Pinecone namespaces of deleted reports)
+    from src.home.cleanup import vector_cleanup_worker
+    app.state.vector_cleanup_task = asyncio.create_task(vector_cleanup_worker())
+
+    # Drops cached principals when another worker invalidates them
+    from src.auth.cache import principal_invalidation_listener
+    app.state.principal_listener_task = asyncio.create_task(principal_invalidation_listener())
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    for name in ("vector_cleanup_task", "principal_listener_task"):
+        task = getattr(app.state, name, None)
+        if task:
+            task.cancel()
\ No newline at end of file
@@ -0,0 +1,39 @@
+"""
+In-process metrics registry.
+
+- Counters for discrete events (cache hits/misses, evictions, ...).
+- Timings (count / total / max) for latencies such as LLM round trips.
+- Exposed as a snapshot through the /metrics endpoint in main.py.
+"""
+
+from collections import defaultdict
+from threading import Lock
+
+_lock = Lock()
+_counters = defaultdict(int)
+_timings = defaultdict(lambda: {"count": 0, "total": 0.0, "max": 0.0})
+
+
+def incr(name: str, value: int = 1):
+    """Increment a counter by value."""
+    with _lock:
+        _counters[name] += value
+
+
+def observe(name: str, value: float):
+    """Record a single observation (e.g. a latency in seconds)."""
+    with _lock:
+        timing = _timings[name]
+        timing["count"] += 1
+        timing["total"] += value
+        timing["max"] = max(timing["max"], value)
+
+
+def snapshot() -> dict:
+    """Return a copy of all counters and timings (with averages)."""
+    with _lock:
+        timings = {
+            name: {**t, "avg": (t["total"] / t["count"]) if t["count"] else 0.0}
+            for name, t in _timings.items()
+        }
+        return {"counters": dict(_counters), "timings": timings}
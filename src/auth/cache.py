@@ -0,0 +1,116 @@
+"""
+In-process cache of authenticated principals.
+
+get_current_user only needs to know that the session's user still exists
+(and its id / email), so the result is kept in a bounded LRU for
+PRINCIPAL_CACHE_TTL seconds instead of selecting the user row on every
+request. Code that changes or deletes an account calls invalidate_principal()
+after committing: the entry is dropped here and, through Postgres NOTIFY, in
+every other worker process. The TTL bounds staleness if a notification is
+ever missed.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict, namedtuple
+from threading import Lock
+from uuid import UUID
+from sqlalchemy import text
+from database.settings import engine
+import config
+import metrics
+
+# What endpoints get as current_user
+Principal = namedtuple("Principal", ["user_id", "user_email"])
+
+INVALIDATION_CHANNEL = "principal_invalidated"
+
+_lock = Lock()
+_entries = OrderedDict()
+
+
+def get_cached_principal(user_id: UUID):
+    with _lock:
+        entry = _entries.get(user_id)
+        if entry is None or entry[0] < time.monotonic():
+            _entries.pop(user_id, None)
+            metrics.incr("principal_cache.miss")
+            return None
+        _entries.move_to_end(user_id)
+    metrics.incr("principal_cache.hit")
+    return entry[1]
+
+
+def store_principal(principal: Principal):
+    with _lock:
+        _entries[principal.user_id] = (time.monotonic() + config.PRINCIPAL_CACHE_TTL, principal)
+        _entries.move_to_end(principal.user_id)
+        while len(_entries) > config.PRINCIPAL_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+
+
+def drop_principal(user_id: UUID):
+    with _lock:
+        _entries.pop(user_id, None)
+
+
+def clear_principals():
+    with _lock:
+        _entries.clear()
+
+
+async def publish_invalidation(user_id: UUID):
+    async with engine.begin() as conn:
+        await conn.execute(
+            text("SELECT pg_notify(:channel, :user_id)"),
+            {"channel": INVALIDATION_CHANNEL, "user_id": str(user_id)},
+        )
+
+
+async def invalidate_principal(user_id: UUID):
+    """
+    Call after committing a change to (or the deletion of) an account. The
+    local entry is dropped right away, other workers' entries when they
+    receive the notification.
+    """
+    drop_principal(user_id)
+    metrics.incr("principal_cache.invalidated")
+    try:
+        await publish_invalidation(user_id)
+    except Exception as e:
+        # Other workers fall back to the TTL
+        print(f"[WARN] Failed to publish principal invalidation: {str(e)}")
+
+
+def on_invalidation(connection, pid, channel, payload):
+    try:
+        drop_principal(UUID(payload))
+    except ValueError:
+        print(f"[WARN] Ignoring malformed principal invalidation: {payload}")
+
+
+async def principal_invalidation_listener():
+    """
+    Started at app startup; LISTENs on a dedicated connection until
+    cancelled. Entries are cleared whenever the connection is (re)established,
+    since notifications sent while disconnected are lost.
+    """
+    while True:
+        try:
+            async with engine.connect() as conn:
+                raw = await conn.get_raw_connection()
+                listener = raw.driver_connection
+                await listener.add_listener(INVALIDATION_CHANNEL, on_invalidation)
+                clear_principals()
+                try:
+                    while not listener.is_closed():
+                        await asyncio.sleep(5)
+                finally:
+                    if not listener.is_closed():
+                        await listener.remove_listener(INVALIDATION_CHANNEL, on_invalidation)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"[WARN] Principal invalidation listener failed: {str(e)}")
+        clear_principals()
+        await asyncio.sleep(5)
@@ -1,23 +1,47 @@
-from fastapi import Request,HTTPException,status,Depends
-from sqlalchemy.ext.asyncio import AsyncSession
+from uuid import UUID
+from fastapi import Request,HTTPException,status
 from sqlalchemy.future import select
 from database.models import user
-from database.gets import get_db
+from database.settings import AsyncSessionLocal
+from .cache import Principal, get_cached_principal, store_principal
 
-async def get_current_user(request:Request,db:AsyncSession=Depends(get_db)):
+async def get_current_user(request:Request) -> Principal:
+    """
+    The authenticated user as a lightweight Principal (user_id, user_email),
+    served from the principal cache. A session is opened (and the user row
+    selected) only on a miss.
+    """
     user_id = request.session.get("user_id")
     if not user_id:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='Not Authenticated'
         )
-    result = await db.execute(select(user.User).where(user.User.user_id==user_id))
-    db_user = result.scalars().one_or_none()
 
-    if not db_user:
+    try:
+        user_id = UUID(user_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail='Not Authenticated'
+        )
+
+    principal = get_cached_principal(user_id)
+    if principal:
+        return principal
+
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            select(user.User.user_id, user.User.user_email).where(user.User.user_id==user_id)
+        )
+        row = result.one_or_none()
+
+    if not row:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail='User Not Found'
         )
 
-    return db_user
\ No newline at end of file
+    principal = Principal(row.user_id, row.user_email)
+    store_principal(principal)
+    return principal
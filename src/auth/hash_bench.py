@@ -0,0 +1,78 @@
+"""
+Pick Argon2 costs for a target verify latency on this machine.
+
+Usage:
+    python -m src.auth.hash_bench [--target-ms 250] [--max-memory-mib 256] [--parallelism 4] [--runs 5]
+
+For each memory cost (doubling from 19 MiB up to --max-memory-mib) finds the
+largest time cost whose median verify time stays within the target, then
+recommends the combination with the most memory (memory hardness is what
+makes GPU cracking expensive). Prints the ARGON2_* settings to use. Run it
+on the production hardware; login latency also includes queueing for one of
+the PASSWORD_HASH_WORKERS threads.
+"""
+
+import argparse
+import statistics
+import time
+from passlib.context import CryptContext
+
+MIN_MEMORY_KIB = 19 * 1024
+MAX_TIME_COST = 10
+PASSWORD = "correct horse battery staple"
+
+
+def median_verify_ms(time_cost: int, memory_kib: int, parallelism: int, runs: int) -> float:
+    context = CryptContext(
+        schemes=["argon2"],
+        argon2__rounds=time_cost,
+        argon2__memory_cost=memory_kib,
+        argon2__parallelism=parallelism,
+    )
+    hashed = context.hash(PASSWORD)
+    timings = []
+    for _ in range(runs):
+        started_at = time.perf_counter()
+        context.verify(PASSWORD, hashed)
+        timings.append((time.perf_counter() - started_at) * 1000)
+    return statistics.median(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target-ms", type=float, default=250)
+    parser.add_argument("--max-memory-mib", type=int, default=256)
+    parser.add_argument("--parallelism", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'memory':>10} {'time':>5} {'verify':>10}")
+    best = None
+    memory_kib = MIN_MEMORY_KIB
+    while memory_kib <= args.max_memory_mib * 1024:
+        fitting = None
+        for time_cost in range(1, MAX_TIME_COST + 1):
+            elapsed = median_verify_ms(time_cost, memory_kib, args.parallelism, args.runs)
+            print(f"{memory_kib // 1024:>7}MiB {time_cost:>5} {elapsed:>8.1f}ms")
+            if elapsed > args.target_ms:
+                break
+            fitting = (time_cost, memory_kib, elapsed)
+
+        if fitting is None:
+            # Even one pass is too slow at this memory; more memory won't help
+            break
+        best = fitting
+        memory_kib *= 2
+
+    if best is None:
+        raise SystemExit(f"No setting verifies within {args.target_ms}ms; raise --target-ms")
+
+    time_cost, memory_kib, elapsed = best
+    print(f"\nRecommended (median verify {elapsed:.1f}ms):")
+    print(f"ARGON2_TIME_COST={time_cost}")
+    print(f"ARGON2_MEMORY_COST={memory_kib}")
+    print(f"ARGON2_PARALLELISM={args.parallelism}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,7 +3,8 @@ from fastapi import Request,HTTPException,status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.exc import SQLAlchemyError
-from .utils import verify_password,hash_password
+from .utils import verify_and_rehash,hash_password
+from .cache import invalidate_principal
 from database.models import user
 from database.models.profile_info import UserProfile
 from database.models.health_info import HealthInfo
@@ -14,12 +15,24 @@ async def login_user(request: Request, email: str, password: str, db: AsyncSessi
         result = await db.execute(select(user.User).where(user.User.user_email == email))
         db_user = result.scalars().one_or_none()
 
-        if not db_user or not verify_password(password, db_user.hashed_password):
+        if not db_user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
 
+        valid, new_hash = await verify_and_rehash(password, db_user.hashed_password)
+        if not valid:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
+
+        # Hash parameters changed since this password was stored: upgrade it
+        if new_hash:
+            db_user.hashed_password = new_hash
+            await db.commit()
+            await invalidate_principal(db_user.user_id)
+
         request.session["user_id"] = str(db_user.user_id)
         return {"message": "Login Successful"}
 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=status.HTTP_500_INTERNAL_SERVER_ERROR, detail=str(e))
     
@@ -34,7 +47,7 @@ async def register_user(user_email: str, password: str, db: AsyncSession):
                 detail="Email already registered"
             )
 
-        hashed_password = hash_password(password)
+        hashed_password = await hash_password(password)
 
         new_user = user.User(
             user_email=user_email,
@@ -1,16 +1,37 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
 from passlib.context import CryptContext
 from passlib.exc import UnknownHashError
+import config
+import metrics
 
-# Use Argon2 for modern, secure password hashing
-pwd_cxt = CryptContext(schemes=["argon2"], deprecated="auto")
+# Use Argon2 for modern, secure password hashing. The costs are explicit so
+# that needs_update() flags hashes made with other parameters.
+pwd_cxt = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=config.ARGON2_TIME_COST,
+    argon2__memory_cost=config.ARGON2_MEMORY_COST,
+    argon2__parallelism=config.ARGON2_PARALLELISM,
+)
 
-def hash_password(password: str) -> str:
+# Argon2 is CPU- and memory-heavy by design and releases the GIL, so it runs
+# in a small dedicated pool: the event loop stays free, and at most
+# PASSWORD_HASH_WORKERS hashes (each ARGON2_MEMORY_COST KiB) run at once.
+# Further requests queue for a worker.
+hash_executor = ThreadPoolExecutor(
+    max_workers=config.PASSWORD_HASH_WORKERS,
+    thread_name_prefix="password-hash",
+)
+
+def hash_password_sync(password: str) -> str:
     """
     Hash a plain text password using Argon2.
     """
     return pwd_cxt.hash(password)
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def verify_password_sync(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain text password against its hashed version.
     """
@@ -19,3 +40,33 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     except UnknownHashError:
         return False
 
+async def run_in_hash_pool(operation: str, func, *args):
+    queued_at = time.perf_counter()
+
+    def timed():
+        started_at = time.perf_counter()
+        metrics.observe(f"auth.{operation}.wait", started_at - queued_at)
+        try:
+            return func(*args)
+        finally:
+            metrics.observe(f"auth.{operation}.latency", time.perf_counter() - started_at)
+
+    return await asyncio.get_running_loop().run_in_executor(hash_executor, timed)
+
+async def hash_password(password: str) -> str:
+    return await run_in_hash_pool("hash", hash_password_sync, password)
+
+async def verify_password(plain_password: str, hashed_password: str) -> bool:
+    return await run_in_hash_pool("verify", verify_password_sync, plain_password, hashed_password)
+
+async def verify_and_rehash(plain_password: str, hashed_password: str):
+    """
+    Verify a password. Returns (valid, new_hash); new_hash is set when the
+    stored hash was made with outdated parameters and should be replaced.
+    """
+    if not await verify_password(plain_password, hashed_password):
+        return False, None
+    if pwd_cxt.needs_update(hashed_password):
+        metrics.incr("auth.rehash")
+        return True, await hash_password(plain_password)
+    return True, None
@@ -0,0 +1,92 @@
+"""
+Opt-in semantic answer cache, scoped to a report.
+
+Each report keeps a small in-memory index of (question embedding, answer).
+A new question whose cosine similarity to a stored one reaches
+CHAT_ANSWER_CACHE_THRESHOLD gets the stored answer without an LLM call.
+Entries are LRU-evicted per report (CHAT_ANSWER_CACHE_MAX_PER_REPORT) and
+whole reports are LRU-evicted (CHAT_ANSWER_CACHE_MAX_REPORTS). Each worker
+process keeps its own cache. Every entry records the analyzed_at of the
+analysis it was answered from; lookups pass the report's current analyzed_at
+and drop entries of an older analysis, so a re-analysis handled by another
+worker invalidates them too. Deleting or re-analyzing a report also drops its
+entries in the handling worker right away.
+"""
+
+from collections import OrderedDict
+from threading import Lock
+from uuid import UUID
+import numpy as np
+import config
+import metrics
+
+_lock = Lock()
+# report_id -> OrderedDict(question -> (embedding, answer, analyzed_at)), least recently used first
+_reports = OrderedDict()
+
+
+def answer_cache_enabled(data) -> bool:
+    """The cache is used only when enabled in config and requested by the client."""
+    return config.CHAT_ANSWER_CACHE_ENABLED and bool(getattr(data, "use_answer_cache", False))
+
+
+def lookup_answer(report_id: UUID, analyzed_at: str, query_embedding: np.ndarray):
+    """(answer, similarity) of the closest stored question above the threshold, or None."""
+    with _lock:
+        entries = _reports.get(report_id)
+        stale = [q for q, entry in (entries or {}).items() if entry[2] != analyzed_at]
+        for question in stale:
+            del entries[question]
+        if stale:
+            metrics.incr("chat.answer_cache.invalidated", len(stale))
+
+        if not entries:
+            _reports.pop(report_id, None)
+            metrics.incr("chat.answer_cache.miss")
+            return None
+
+        questions = list(entries.keys())
+        embeddings = np.stack([entries[q][0] for q in questions])
+        scores = embeddings @ query_embedding
+        best = int(np.argmax(scores))
+        similarity = float(scores[best])
+
+        if similarity < config.CHAT_ANSWER_CACHE_THRESHOLD:
+            metrics.incr("chat.answer_cache.miss")
+            return None
+
+        entries.move_to_end(questions[best])
+        _reports.move_to_end(report_id)
+        answer = entries[questions[best]][1]
+
+    metrics.incr("chat.answer_cache.hit")
+    metrics.observe("chat.answer_cache.similarity", similarity)
+    return answer, similarity
+
+
+def store_answer(report_id: UUID, analyzed_at: str, question: str, query_embedding: np.ndarray, answer: str):
+    key = question.strip().lower()
+    if not key or not answer:
+        return
+
+    with _lock:
+        entries = _reports.setdefault(report_id, OrderedDict())
+        entries[key] = (query_embedding, answer, analyzed_at)
+        entries.move_to_end(key)
+        _reports.move_to_end(report_id)
+
+        while len(entries) > config.CHAT_ANSWER_CACHE_MAX_PER_REPORT:
+            entries.popitem(last=False)
+            metrics.incr("chat.answer_cache.evicted")
+
+        while len(_reports) > config.CHAT_ANSWER_CACHE_MAX_REPORTS:
+            _, dropped = _reports.popitem(last=False)
+            metrics.incr("chat.answer_cache.evicted", len(dropped))
+
+
+def invalidate_report_answers(report_id: UUID):
+    """Drop every cached answer of a report (its analysis or text changed)."""
+    with _lock:
+        dropped = _reports.pop(report_id, None)
+    if dropped:
+        metrics.incr("chat.answer_cache.invalidated", len(dropped))
@@ -0,0 +1,202 @@
+"""
+Bounded chat context with a rolling summary.
+
+A prompt carries at most CHAT_CONTEXT_MAX_TURNS recent turns verbatim, further
+trimmed (oldest first) to CHAT_CONTEXT_TOKEN_BUDGET tokens. Turns that fall
+out of that window are folded incrementally into Chat.summary by a background
+task; Chat.summarized_until marks the last folded turn. Per-turn cost stays
+flat however long the chat gets.
+"""
+
+import asyncio
+import time
+from collections import namedtuple
+from uuid import UUID
+from sqlalchemy import select, update, func, JSON
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.chat import Chat
+from database.models.message import Message
+from database.settings import AsyncSessionLocal
+from src.upload.dependency import async_openai_client
+from src.llm.serializer import count_tokens
+from src.llm.usage import record_usage
+from src.llm.budget import fit_messages, prompt_budget
+from .prompts import CHAT_SUMMARY_PROMPT
+import config
+import metrics
+
+# Keeps references to running summary tasks; one task per chat at a time
+summary_tasks = {}
+
+# A recent turn decoded from recent_turns_json
+ContextTurn = namedtuple("ContextTurn", ["user_query", "bot_response"])
+
+
+def fit_turns_to_budget(turns_newest_first: list, token_budget: int) -> list:
+    """Keep the newest turns whose combined size fits the budget (at least one)."""
+    kept = []
+    used = 0
+    for turn in turns_newest_first:
+        tokens = count_tokens(turn.user_query or "") + count_tokens(turn.bot_response or "")
+        if kept and used + tokens > token_budget:
+            break
+        kept.append(turn)
+        used += tokens
+    return list(reversed(kept))
+
+
+def recent_turns_query(chat_id):
+    """
+    The newest CHAT_CONTEXT_MAX_TURNS messages of a chat, newest first, plus
+    one more when it exists, which only tells that older turns exist.
+    """
+    return (
+        select(Message.message_id, Message.user_query, Message.bot_response, Message.created_at)
+        .where(Message.chat_id == chat_id)
+        .order_by(Message.created_at.desc(), Message.message_id.desc())
+        .limit(config.CHAT_CONTEXT_MAX_TURNS + 1)
+    )
+
+
+def recent_turns_json():
+    """
+    LATERAL subquery for a query over Chat: the chat's recent turns as one JSON
+    array (newest first) in the recent_turns column, so they arrive in the
+    same round trip and row as the chat itself.
+    """
+    recent = recent_turns_query(Chat.chat_id).correlate(Chat).subquery("recent_message")
+    turns = func.json_agg(
+        aggregate_order_by(
+            func.json_build_object(
+                "user_query", recent.c.user_query,
+                "bot_response", recent.c.bot_response,
+            ),
+            recent.c.created_at.desc(),
+            recent.c.message_id.desc(),
+        ),
+        type_=JSON,
+    )
+    return select(turns.label("recent_turns")).lateral("recent_window")
+
+
+def turns_from_json(items) -> list:
+    return [ContextTurn(item.get("user_query"), item.get("bot_response")) for item in items or []]
+
+
+def select_context_window(recent_newest_first: list):
+    """
+    The recent turns to send verbatim, oldest first, and whether older turns
+    exist outside the window (i.e. the summary may need updating).
+    """
+    recent = recent_newest_first[:config.CHAT_CONTEXT_MAX_TURNS]
+    turns = fit_turns_to_budget(recent, config.CHAT_CONTEXT_TOKEN_BUDGET)
+    has_older = (
+        len(turns) < len(recent)
+        or len(recent_newest_first) > config.CHAT_CONTEXT_MAX_TURNS
+    )
+    return turns, has_older
+
+
+async def load_context_turns(db: AsyncSession, chat_id: UUID):
+    result = await db.execute(recent_turns_query(chat_id))
+    return select_context_window(result.all())
+
+
+def format_turns(turns: list) -> str:
+    return "\n\n".join(f"User: {t.user_query}\nAssistant: {t.bot_response}" for t in turns)
+
+
+async def summarize_turns(summary: str, turns: list) -> str:
+    messages = [
+        {"role": "system", "content": CHAT_SUMMARY_PROMPT},
+        {
+            "role": "user",
+            "content": f"CURRENT SUMMARY:\n{summary or '(empty)'}\n\nNEW TURNS:\n{format_turns(turns)}",
+        },
+    ]
+    messages = fit_messages(
+        messages,
+        prompt_budget(config.CHAT_SUMMARY_MODEL, config.CHAT_PROMPT_TOKEN_BUDGET, 400),
+        "chat.summary",
+        config.CHAT_SUMMARY_MODEL,
+    )
+
+    started_at = time.perf_counter()
+    response = await async_openai_client.chat.completions.create(
+        model=config.CHAT_SUMMARY_MODEL,
+        messages=messages,
+        temperature=0.2,
+        max_tokens=400,
+    )
+    record_usage("chat.summary", response, started_at)
+    return response.choices[0].message.content.strip()
+
+
+async def fold_next_batch(db: AsyncSession, chat_id: UUID) -> bool:
+    """
+    Fold the oldest not-yet-summarized turns that are outside the prompt
+    window into the summary. Returns True when a batch was folded.
+    """
+    state = await db.execute(
+        select(Chat.summary, Chat.summarized_until).where(Chat.chat_id == chat_id)
+    )
+    row = state.one_or_none()
+    if row is None:
+        return False
+    summary, summarized_until = row
+
+    window, has_older = await load_context_turns(db, chat_id)
+    if not window or not has_older:
+        return False
+
+    query = (
+        select(Message.user_query, Message.bot_response, Message.created_at)
+        .where(Message.chat_id == chat_id, Message.created_at < window[0].created_at)
+        .order_by(Message.created_at.asc(), Message.message_id.asc())
+        .limit(config.CHAT_SUMMARY_BATCH_TURNS)
+    )
+    if summarized_until is not None:
+        query = query.where(Message.created_at > summarized_until)
+
+    turns = (await db.execute(query)).all()
+    if not turns:
+        return False
+
+    new_summary = await summarize_turns(summary, turns)
+
+    # Only move forward from the state the summary was built on
+    condition = (
+        Chat.summarized_until.is_(None)
+        if summarized_until is None
+        else Chat.summarized_until == summarized_until
+    )
+    result = await db.execute(
+        update(Chat)
+        .where(Chat.chat_id == chat_id, condition)
+        .values(summary=new_summary, summarized_until=turns[-1].created_at)
+    )
+    await db.commit()
+
+    metrics.incr("chat.summary.folded_turns", len(turns))
+    return result.rowcount == 1
+
+
+async def update_chat_summary(chat_id: UUID):
+    try:
+        async with AsyncSessionLocal() as session:
+            while await fold_next_batch(session, chat_id):
+                pass
+    except Exception as e:
+        # The chat keeps working with the previous summary
+        print(f"[WARN] Chat summary update failed for {chat_id}: {str(e)}")
+        metrics.incr("chat.summary.error")
+    finally:
+        summary_tasks.pop(chat_id, None)
+
+
+def schedule_summary_update(chat_id: UUID):
+    """Start a background summary update unless one is already running."""
+    if chat_id in summary_tasks:
+        return
+    summary_tasks[chat_id] = asyncio.create_task(update_chat_summary(chat_id))
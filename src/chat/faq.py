@@ -0,0 +1,114 @@
+"""
+Suggested questions with precomputed answers.
+
+After a successful analysis one batched call answers the CHAT_FAQ_COUNT
+questions a user is most likely to ask first. They are stored in
+report.insights["faq"] together with the analyzed_at of the analysis they
+were built from; continue_chat serves a matching suggested_question_id
+without an LLM call.
+"""
+
+import json
+import time
+from datetime import datetime, timezone
+from uuid import UUID
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.report import Report
+from database.models.report_type import ReportType
+from database.settings import AsyncSessionLocal
+from src.upload.dependency import async_openai_client
+from src.llm.usage import record_usage
+from src.llm.budget import PromptPart, INSTRUCTIONS, fit_prompt, prompt_budget
+from .prompts import FAQ_PROMPT
+from .utils import build_prompt_parts, report_prompt_data
+import config
+import metrics
+
+FAQ_MODEL = "gpt-4o"
+
+
+def parse_faq_items(content: str) -> list:
+    items = json.loads(content).get("faq", [])
+    faq = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        question = str(item.get("question", "")).strip()
+        answer = str(item.get("answer", "")).strip()
+        if question and answer:
+            faq.append({"id": f"faq-{len(faq) + 1}", "question": question, "answer": answer})
+    return faq
+
+
+async def generate_report_faq(report_id: UUID):
+    """
+    Background stage after analysis (own session). Skips reports without a
+    usable analysis and never overwrites the FAQ of a newer analysis.
+    """
+    if not config.CHAT_FAQ_ENABLED:
+        return
+
+    try:
+        async with AsyncSessionLocal() as session:
+            report = await session.get(Report, report_id)
+            insights = (report.insights or {}) if report else {}
+            analyzed_at = insights.get("analyzed_at")
+            if not analyzed_at or not isinstance(report.key_findings, dict) or "error" in report.key_findings:
+                return
+
+            report_type = await session.get(ReportType, report.report_type_id)
+
+            # Same leading messages as a chat turn, so the prompt prefix is shared
+            parts = build_prompt_parts(report_type.name, report_prompt_data(report), [])
+            parts.append(PromptPart(INSTRUCTIONS, [
+                {"role": "user", "content": FAQ_PROMPT.format(count=config.CHAT_FAQ_COUNT)},
+            ]))
+            messages = fit_prompt(parts, prompt_budget(FAQ_MODEL, config.CHAT_PROMPT_TOKEN_BUDGET), "chat.faq", FAQ_MODEL)
+
+            started_at = time.perf_counter()
+            response = await async_openai_client.chat.completions.create(
+                model=FAQ_MODEL,
+                messages=messages,
+                temperature=0.3,
+                response_format={"type": "json_object"},
+            )
+            record_usage("chat.faq", response, started_at)
+            faq = parse_faq_items(response.choices[0].message.content)
+
+            await session.refresh(report)
+            insights = dict(report.insights or {})
+            if insights.get("analyzed_at") != analyzed_at:
+                # Re-analyzed meanwhile; that analysis schedules its own FAQ
+                return
+
+            insights["faq"] = {
+                "analyzed_at": analyzed_at,
+                "generated_at": datetime.now(timezone.utc).isoformat(),
+                "items": faq,
+            }
+            report.insights = insights
+            await session.commit()
+            metrics.incr("chat.faq.generated")
+
+    except Exception as e:
+        # Chat works without suggestions
+        print(f"[WARN] FAQ generation failed for {report_id}: {str(e)}")
+        metrics.incr("chat.faq.error")
+
+
+def find_faq_item(report: Report, question_id: str):
+    items = ((report.insights or {}).get("faq") or {}).get("items", [])
+    return next((item for item in items if item.get("id") == question_id), None)
+
+
+async def get_suggested_questions(db: AsyncSession, user_id: UUID, file_id: UUID):
+    result = await db.execute(
+        select(Report.insights).where(Report.report_id == file_id, Report.user_id == user_id)
+    )
+    row = result.one_or_none()
+    if not row:
+        raise ValueError("Report not found")
+
+    items = ((row.insights or {}).get("faq") or {}).get("items", [])
+    return [{"id": item["id"], "question": item["question"]} for item in items]
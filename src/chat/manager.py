@@ -1,14 +1,30 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select,func,delete,update
+from sqlalchemy import select,func,delete,update,true,tuple_
 from fastapi import HTTPException
 from uuid import UUID,uuid4
+from datetime import datetime, timezone
 from database.models.chat import Chat
 from database.models.report import Report
 from database.models.message import Message
 from database.models.report_type import ReportType
-from .utils import build_prompt
+from .utils import build_prompt_parts, report_prompt_data, encode_cursor, decode_cursor
+from .context import recent_turns_json, turns_from_json, select_context_window, schedule_summary_update
+from .answer_cache import answer_cache_enabled, lookup_answer, store_answer
+from .faq import find_faq_item
+from .turns import serialized_turn, find_turn_by_key, claim_turn, release_turn
+from .routing import route_question
+from src.llm.retrieval import retrieve_report_chunks
+from src.llm.embeddings import embed_texts
+from database.settings import AsyncSessionLocal
+from src.llm.usage import record_usage
+from src.llm.disconnect import record_wasted_tokens
+from src.llm.budget import PromptPart, INSTRUCTIONS, fit_prompt, prompt_budget
 from langfuse.openai import AsyncOpenAI
+from contextlib import aclosing
+import asyncio
 import config
+import metrics
+import time
 
 client = AsyncOpenAI(api_key=config.OPENAI_API_KEY) 
 
@@ -42,110 +58,449 @@ async def create_chat(db: AsyncSession, user_id: UUID, file_id: UUID):
         await db.rollback()
         raise HTTPException(status_code=500, detail=f"Error Creating Chat: {str(e)}")
 
-async def continue_chat(data, db: AsyncSession, user_id: UUID):
-    chat = await db.get(Chat, data.chat_id)
-    if not chat:
+async def load_chat_turn(data, db: AsyncSession):
+    """
+    Validate the chat and report a new turn belongs to. Chat, report, report
+    type and the recent message window (newest first) come from a single
+    query, i.e. one DB round trip before the LLM call.
+    """
+    window = recent_turns_json()
+
+    result = await db.execute(
+        select(Chat, Report, ReportType, window.c.recent_turns)
+        .outerjoin(Report, Report.report_id == Chat.file_id)
+        .outerjoin(ReportType, ReportType.report_type_id == Report.report_type_id)
+        .outerjoin(window, true())
+        .where(Chat.chat_id == data.chat_id)
+    )
+    row = result.one_or_none()
+
+    if not row:
         raise HTTPException(404, "Chat not found")
 
+    chat, report, report_type, recent_turns = row
+
     if not chat.is_valid_chat:
         raise HTTPException(400, "This chat is no longer valid")
 
-    report = await db.get(Report, chat.file_id)
     if not report:
         raise HTTPException(404, "Report not found")
 
     if not report.is_valid_report:
         raise HTTPException(400, "This report is no longer valid")
 
-    report_type = await db.get(ReportType, report.report_type_id)
+    return chat, report, report_type, turns_from_json(recent_turns)
 
-    analysis = report.insights.get("analysis", {})
+async def embed_question(user_query: str):
+    """Question embedding shared by retrieval and the answer cache (None on failure)."""
+    try:
+        return (await embed_texts([user_query], "chat.question"))[0]
+    except Exception as e:
+        print(f"[WARN] Question embedding failed: {str(e)}")
+        metrics.incr("chat.question_embedding.error")
+        return None
 
-    report_data = {
-        "summary": report.summary,
-        "key_findings": report.key_findings,
-        "recommendations": report.recommendations,
-        "insights": analysis.get("insights"),
-    }
+def build_turn_messages(chat: Chat, report: Report, report_type: ReportType, recent: list, user_query: str, report_excerpts: list, model: str):
+    """
+    Build the LLM messages of a turn, trimmed to the chat prompt budget.
+    Also returns whether turns outside the prompt window exist.
+    """
+    report_data = report_prompt_data(report)
 
-    # Fetch chat messages
-    history_result = await db.execute(
-        select(Message).where(Message.chat_id == chat.chat_id).order_by(Message.created_at.asc())
-    )
-    chat_history = history_result.scalars().all()
+    # Recent turns only; older ones are covered by the rolling summary
+    chat_history, has_older = select_context_window(recent)
 
-    messages = build_prompt(
+    parts = build_prompt_parts(
         report_type_name=report_type.name,
         report_data=report_data,
         chat_history=chat_history,
+        summary=chat.summary,
+        report_excerpts=report_excerpts,
     )
 
-    messages.append({"role": "user", "content": data.user_query})
+    parts.append(PromptPart(INSTRUCTIONS, [{"role": "user", "content": user_query}]))
+
+    messages = fit_prompt(parts, prompt_budget(model, config.CHAT_PROMPT_TOKEN_BUDGET), "chat.continue", model)
+    return messages, has_older
+
+async def prepare_chat_turn(data, db: AsyncSession):
+    """
+    Everything before the LLM call: validation, precomputed or cached
+    answers, the question embedding and the prompt. Returns a dict with chat,
+    report_id, user_query, question_embedding, use_cache and either
+    ready_answer / answer_metadata (no LLM call needed) or messages / has_older.
+    """
+    user_query = (data.user_query or "").strip()
+    use_cache = answer_cache_enabled(data)
+    needs_embedding = config.RAG_ENABLED or use_cache
+
+    # The embedding round trip runs alongside the chat query. A suggested
+    # question is usually answered without one, so it only embeds on a miss.
+    embedding_task = None
+    if needs_embedding and user_query and not data.suggested_question_id:
+        embedding_task = asyncio.create_task(embed_question(user_query))
+
+    try:
+        chat, report, report_type, recent = await load_chat_turn(data, db)
+    except BaseException:
+        if embedding_task:
+            embedding_task.cancel()
+        raise
+
+    turn = {
+        "chat": chat,
+        "report_id": report.report_id,
+        # Cached answers are only valid for the analysis they were built from
+        "analyzed_at": (report.insights or {}).get("analyzed_at"),
+        "user_query": user_query,
+        "question_embedding": None,
+        "use_cache": False,
+        "ready_answer": None,
+        "idempotency_key": data.idempotency_key,
+    }
+
+    # Suggested question: answered at analysis time
+    if data.suggested_question_id:
+        item = find_faq_item(report, data.suggested_question_id)
+        if item:
+            metrics.incr("chat.faq.served")
+            turn["user_query"] = item["question"]
+            turn["ready_answer"] = item["answer"]
+            turn["answer_metadata"] = {"suggested_question_id": item["id"]}
+            return turn
+        # Stale ID (e.g. report re-analyzed): answer the text normally
+        metrics.incr("chat.faq.stale")
+
+    if not turn["user_query"]:
+        raise HTTPException(400, "user_query is required")
+
+    if embedding_task:
+        turn["question_embedding"] = await embedding_task
+    elif needs_embedding:
+        turn["question_embedding"] = await embed_question(turn["user_query"])
+    turn["use_cache"] = use_cache and turn["question_embedding"] is not None
+
+    if turn["use_cache"]:
+        hit = lookup_answer(report.report_id, turn["analyzed_at"], turn["question_embedding"])
+        if hit:
+            turn["ready_answer"] = hit[0]
+            turn["answer_metadata"] = {"answer_cache": True, "similarity": round(hit[1], 4)}
+            return turn
+
+    report_excerpts = []
+    if config.RAG_ENABLED and turn["question_embedding"] is not None:
+        report_excerpts = await retrieve_report_chunks(
+            report.report_id, (report.insights or {}).get("namespace"), turn["question_embedding"]
+        )
 
-    response = await client.chat.completions.create(
-        model="gpt-4o",
-        messages=messages,
+    turn["route"], turn["route_reason"], turn["model"] = route_question(report_type.name, turn["user_query"])
+    turn["messages"], turn["has_older"] = build_turn_messages(
+        chat, report, report_type, recent, turn["user_query"], report_excerpts, turn["model"]
     )
-    bot_answer = response.choices[0].message.content
+    return turn
+
+async def save_ready_turn(db: AsyncSession, turn: dict, user_id: UUID):
+    return await save_chat_turn(
+        db, turn["chat"], user_id, turn["user_query"], turn["ready_answer"], turn["answer_metadata"],
+        turn["idempotency_key"],
+    )
+
+def route_metadata(turn: dict) -> dict:
+    """Routing decision stored with the message."""
+    return {"route": turn["route"], "route_reason": turn["route_reason"], "model": turn["model"]}
+
+def finish_chat_turn(turn: dict, bot_answer: str):
+    """Post-answer bookkeeping: answer cache and rolling summary."""
+    if turn["use_cache"]:
+        store_answer(turn["report_id"], turn["analyzed_at"], turn["user_query"], turn["question_embedding"], bot_answer)
+    if turn["has_older"]:
+        schedule_summary_update(turn["chat"].chat_id)
 
+async def save_chat_turn(db: AsyncSession, chat: Chat, user_id: UUID, user_query: str, bot_answer: str, metadatas: dict = None, idempotency_key: str = None):
     if chat.chat_name == "Untitled Chat":
-        chat.chat_name = data.user_query
+        chat.chat_name = user_query
 
+    metadatas = dict(metadatas or {})
+    if idempotency_key:
+        metadatas["idempotency_key"] = idempotency_key
+
+    now = datetime.now(timezone.utc)
     msg = Message(
         chat_id=chat.chat_id,
         user_id=user_id,
-        user_query=data.user_query,
+        user_query=user_query,
         bot_response=bot_answer,
-        metadatas={}
+        metadatas=metadatas,
+        created_at=now
     )
 
     db.add(msg)
+    # Activity columns move in the same transaction as the insert; the
+    # increment is done in SQL so concurrent turns don't lose counts
+    await db.execute(
+        update(Chat)
+        .where(Chat.chat_id == chat.chat_id)
+        .values(message_count=Chat.message_count + 1, last_message_at=now)
+    )
     await db.commit()
     await db.refresh(msg)
 
     return msg
 
-async def chat_history(db: AsyncSession, chat_id: UUID):
+async def answer_chat_turn(data, db: AsyncSession, user_id: UUID):
+    turn = await prepare_chat_turn(data, db)
+    if turn["ready_answer"] is not None:
+        return await save_ready_turn(db, turn, user_id)
+
+    started_at = time.perf_counter()
+    try:
+        response = await client.chat.completions.create(
+            model=turn["model"],
+            messages=turn["messages"],
+        )
+    except asyncio.CancelledError:
+        # Client went away; closing the request stops the completion
+        record_wasted_tokens("chat.continue", turn["messages"])
+        raise
+    record_usage("chat.continue", response, started_at)
+    metrics.observe(f"chat.route.{turn['route']}.latency", time.perf_counter() - started_at)
+    bot_answer = response.choices[0].message.content
+
+    msg = await save_chat_turn(
+        db, turn["chat"], user_id, turn["user_query"], bot_answer, route_metadata(turn), turn["idempotency_key"],
+    )
+    finish_chat_turn(turn, bot_answer)
+
+    return msg
+
+async def continue_chat(data, db: AsyncSession, user_id: UUID):
+    """
+    One chat turn, serialized with the other turns of the chat. A repeated
+    idempotency_key returns the message of the original submission.
+    """
+    inflight, original = await claim_turn(db, data.chat_id, data.idempotency_key)
+    if original:
+        return original
+
+    message_id = None
+    try:
+        async with serialized_turn(db, data.chat_id):
+            msg = await find_turn_by_key(db, data.chat_id, data.idempotency_key)
+            if msg:
+                metrics.incr("chat.turn.duplicate_stored")
+            else:
+                msg = await answer_chat_turn(data, db, user_id)
+            message_id = msg.message_id
+            return msg
+    finally:
+        release_turn(data.chat_id, data.idempotency_key, inflight, message_id)
+
+# Keeps references to detached cleanup tasks until they finish
+background_saves = set()
+
+async def save_interrupted_turn(stream, chat_id: UUID, user_id: UUID, user_query: str, partial_answer: str, reason: str):
+    """
+    Runs detached from the (cancelled) request: stops the upstream completion
+    and stores whatever part of the answer the user has already seen.
+    """
+    try:
+        await stream.close()
+    except Exception as e:
+        print(f"[WARN] Failed to close chat stream: {str(e)}")
+
+    metrics.incr(f"chat.stream.{reason}")
+    if not partial_answer:
+        return
+
+    try:
+        async with AsyncSessionLocal() as session, serialized_turn(session, chat_id):
+            chat = await session.get(Chat, chat_id)
+            if chat:
+                # Stored without the idempotency key: a retry gets a full answer
+                await save_chat_turn(
+                    session, chat, user_id, user_query, partial_answer,
+                    {"partial": True, "finish_reason": reason},
+                )
+    except Exception as e:
+        print(f"[WARN] Failed to save partial chat answer: {str(e)}")
+
+async def stream_chat_turn(data, db: AsyncSession, user_id: UUID):
+    """
+    Yields ("delta", text) for each piece of the answer as it arrives, then
+    ("message", Message) once the completed turn has been stored. If the
+    stream is interrupted (client disconnect or upstream error) the partial
+    answer is stored with partial metadata.
+    """
+    turn = await prepare_chat_turn(data, db)
+    chat = turn["chat"]
+    chat_id = chat.chat_id
+
+    if turn["ready_answer"] is not None:
+        yield "delta", turn["ready_answer"]
+        yield "message", await save_ready_turn(db, turn, user_id)
+        return
+
+    started_at = time.perf_counter()
+    first_token_at = None
+    parts = []
+
+    stream = await client.chat.completions.create(
+        model=turn["model"],
+        messages=turn["messages"],
+        stream=True,
+        stream_options={"include_usage": True},
+    )
+
+    reason = None
+    try:
+        async for chunk in stream:
+            # The final chunk carries usage and no choices
+            if chunk.usage:
+                record_usage("chat.continue", chunk, started_at)
+
+            if not chunk.choices:
+                continue
+
+            delta = chunk.choices[0].delta.content
+            if not delta:
+                continue
+
+            if first_token_at is None:
+                first_token_at = time.perf_counter()
+                metrics.observe("llm.chat.continue.ttft", first_token_at - started_at)
+                metrics.observe(f"chat.route.{turn['route']}.ttft", first_token_at - started_at)
+
+            parts.append(delta)
+            yield "delta", delta
+
+    except (asyncio.CancelledError, GeneratorExit):
+        reason = "client_disconnected"
+        record_wasted_tokens("chat.continue", turn["messages"], "".join(parts))
+        raise
+    except Exception:
+        reason = "stream_error"
+        raise
+    finally:
+        if reason:
+            # Awaiting here would be cancelled again, so clean up in a detached task
+            task = asyncio.create_task(
+                save_interrupted_turn(stream, chat_id, user_id, turn["user_query"], "".join(parts), reason)
+            )
+            background_saves.add(task)
+            task.add_done_callback(background_saves.discard)
+
+    bot_answer = "".join(parts)
+    metrics.observe(f"chat.route.{turn['route']}.latency", time.perf_counter() - started_at)
+    msg = await save_chat_turn(
+        db, chat, user_id, turn["user_query"], bot_answer, route_metadata(turn), turn["idempotency_key"],
+    )
+    finish_chat_turn(turn, bot_answer)
+
+    yield "message", msg
+
+async def stream_continue_chat(data, db: AsyncSession, user_id: UUID):
+    """
+    Streaming variant of continue_chat, with the same serialization and
+    idempotency. A duplicate submission gets the original answer as a
+    single delta.
+    """
+    inflight, original = await claim_turn(db, data.chat_id, data.idempotency_key)
+    if original:
+        yield "delta", original.bot_response
+        yield "message", original
+        return
+
+    message_id = None
+    try:
+        async with serialized_turn(db, data.chat_id):
+            msg = await find_turn_by_key(db, data.chat_id, data.idempotency_key)
+            if msg:
+                metrics.incr("chat.turn.duplicate_stored")
+                yield "delta", msg.bot_response
+                yield "message", msg
+                message_id = msg.message_id
+                return
+
+            # Closed explicitly, so a disconnect reaches its cleanup right away
+            async with aclosing(stream_chat_turn(data, db, user_id)) as events:
+                async for event, value in events:
+                    if event == "message":
+                        message_id = value.message_id
+                    yield event, value
+    finally:
+        release_turn(data.chat_id, data.idempotency_key, inflight, message_id)
+
+async def chat_history(db: AsyncSession, chat_id: UUID, cursor: str = None, limit: int = 50):
+    """
+    One page of a chat's messages, keyset-paginated on (created_at, message_id).
+    The first page holds the latest messages; next_cursor continues with
+    older ones. Messages inside a page are oldest first.
+    """
     chat = await db.get(Chat, chat_id)
     if not chat:
         raise HTTPException(404, detail="Chat not found")
 
+    query = select(Message).where(Message.chat_id == chat_id)
+
+    if cursor:
+        created_at, message_id = decode_cursor(cursor)
+        query = query.where(tuple_(Message.created_at, Message.message_id) < tuple_(created_at, message_id))
+
+    # One extra row tells whether another page exists
     result = await db.execute(
-        select(Message)
-        .where(Message.chat_id == chat_id)
-        .order_by(Message.created_at.asc())
+        query.order_by(Message.created_at.desc(), Message.message_id.desc()).limit(limit + 1)
     )
     messages = result.scalars().all()
 
+    has_more = len(messages) > limit
+    messages = messages[:limit]
+    next_cursor = encode_cursor(messages[-1].created_at, messages[-1].message_id) if has_more else None
+
     return {
         "chat_id": chat_id,
         "file_id": chat.file_id,
         "is_valid_chat": chat.is_valid_chat,
-        "messages": messages
+        "messages": list(reversed(messages)),
+        "next_cursor": next_cursor,
     }
 
-async def recent_chat(db: AsyncSession, user_id: UUID, search: str = None):
+async def recent_chat(db: AsyncSession, user_id: UUID, search: str = None, cursor: str = None, limit: int = 20):
+    """
+    A page of the user's chats, most recently active first, keyset-paginated
+    on (last_message_at, chat_id). Served by ix_chat_created_by_last_message
+    alone, without touching the message table.
+    """
 
-    query = select(Chat.chat_id, Chat.chat_name, Chat.is_valid_chat).where(
-        Chat.created_by == user_id
-    )
+    query = select(
+        Chat.chat_id, Chat.chat_name, Chat.is_valid_chat, Chat.last_message_at, Chat.message_count
+    ).where(Chat.created_by == user_id)
 
     if search:
         search_term = f"%{search.lower()}%"
         query = query.where(func.lower(Chat.chat_name).ilike(search_term))
 
-    query = query.order_by(Chat.created_at.desc())
+    if cursor:
+        last_message_at, chat_id = decode_cursor(cursor)
+        query = query.where(tuple_(Chat.last_message_at, Chat.chat_id) < tuple_(last_message_at, chat_id))
+
+    query = query.order_by(Chat.last_message_at.desc(), Chat.chat_id.desc()).limit(limit + 1)
     result = await db.execute(query)
     chats = result.all()
 
+    has_more = len(chats) > limit
+    chats = chats[:limit]
+    next_cursor = encode_cursor(chats[-1].last_message_at, chats[-1].chat_id) if has_more else None
+
     return [
         {
             "chat_id": c.chat_id,
             "chat_name": c.chat_name,
-            "is_valid_chat": c.is_valid_chat
+            "is_valid_chat": c.is_valid_chat,
+            "last_message_at": c.last_message_at,
+            "message_count": c.message_count
         }
         for c in chats
-    ]
+    ], next_cursor
 
 async def rename_chat(db: AsyncSession, user_id: UUID, chat_id: UUID, chat_name: str):
     chat = await db.get(Chat, chat_id)
@@ -166,12 +521,12 @@ async def rename_chat(db: AsyncSession, user_id: UUID, chat_id: UUID, chat_name:
 
 async def delete_chat(db: AsyncSession, chat_id: UUID):
 
-    chat = await db.get(Chat, chat_id)
-    if not chat:
-        raise HTTPException(404, detail="Chat not found")
-
     # Soft delete the chat
-    chat.is_valid_chat = False
+    result = await db.execute(
+        update(Chat).where(Chat.chat_id == chat_id).values(is_valid_chat=False)
+    )
+    if result.rowcount == 0:
+        raise HTTPException(404, detail="Chat not found")
 
     # Soft delete all messages
     await db.execute(
@@ -33,13 +33,13 @@ SYSTEM_PROMPT = dedent("""
     Remember: Your goal is to make medical information accessible and understandable while maintaining appropriate boundaries.
 """)
 
-# Report-specific aggregated prompts
+# Report-specific aggregated prompts. These are static so that SYSTEM_PROMPT plus
+# the report-type instructions form an identical prefix for every chat of that
+# type; the per-report data is sent in a separate message after them.
 AGGREGATED_PROMPTS = {
     "medical_prescription": dedent("""
         PRESCRIPTION CONTEXT:
-        You are helping a patient understand their prescription. The prescription details are:
-        
-        {report_data}
+        You are helping a patient understand their prescription. The prescription details are provided in the REPORT DATA message.
         
         WHAT YOU CAN HELP WITH:
         - Explain what each medication does in simple terms
@@ -68,9 +68,7 @@ AGGREGATED_PROMPTS = {
     
     "blood_test_report": dedent("""
         BLOOD TEST CONTEXT:
-        You are helping a patient understand their blood test results. The test results are:
-        
-        {report_data}
+        You are helping a patient understand their blood test results. The test results are provided in the REPORT DATA message.
         
         WHAT YOU CAN HELP WITH:
         - Explain what each blood parameter measures in simple terms
@@ -100,4 +98,31 @@ AGGREGATED_PROMPTS = {
         
         Always remind: Results should be discussed with their healthcare provider who knows their complete medical history.
     """)
-}
\ No newline at end of file
+}
+
+DEFAULT_CONTEXT_PROMPT = "The user's medical report details are provided in the REPORT DATA message."
+
+CHAT_SUMMARY_PROMPT = dedent("""
+    You maintain a running summary of a conversation between a user and a health assistant about the user's medical report.
+
+    You receive the CURRENT SUMMARY (may be empty) and NEW TURNS that happened after it.
+    Return an updated summary that merges both:
+    - Keep what the user asked about, what was explained, and any concerns, symptoms or preferences the user mentioned
+    - Keep specific values, medicines and dates that were discussed
+    - Drop greetings, repetition and formatting
+    - Write plain prose in the third person ("The user asked..."), at most 200 words
+    - Return only the summary text
+""")
+
+
+FAQ_PROMPT = dedent("""
+    TASK: Anticipate the first questions a user is most likely to ask about this report and answer them now.
+
+    - Write exactly {count} questions, phrased the way the user would ask them (first person, plain language)
+    - Cover what matters most for this report: what each medication is for, which values are abnormal and what they mean, what the follow-up is
+    - Answer each question following all the rules above, using ONLY the REPORT DATA
+    - Keep each answer under 150 words
+
+    Return ONLY a JSON object:
+    {{"faq": [{{"question": "...", "answer": "..."}}]}}
+""")
@@ -0,0 +1,73 @@
+"""
+Model routing for chat turns.
+
+A local heuristic sorts each question into "fast" (a message that is only
+small talk, or the definition of a single bare term such as "what does mg
+mean") or "default" (interpretation of the report, advice, anything long or
+ambiguous). Fast questions are answered by CHAT_FAST_MODEL, the rest by
+CHAT_DEFAULT_MODEL. When in doubt the question stays on the default model.
+"""
+
+import re
+import config
+import metrics
+
+ROUTE_FAST = "fast"
+ROUTE_DEFAULT = "default"
+
+SMALL_TALK_PHRASE = r"(?:hi|hello|hey|thanks?|thank you(?: so much| very much)?|thx|ok(?:ay)?|cool|great|got it|bye|good (?:morning|evening|night))"
+# The whole message is small talk ("ok thanks!"), with no trailing clause
+SMALL_TALK = re.compile(rf"^{SMALL_TALK_PHRASE}(?:[ ,]+{SMALL_TALK_PHRASE})*[ .!?]*$")
+
+# A bare term of at most three words ("hba1c", "vitamin d", "mg/dl")
+TERM = r"([a-z0-9][\w/.+-]*(?: [a-z0-9][\w/.+-]*){0,2})"
+DEFINITION = re.compile(
+    rf"^(?:what(?:'s| is| are) (?:an? |the )?{TERM}"
+    rf"|what (?:does|do) (?:an? |the )?{TERM} (?:mean|stand for)"
+    rf"|(?:define|meaning of|full form of) (?:an? |the )?{TERM})[ ?.!]*$"
+)
+# A "term" containing one of these refers to the report, not a definition
+NON_TERM_WORDS = {
+    "this", "that", "it", "these", "those", "they", "them", "report", "wrong", "abnormal", "prognosis",
+    "next", "summary", "about", "problem", "issue", "finding", "findings", "value", "values", "outcome",
+    "plan", "happening", "going", "bad", "good", "ok", "okay", "fine", "here", "there",
+}
+# Anything about the user's own results, decisions or risk needs the full model
+INTERPRETATION = re.compile(
+    r"\b(my|me|i|should|normal|high|low|elevated|risk|worr\w*|serious|danger\w*|why|compare|trend"
+    r"|result\w*|level\w*|range|dose|dosage|safe|side effects?|diagnos\w*|treat\w*|recommend\w*|explain)\b"
+)
+MAX_FAST_WORDS = 12
+
+
+def classify_question(user_query: str):
+    """Returns (route, reason)."""
+    text = " ".join(user_query.lower().replace("\u2019", "'").split())
+    if len(text.split()) > MAX_FAST_WORDS:
+        return ROUTE_DEFAULT, "long"
+    if INTERPRETATION.search(text):
+        return ROUTE_DEFAULT, "interpretation"
+    if SMALL_TALK.match(text):
+        return ROUTE_FAST, "small_talk"
+    match = DEFINITION.match(text)
+    if match:
+        term = next(group for group in match.groups() if group)
+        if not NON_TERM_WORDS.intersection(term.split()):
+            return ROUTE_FAST, "definition"
+    return ROUTE_DEFAULT, "unclassified"
+
+
+def route_question(report_type_name: str, user_query: str):
+    """Returns (route, reason, model) for a chat turn."""
+    mode = config.CHAT_ROUTING_BY_REPORT_TYPE.get((report_type_name or "").lower(), "auto")
+
+    if not config.CHAT_ROUTING_ENABLED:
+        route, reason = ROUTE_DEFAULT, "disabled"
+    elif mode in (ROUTE_FAST, ROUTE_DEFAULT):
+        route, reason = mode, "report_type"
+    else:
+        route, reason = classify_question(user_query)
+
+    metrics.incr(f"chat.route.{route}.{reason}")
+    model = config.CHAT_FAST_MODEL if route == ROUTE_FAST else config.CHAT_DEFAULT_MODEL
+    return route, reason, model
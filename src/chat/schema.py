@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
 from typing import List,Optional
 from datetime import datetime
@@ -12,7 +12,13 @@ class CreateChatResponse(BaseModel):
 
 class ContinueChatRequest(BaseModel):
     chat_id: UUID
-    user_query: str
+    user_query: str = ""
+    # ID from /chat/suggested-questions; answered without an LLM call
+    suggested_question_id: Optional[str] = None
+    # Opt in to reusing a cached answer to a near-identical question (needs CHAT_ANSWER_CACHE_ENABLED)
+    use_answer_cache: bool = False
+    # Client-generated key per submission; a resubmit with the same key gets the original answer
+    idempotency_key: Optional[str] = Field(None, max_length=128)
 
 class MessageResponse(BaseModel):
     chat_id: UUID
@@ -35,18 +41,31 @@ class ChatHistoryResponse(BaseModel):
     file_id:Optional[UUID]
     is_valid_chat: bool
     messages: List[ChatHistory]
+    # Pass back as ?cursor= to load older messages; None on the last page
+    next_cursor: Optional[str] = None
 
 class RecentChatItem(BaseModel):
     chat_id:UUID
     chat_name:str
     is_valid_chat: bool
+    last_message_at: Optional[datetime] = None
+    message_count: int = 0
 
 class RecentChatResponse(BaseModel):
     chats:List[RecentChatItem]
+    next_cursor: Optional[str] = None
 
 class RenameChatRequest(BaseModel):
     chat_id: UUID
     chat_name: str
 
+class SuggestedQuestion(BaseModel):
+    id: str
+    question: str
+
+class SuggestedQuestionsResponse(BaseModel):
+    file_id: UUID
+    questions: List[SuggestedQuestion]
+
 class ChatDeleteRequest(BaseModel):
     chat_id: UUID
\ No newline at end of file
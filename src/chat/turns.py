@@ -0,0 +1,95 @@
+"""
+Per-chat turn serialization and duplicate-submit suppression.
+
+Turns of one chat run one at a time: an in-process keyed asyncio.Lock orders
+them within a worker, and a transaction-scoped Postgres advisory lock orders
+them across workers (it is released when the turn's message is committed).
+A turn therefore always reads the history including the previous answer.
+
+A client-supplied idempotency key identifies a submission. While it is being
+answered, a duplicate awaits the original and returns its message; once it
+is stored, a duplicate finds it by the key kept in Message.metadatas.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from uuid import UUID
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.message import Message
+import metrics
+
+# chat_id -> [lock, number of turns holding or waiting for it]
+_chat_locks = {}
+# (chat_id, idempotency_key) -> future resolving to the stored message_id (None on failure)
+_inflight = {}
+
+
+def advisory_lock_key(chat_id: UUID) -> int:
+    """64-bit advisory lock key of a chat."""
+    return int.from_bytes(chat_id.bytes[:8], "big", signed=True)
+
+
+@asynccontextmanager
+async def serialized_turn(db: AsyncSession, chat_id: UUID):
+    """
+    Hold the chat's turn lock. The advisory lock lives in db's transaction,
+    so the body must commit (or roll back) that transaction exactly once, at
+    the end of the turn.
+    """
+    entry = _chat_locks.setdefault(chat_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        if entry[0].locked():
+            metrics.incr("chat.turn.waited")
+        async with entry[0]:
+            await db.execute(text("SELECT pg_advisory_xact_lock(:key)"), {"key": advisory_lock_key(chat_id)})
+            yield
+    finally:
+        entry[1] -= 1
+        if entry[1] == 0:
+            _chat_locks.pop(chat_id, None)
+
+
+async def find_turn_by_key(db: AsyncSession, chat_id: UUID, idempotency_key: str):
+    if not idempotency_key:
+        return None
+    result = await db.execute(
+        select(Message)
+        .where(
+            Message.chat_id == chat_id,
+            Message.metadatas["idempotency_key"].as_string() == idempotency_key,
+        )
+        .limit(1)
+    )
+    return result.scalar_one_or_none()
+
+
+async def claim_turn(db: AsyncSession, chat_id: UUID, idempotency_key: str):
+    """
+    Returns (None, Message) when an in-flight duplicate of this submission
+    produced the answer. Otherwise the caller owns the submission and gets
+    (future, None); it must hand the future to release_turn when done.
+    """
+    if not idempotency_key:
+        return None, None
+
+    key = (chat_id, idempotency_key)
+    while key in _inflight:
+        metrics.incr("chat.turn.duplicate_inflight")
+        message_id = await asyncio.shield(_inflight[key])
+        if message_id is not None:
+            return None, await db.get(Message, message_id)
+        # The original failed; the first waiter to get here retries it
+
+    future = asyncio.get_running_loop().create_future()
+    _inflight[key] = future
+    return future, None
+
+
+def release_turn(chat_id: UUID, idempotency_key: str, future, message_id: UUID = None):
+    if future is None:
+        return
+    _inflight.pop((chat_id, idempotency_key), None)
+    if not future.done():
+        future.set_result(message_id)
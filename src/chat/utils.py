@@ -1,37 +1,95 @@
+import base64
+import json
+from datetime import datetime
+from uuid import UUID
+from fastapi import HTTPException
 from database.models.report_type import ReportType
-from .prompts import SYSTEM_PROMPT,AGGREGATED_PROMPTS
+from .prompts import SYSTEM_PROMPT,AGGREGATED_PROMPTS,DEFAULT_CONTEXT_PROMPT
+from src.llm.serializer import serialize_report_data
+from src.llm.budget import PromptPart, INSTRUCTIONS, RECENT_TURNS, REPORT_DATA, REPORT_EXCERPTS, HISTORY
 
-def build_prompt(report_type_name: str, report_data: dict, chat_history):
+# Turns at the end of the history that are trimmed only after the report data
+RECENT_TURNS_KEPT = 2
+
+def encode_cursor(created_at: datetime, row_id: UUID) -> str:
+    """Opaque keyset cursor for the (created_at, id) position of a row."""
+    raw = json.dumps({"t": created_at.isoformat(), "id": str(row_id)})
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii")
+
+def decode_cursor(cursor: str):
+    try:
+        data = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(data["t"]), UUID(data["id"])
+    except Exception:
+        raise HTTPException(400, "Invalid cursor")
+
+def report_prompt_data(report) -> dict:
+    """The report fields the chat model sees."""
+    analysis = (report.insights or {}).get("analysis", {})
+    return {
+        "summary": report.summary,
+        "key_findings": report.key_findings,
+        "recommendations": report.recommendations,
+        "insights": analysis.get("insights"),
+    }
+
+def build_prompt_parts(report_type_name: str, report_data: dict, chat_history, summary: str = None, report_excerpts: list = None):
     """
     Builds the full OpenAI prompt using system prompt, report insights
-    and chat history.
+    and chat history, as PromptParts (see src/llm/budget.py) so it can be
+    trimmed to a token budget.
+
+    Layout (most static first, so upstream prompt caching can reuse the prefix):
+    1. SYSTEM_PROMPT + report-type instructions (identical for every chat of a type)
+    2. Report data (identical for every turn of a chat)
+    3. Rolling summary of older turns, if any (changes only when turns are folded)
+    4. Recent chat history; the last RECENT_TURNS_KEPT turns are kept longest
+    5. Report text excerpts retrieved for this question (differ per turn),
+       then the new user query (appended by the caller)
     """
 
     # Select report-specific aggregated prompt if available
-    if report_type_name in AGGREGATED_PROMPTS:
-        context_prompt = AGGREGATED_PROMPTS[report_type_name].format(
-            report_data=report_data
-        )
-    else:
-        context_prompt = "The user's medical report details are below.\n" + str(report_data)
-
-    # final system message
-    system_message = f"""
-        {SYSTEM_PROMPT}
-
-        ==== REPORT DATA ====
-        {context_prompt}
-        ==== END REPORT DATA ====
-    """
+    context_prompt = AGGREGATED_PROMPTS.get(report_type_name, DEFAULT_CONTEXT_PROMPT)
+
+    instructions_message = f"{SYSTEM_PROMPT}\n{context_prompt}"
+
+    report_text = serialize_report_data(report_data, call_site="chat.continue") or "No report data available"
 
-    messages = [{"role": "system", "content": system_message}]
+    report_message = (
+        "==== REPORT DATA ====\n"
+        f"{report_text}\n"
+        "==== END REPORT DATA ===="
+    )
 
-    # Add the entire chat history
-    for msg in chat_history:
-        messages.append({"role": "user", "content": msg.user_query})
-        messages.append({"role": "assistant", "content": msg.bot_response})
+    parts = [
+        PromptPart(INSTRUCTIONS, [{"role": "system", "content": instructions_message}]),
+        PromptPart(REPORT_DATA, [{"role": "system", "content": report_message}]),
+    ]
 
-    return messages
+    if summary:
+        parts.append(PromptPart(HISTORY, [{
+            "role": "system",
+            "content": f"==== EARLIER CONVERSATION (SUMMARY) ====\n{summary}\n==== END SUMMARY ====",
+        }]))
 
+    # Add the recent chat history, one part per turn
+    chat_history = list(chat_history)
+    for i, msg in enumerate(chat_history):
+        priority = RECENT_TURNS if i >= len(chat_history) - RECENT_TURNS_KEPT else HISTORY
+        parts.append(PromptPart(priority, [
+            {"role": "user", "content": msg.user_query},
+            {"role": "assistant", "content": msg.bot_response},
+        ]))
 
+    if report_excerpts:
+        excerpts = "\n\n".join(f"[{i}] {chunk}" for i, chunk in enumerate(report_excerpts, 1))
+        parts.append(PromptPart(REPORT_EXCERPTS, [{
+            "role": "system",
+            "content": (
+                "==== REPORT EXCERPTS (original document text relevant to the next question) ====\n"
+                f"{excerpts}\n"
+                "==== END REPORT EXCERPTS ===="
+            ),
+        }]))
 
+    return parts
@@ -1,11 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException,Query
+from fastapi import APIRouter, Depends, HTTPException,Query,Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from uuid import UUID
 from database.gets import get_db
+from database.settings import AsyncSessionLocal
 from src.auth.dependency import get_current_user
-from .schema import CreateChatRequest, CreateChatResponse,RecentChatResponse,ChatHistory,ChatHistoryResponse,ContinueChatRequest,MessageResponse,RenameChatRequest,ChatDeleteRequest
-from .manager import create_chat,recent_chat,chat_history,continue_chat,rename_chat,delete_chat
+from .schema import CreateChatRequest, CreateChatResponse,RecentChatResponse,ChatHistory,ChatHistoryResponse,ContinueChatRequest,MessageResponse,RenameChatRequest,ChatDeleteRequest,SuggestedQuestionsResponse
+from .manager import create_chat,recent_chat,chat_history,continue_chat,stream_continue_chat,rename_chat,delete_chat
+from .faq import get_suggested_questions
+from src.llm.disconnect import run_until_disconnect
 from typing import Optional
+import json
 
 chat_router = APIRouter(tags=["Chat"])
 
@@ -32,24 +37,72 @@ async def create_chat_api(
     except Exception as e:
         raise HTTPException(500, f"Chat creation failed: {str(e)}")
     
+async def stream_chat_events(payload: ContinueChatRequest, user_id: UUID):
+    """
+    NDJSON stream: one {"event": "delta", "data": <text>} line per piece of
+    the answer, then {"event": "done", "data": <MessageResponse>} once the
+    message is stored. Errors are sent as {"event": "error", ...}.
+    """
+    # The request-scoped session may be closed before the stream finishes
+    async with AsyncSessionLocal() as session:
+        try:
+            async for event, value in stream_continue_chat(payload, session, user_id):
+                if event == "message":
+                    data = MessageResponse.model_validate(value, from_attributes=True).model_dump(mode="json")
+                    yield json.dumps({"event": "done", "data": data}) + "\n"
+                else:
+                    yield json.dumps({"event": event, "data": value}) + "\n"
+
+        except HTTPException as e:
+            yield json.dumps({"event": "error", "status_code": e.status_code, "detail": e.detail}) + "\n"
+        except Exception as e:
+            yield json.dumps({"event": "error", "status_code": 500, "detail": f"Chat failed: {str(e)}"}) + "\n"
+
 @chat_router.post("/continue-chat", response_model=MessageResponse)
 async def continue_chat_api(
     payload: ContinueChatRequest,
+    request: Request,
+    stream: bool = Query(False, description="Stream the answer as NDJSON while it is generated"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
     user_id = current_user.user_id
-    msg = await continue_chat(payload, db,user_id)
+
+    if stream:
+        return StreamingResponse(
+            stream_chat_events(payload, user_id),
+            media_type="application/x-ndjson",
+        )
+
+    # An answer nobody receives has no value: cancel it on disconnect
+    msg = await run_until_disconnect(request, continue_chat(payload, db, user_id), "chat.continue")
     return msg
     
+@chat_router.get("/suggested-questions/{file_id}", response_model=SuggestedQuestionsResponse)
+async def suggested_questions_api(
+    file_id: UUID,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Questions precomputed after analysis (empty until they are generated)."""
+    try:
+        questions = await get_suggested_questions(db, current_user.user_id, file_id)
+        return {"file_id": file_id, "questions": questions}
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error fetching suggested questions: {str(e)}")
+
 @chat_router.post("/chat-history/{chat_id}",response_model=ChatHistoryResponse)
 async def chat_history_api(
     chat_id: UUID,
+    cursor: Optional[str] = Query(None, description="next_cursor of the previous page"),
+    limit: int = Query(50, ge=1, le=200),
     db: AsyncSession = Depends(get_db),
     current_user = Depends(get_current_user)
 ):
     try:
-        history = await chat_history(db, chat_id)
+        history = await chat_history(db, chat_id, cursor, limit)
         return history
     
     except HTTPException:
@@ -79,12 +132,16 @@ async def rename_chat_api(
 async def recent_chat_api(
     db:AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
-    search:Optional[str]=Query(None,description="Search Chat by Chat Name")
+    search:Optional[str]=Query(None,description="Search Chat by Chat Name"),
+    cursor:Optional[str]=Query(None,description="next_cursor of the previous page"),
+    limit:int=Query(20,ge=1,le=100)
 ):
     try:
         user_id = current_user.user_id
-        chats = await recent_chat(db,user_id,search)
-        return {"chats": chats}
+        chats, next_cursor = await recent_chat(db,user_id,search,cursor,limit)
+        return {"chats": chats, "next_cursor": next_cursor}
+    except HTTPException:
+        raise
     except ValueError as e:
         raise HTTPException(status_code=404,detail=str(e))
     except Exception as e:
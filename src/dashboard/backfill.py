@@ -0,0 +1,135 @@
+"""
+Backfill biomarker_observation from existing blood test dashboards.
+
+Usage:
+    python -m src.dashboard.backfill [--batch-size 200]
+
+Walks dashboards in dashboard_id order (keyset pagination), re-evaluates each
+biomarkerChart with the local reference engine and replaces that report's
+observations; then does the same from key_findings for analyzed blood test
+reports that have no dashboard. Observations are dated by the report's test
+date when one is known. Safe to re-run; run it again after changes to the
+reference engine.
+"""
+
+import argparse
+import asyncio
+from sqlalchemy import select
+from database.settings import AsyncSessionLocal, engine
+from database.models import *
+from src.dashboard.reference import evaluate_biomarkers
+from src.dashboard.observations import replace_observations, observation_time, biomarkers_from_key_findings
+
+
+async def backfill(batch_size: int = 200):
+    last_id = None
+    dashboards_done = 0
+    observations_done = 0
+
+    while True:
+        async with AsyncSessionLocal() as session:
+            query = (
+                select(
+                    Dashboard.dashboard_id,
+                    Dashboard.user_id,
+                    Dashboard.report_id,
+                    Dashboard.top_bar,
+                    Dashboard.middle_section,
+                    Dashboard.created_at,
+                    Report.uploaded_at,
+                    Report.insights,
+                )
+                .join(Report, Report.report_id == Dashboard.report_id)
+                .where(Dashboard.dashboard_type == "blood_test")
+                .order_by(Dashboard.dashboard_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(Dashboard.dashboard_id > last_id)
+
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+
+            for row in rows:
+                chart = (row.middle_section or {}).get("biomarkerChart") or []
+                report_date = (
+                    (row.top_bar or {}).get("reportDate")
+                    or ((row.insights or {}).get("analysis") or {}).get("report_date")
+                )
+                observations_done += await replace_observations(
+                    session,
+                    row.user_id,
+                    row.report_id,
+                    observation_time(report_date, row.uploaded_at or row.created_at),
+                    evaluate_biomarkers(chart),
+                )
+                dashboards_done += 1
+
+            await session.commit()
+            last_id = rows[-1].dashboard_id
+            print(f"Backfilled {dashboards_done} dashboards ({observations_done} observations)")
+
+    print(f"Done: {dashboards_done} dashboards, {observations_done} observations")
+
+
+async def backfill_undashboarded_reports(batch_size: int = 200):
+    last_id = None
+    reports_done = 0
+    observations_done = 0
+
+    while True:
+        async with AsyncSessionLocal() as session:
+            query = (
+                select(
+                    Report.report_id,
+                    Report.user_id,
+                    Report.key_findings,
+                    Report.insights,
+                    Report.uploaded_at,
+                )
+                .join(ReportType, ReportType.report_type_id == Report.report_type_id)
+                .outerjoin(Dashboard, Dashboard.report_id == Report.report_id)
+                .where(ReportType.name.ilike("%blood%"), Dashboard.dashboard_id.is_(None))
+                .order_by(Report.report_id)
+                .limit(batch_size)
+            )
+            if last_id is not None:
+                query = query.where(Report.report_id > last_id)
+
+            rows = (await session.execute(query)).all()
+            if not rows:
+                break
+
+            for row in rows:
+                analysis = (row.insights or {}).get("analysis") or {}
+                observations_done += await replace_observations(
+                    session,
+                    row.user_id,
+                    row.report_id,
+                    observation_time(analysis.get("report_date"), row.uploaded_at),
+                    biomarkers_from_key_findings(row.key_findings),
+                )
+                reports_done += 1
+
+            await session.commit()
+            last_id = rows[-1].report_id
+            print(f"Backfilled {reports_done} reports without dashboard ({observations_done} observations)")
+
+    print(f"Done: {reports_done} reports without dashboard, {observations_done} observations")
+
+
+async def main(batch_size: int):
+    # One event loop for both passes: pooled connections are bound to it
+    try:
+        await backfill(batch_size)
+        await backfill_undashboarded_reports(batch_size)
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill biomarker observations from dashboards")
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+    asyncio.run(main(args.batch_size))
@@ -0,0 +1,66 @@
+"""
+Benchmark dashboard generation: single LLM call vs parallel per-section calls.
+
+Usage:
+    python -m src.dashboard.benchmark <file_id> [--runs 3]
+
+Runs both paths against the same analyzed report without persisting anything
+and prints wall-clock timings. The parallel path should take roughly as long
+as its slowest section rather than the sum of all sections.
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from uuid import UUID
+from sqlalchemy import select
+from database.settings import AsyncSessionLocal
+from database.models import *
+from src.dashboard.manager import (
+    DASHBOARD_SECTIONS,
+    get_dashboard_type,
+    prepare_prompt,
+    extract_dashboard_data_from_llm,
+    generate_sections_parallel,
+)
+
+
+async def benchmark(file_id: UUID, runs: int):
+    async with AsyncSessionLocal() as session:
+        report = await session.scalar(select(Report).where(Report.report_id == file_id))
+        if not report:
+            raise SystemExit(f"Report {file_id} not found")
+
+        report_type = await session.get(ReportType, report.report_type_id)
+        dashboard_type = get_dashboard_type(report_type.name.lower())
+
+    single, parallel = [], []
+
+    for run in range(1, runs + 1):
+        started_at = time.perf_counter()
+        messages, _ = prepare_prompt(report_type.name.lower(), report)
+        await extract_dashboard_data_from_llm(messages, dashboard_type)
+        single.append(time.perf_counter() - started_at)
+
+        started_at = time.perf_counter()
+        section_times = {}
+        async for section, _ in generate_sections_parallel(report, dashboard_type, DASHBOARD_SECTIONS):
+            section_times[section] = time.perf_counter() - started_at
+        parallel.append(time.perf_counter() - started_at)
+
+        print(
+            f"run {run}: single={single[-1]:.2f}s parallel={parallel[-1]:.2f}s "
+            + " ".join(f"{k}={v:.2f}s" for k, v in section_times.items())
+        )
+
+    print(f"single   median={statistics.median(single):.2f}s mean={statistics.mean(single):.2f}s")
+    print(f"parallel median={statistics.median(parallel):.2f}s mean={statistics.mean(parallel):.2f}s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark dashboard generation paths")
+    parser.add_argument("file_id", type=UUID)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(benchmark(args.file_id, args.runs))
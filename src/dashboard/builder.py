@@ -0,0 +1,329 @@
+"""
+Deterministic dashboard builder.
+
+Maps an already-analyzed Report (summary, key_findings, recommendations and
+insights["medications"]) straight to the dashboard schema, so the structural
+parts of a dashboard never need a second LLM round trip. Only narrative
+fields that are still empty are reported as missing. A blood test's
+criticalInsights are derived after validation (finish_built_dashboard) from
+the evaluated biomarkers, so they agree with the chart and topBar. A
+prescription's safetyInformation is never in the analysis, so prescription
+dashboards always make the (narrative-only) LLM call for it.
+"""
+
+import re
+from datetime import datetime, timezone
+from database.models.report import Report
+from src.dashboard.reference import to_float
+
+# Narrative fields that may be missing from what the stored analysis yields
+NARRATIVE_FIELDS = {
+    "prescription": ["recommendations", "criticalInsights", "safetyInformation"],
+    "blood_test": ["recommendations"],
+}
+
+MAX_CRITICAL_INSIGHTS = 3
+
+# Test dates as printed or extracted; day-first as on Indian lab reports
+REPORT_DATE_FORMATS = ("%Y-%m-%d", "%d/%m/%Y", "%d-%m-%Y", "%d.%m.%Y", "%d-%b-%Y", "%d %b %Y", "%d %B %Y", "%B %d, %Y")
+
+# Higher = more critical
+STATUS_SEVERITY = {
+    "normal": 0,
+    "slightly low": 1,
+    "slightly elevated": 1,
+    "slightly high": 1,
+    "low": 2,
+    "high": 2,
+    "elevated": 2,
+    "abnormal": 2,
+    "critical": 3,
+}
+
+DISPLAY_STATUS = {
+    "normal": "Normal",
+    "slightly low": "Low",
+    "low": "Low",
+    "slightly elevated": "High",
+    "slightly high": "High",
+    "high": "High",
+    "elevated": "High",
+    "abnormal": "Abnormal",
+    "critical": "Critical",
+}
+
+PLACEHOLDERS = {"", "not specified", "none", "null", "n/a", "na", "unknown", "not available"}
+
+CHOLESTEROL_MARKERS = ("cholesterol", "ldl", "hdl", "triglyceride", "vldl")
+
+# "14.5 g/dL (Normal)", "150,000 /cumm (Normal)", "7.2 10^3/µL". A unit
+# starting with "/<digit>" is a second value ("128/82 mmHg"), not a unit.
+FINDING_PATTERN = re.compile(
+    r"^\s*(?P<value>-?\d+(?:[.,]\d+)*)(?![\d.,])\s*(?P<unit>(?!/\s*\d)[^()]*?)\s*(?:\((?P<status>[^)]*)\))?\s*$"
+)
+STATUS_PATTERN = re.compile(r"\(([^)]*)\)\s*$")
+
+
+def is_placeholder(value) -> bool:
+    return value is None or str(value).strip().lower() in PLACEHOLDERS
+
+
+def parse_finding(name: str, raw) -> dict:
+    """Parse one key_findings entry into a biomarker dict (value may be None)."""
+    text = str(raw).strip()
+    match = FINDING_PATTERN.match(text)
+    value = to_float(match.group("value")) if match else None
+
+    if value is not None:
+        unit = match.group("unit").strip()
+        status = (match.group("status") or "").strip()
+    else:
+        # Non-numeric values such as "128/82 mmHg (Elevated)" still carry a status
+        value, unit = None, ""
+        status_match = STATUS_PATTERN.search(text)
+        status = status_match.group(1).strip() if status_match else ""
+
+    status_key = status.lower()
+    return {
+        "testName": name,
+        "currentValue": value,
+        "unit": unit,
+        "status": DISPLAY_STATUS.get(status_key, status.title() if status else "Normal"),
+        "severity": STATUS_SEVERITY.get(status_key, 0),
+    }
+
+
+def analysis_is_usable(report: Report) -> bool:
+    """True when the report holds a successful analysis we can build from."""
+    key_findings = report.key_findings
+    if not isinstance(key_findings, dict) or not key_findings:
+        return False
+    # analyze_report stores {"error": ...} when the LLM call failed
+    return "error" not in key_findings
+
+
+def parse_report_date(text):
+    """The date printed on a report as a UTC datetime, or None."""
+    if is_placeholder(text):
+        return None
+    text = str(text).strip()
+    for date_format in REPORT_DATE_FORMATS:
+        try:
+            return datetime.strptime(text, date_format).replace(tzinfo=timezone.utc)
+        except ValueError:
+            continue
+    return None
+
+
+def analysis_report_date(report: Report):
+    """The test date the analysis extracted from the document, or None."""
+    analysis = (report.insights or {}).get("analysis") or {}
+    return parse_report_date(analysis.get("report_date"))
+
+
+def report_date(report: Report):
+    tested_at = analysis_report_date(report) or report.uploaded_at
+    return tested_at.date().isoformat() if tested_at else None
+
+
+def clean_recommendations(report: Report) -> list:
+    recommendations = report.recommendations
+    if not isinstance(recommendations, list):
+        return []
+    return [str(r).strip() for r in recommendations if not is_placeholder(r)]
+
+
+def one_line_insight(report: Report):
+    insight = (report.insights or {}).get("insights_one_line")
+    return None if is_placeholder(insight) else str(insight).strip()
+
+
+def blood_test_critical_insights(report: Report, biomarkers: list) -> list:
+    """
+    The most severe abnormal biomarkers by their evaluated status, then the
+    analysis' one-line insight. That insight was written against the
+    analysis' own statuses, so it is left out when the evaluation disagrees.
+    """
+    def severity(b):
+        return STATUS_SEVERITY.get(str(b.get("status", "")).lower(), 0)
+
+    abnormal = sorted((b for b in biomarkers if severity(b) > 0), key=lambda b: -severity(b))
+    insights = []
+    for b in abnormal[:MAX_CRITICAL_INSIGHTS - 1]:
+        measured = f" at {b['currentValue']:g} {b.get('unit') or ''}".rstrip() if b.get("currentValue") is not None else ""
+        insights.append(f"{b['testName']} is {b['status'].lower()}{measured}")
+
+    printed = {f["testName"]: f["status"] for f in (parse_finding(n, r) for n, r in report.key_findings.items())}
+    agrees = all(printed.get(b["testName"], b.get("status")) == b.get("status") for b in biomarkers)
+    insight = one_line_insight(report)
+    if insight and agrees:
+        insights.append(insight)
+    if not insights and biomarkers:
+        insights.append("All evaluated markers are within their reference ranges.")
+    return insights
+
+
+def prescription_critical_insights(report: Report) -> list:
+    insights = []
+    insight = one_line_insight(report)
+    if insight:
+        insights.append(insight)
+    follow_up = report.key_findings.get("Follow-up Required")
+    if not is_placeholder(follow_up):
+        insights.append(f"Follow-up: {str(follow_up).strip()}")
+    return insights
+
+
+def build_blood_test_dashboard(report: Report) -> dict:
+    findings = [parse_finding(name, raw) for name, raw in report.key_findings.items()]
+    abnormal = [f for f in findings if f["severity"] > 0]
+
+    if not findings:
+        overall_status = "Incomplete Data"
+    elif any(f["status"] == "Critical" for f in findings):
+        overall_status = "Critical"
+    elif abnormal:
+        overall_status = "Abnormal"
+    else:
+        overall_status = "Normal"
+
+    # max() keeps the first marker on ties, i.e. the order the analysis prioritized
+    most_critical = max(abnormal, key=lambda f: f["severity"])["testName"] if abnormal else None
+
+    biomarker_chart = [
+        {
+            "testName": f["testName"],
+            "currentValue": f["currentValue"],
+            "referenceMin": None,
+            "referenceMax": None,
+            "status": f["status"],
+            "unit": f["unit"],
+        }
+        for f in findings
+        if f["currentValue"] is not None
+    ]
+
+    cholesterol = [
+        {"name": b["testName"], "value": b["currentValue"], "unit": b["unit"], "status": b["status"]}
+        for b in biomarker_chart
+        if any(marker in b["testName"].lower() for marker in CHOLESTEROL_MARKERS)
+    ]
+
+    top_bar = {
+        "overallReportStatus": overall_status,
+        "abnormalValueCount": len(abnormal),
+        "mostCriticalMarker": most_critical or "No abnormal markers",
+        "reportDate": report_date(report),
+    }
+
+    return {
+        "topBar": {k: v for k, v in top_bar.items() if v is not None},
+        "middleSection": {
+            "biomarkerChart": biomarker_chart,
+            "cbcTrendChart": {
+                "note": "Single test result available. Regular monitoring recommended for trend analysis"
+            },
+            "cholesterolBreakdownChart": (
+                {"markers": cholesterol}
+                if cholesterol
+                else {"note": "Lipid panel not included. Consider cholesterol screening if not done recently"}
+            ),
+        },
+        "recommendations": clean_recommendations(report),
+    }
+
+
+def build_prescription_dashboard(report: Report) -> dict:
+    key_findings = report.key_findings
+    insights = report.insights or {}
+    medications = insights.get("medications") or []
+
+    medicines = []
+    for med in medications:
+        if not isinstance(med, dict) or is_placeholder(med.get("name")):
+            continue
+        medicines.append({
+            "name": med["name"].strip(),
+            "medicineInfo": {
+                k: v for k, v in {
+                    "strength": med.get("dosage"),
+                    "duration": med.get("duration"),
+                }.items() if not is_placeholder(v)
+            },
+            "dosageInstruction": {
+                k: v for k, v in {
+                    "frequency": med.get("frequency"),
+                    "timing": med.get("instructions"),
+                }.items() if not is_placeholder(v)
+            },
+        })
+
+    top_bar = {
+        "diagnosisTreatment": key_findings.get("Diagnosis"),
+        "medicationCount": len(medicines),
+        "followUpDate": key_findings.get("Follow-up Required"),
+        "treatmentDuration": key_findings.get("Treatment Duration"),
+    }
+
+    return {
+        "topBar": {k: v for k, v in top_bar.items() if not is_placeholder(v)},
+        "middleSection": {"medicines": medicines},
+        "recommendations": clean_recommendations(report),
+        "criticalInsights": prescription_critical_insights(report),
+    }
+
+
+def build_dashboard_from_analysis(report: Report, dashboard_type: str):
+    """
+    Build the dashboard dict (topBar / middleSection / recommendations /
+    criticalInsights) from the stored analysis. Returns None when the report
+    has no usable analysis and the full LLM path must be used instead.
+    """
+    if not analysis_is_usable(report):
+        return None
+
+    if dashboard_type == "blood_test":
+        return build_blood_test_dashboard(report)
+
+    if dashboard_type == "prescription":
+        return build_prescription_dashboard(report)
+
+    return None
+
+
+def finish_built_dashboard(dashboard: dict, report: Report, dashboard_type: str) -> dict:
+    """
+    Fields derived from the validated dashboard of a built (not LLM-extracted)
+    dashboard. Validation re-evaluates the biomarkers, so the blood test's
+    criticalInsights are taken from its biomarkerChart.
+    """
+    if dashboard_type == "blood_test":
+        biomarkers = dashboard.get("middleSection", {}).get("biomarkerChart") or []
+        dashboard["criticalInsights"] = blood_test_critical_insights(report, biomarkers)
+    return dashboard
+
+
+def missing_narrative_fields(dashboard: dict, dashboard_type: str) -> list:
+    """Narrative fields that are empty in the built dashboard."""
+    missing = []
+    for field in NARRATIVE_FIELDS.get(dashboard_type, []):
+        if field == "safetyInformation":
+            value = dashboard.get("middleSection", {}).get(field)
+        else:
+            value = dashboard.get(field)
+        if not value:
+            missing.append(field)
+    return missing
+
+
+def merge_narrative_fields(dashboard: dict, narrative: dict, fields: list) -> dict:
+    """Copy LLM-generated narrative fields into the built dashboard."""
+    for field in fields:
+        value = narrative.get(field)
+        if not value:
+            continue
+        if field == "safetyInformation":
+            dashboard.setdefault("middleSection", {})[field] = value
+        else:
+            dashboard[field] = value
+    return dashboard
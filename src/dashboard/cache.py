@@ -0,0 +1,65 @@
+"""
+In-process cache of serialized dashboard responses.
+
+Entries are keyed by report_id (a report has at most one dashboard) and
+tagged with the row's updated_at, so a changed dashboard is never served
+from a stale entry: the caller always looks up the current updated_at first,
+and only reads the large columns when its version is not the cached one.
+The cache is a bounded LRU; each worker process keeps its own.
+"""
+
+from collections import OrderedDict
+from datetime import datetime
+from threading import Lock
+from uuid import UUID
+import config
+import metrics
+
+_lock = Lock()
+_entries = OrderedDict()
+
+
+def build_etag(dashboard_id: UUID, updated_at: datetime) -> str:
+    return f'"{dashboard_id.hex}-{int(updated_at.timestamp() * 1_000_000)}"'
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match may be "*" or a comma separated list of (weak) tags."""
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    return "*" in tags or any(tag.removeprefix("W/") == etag for tag in tags)
+
+
+def get_cached_version(report_id: UUID):
+    """updated_at of the cached response for the report's dashboard, or None."""
+    with _lock:
+        entry = _entries.get(report_id)
+    return entry[0] if entry else None
+
+
+def get_cached_response(report_id: UUID, updated_at: datetime):
+    """Serialized response bytes for this dashboard version, or None."""
+    with _lock:
+        entry = _entries.get(report_id)
+        if entry is None or entry[0] != updated_at:
+            metrics.incr("dashboard_cache.miss")
+            return None
+        _entries.move_to_end(report_id)
+    metrics.incr("dashboard_cache.hit")
+    return entry[1]
+
+
+def store_cached_response(report_id: UUID, updated_at: datetime, body: bytes):
+    """Store (or replace the older version of) a dashboard response."""
+    with _lock:
+        _entries[report_id] = (updated_at, body)
+        _entries.move_to_end(report_id)
+        while len(_entries) > config.DASHBOARD_RESPONSE_CACHE_MAX_ENTRIES:
+            _entries.popitem(last=False)
+            metrics.incr("dashboard_cache.evicted")
+
+
+def invalidate_cached_response(report_id: UUID):
+    with _lock:
+        _entries.pop(report_id, None)
@@ -0,0 +1,76 @@
+from datetime import datetime, timezone
+from uuid import UUID
+from sqlalchemy import select, delete, insert
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.biomarker_observation import BiomarkerObservation
+from src.dashboard.builder import parse_finding, parse_report_date
+from src.dashboard.reference import evaluate_biomarkers, parse_number
+
+
+def biomarkers_from_key_findings(key_findings: dict) -> list:
+    """Turn analysis key_findings ("14.5 g/dL (Normal)") into evaluated biomarkers."""
+    if not isinstance(key_findings, dict) or "error" in key_findings:
+        return []
+    parsed = [parse_finding(name, raw) for name, raw in key_findings.items()]
+    return evaluate_biomarkers([p for p in parsed if p["currentValue"] is not None])
+
+
+def observation_time(report_date, fallback: datetime) -> datetime:
+    """When a report's values were measured: its printed test date, else the fallback (upload time)."""
+    return parse_report_date(report_date) or fallback or datetime.now(timezone.utc)
+
+
+async def replace_observations(
+    db: AsyncSession,
+    user_id: UUID,
+    report_id: UUID,
+    observed_at: datetime,
+    biomarkers: list,
+):
+    """
+    Replace the stored observations of a report with the given (evaluated)
+    biomarkers. Does not commit; the caller owns the transaction.
+    """
+    rows = []
+    for bio in biomarkers:
+        value = parse_number(bio.get("currentValue"))
+        if value is None or not bio.get("testName"):
+            continue
+        rows.append({
+            "user_id": user_id,
+            "report_id": report_id,
+            "marker_code": bio.get("markerCode") or bio["testName"],
+            "marker_name": bio["testName"],
+            "value": value,
+            "unit": bio.get("unit"),
+            "status": bio.get("status"),
+            "observed_at": observed_at or datetime.now(timezone.utc),
+        })
+
+    await db.execute(delete(BiomarkerObservation).where(BiomarkerObservation.report_id == report_id))
+    if rows:
+        await db.execute(insert(BiomarkerObservation), rows)
+
+    return len(rows)
+
+
+async def get_marker_trend(db: AsyncSession, user_id: UUID, marker_code: str, limit: int = 100):
+    """History of one marker for a user, oldest first (index range scan)."""
+    result = await db.execute(
+        select(
+            BiomarkerObservation.report_id,
+            BiomarkerObservation.marker_name,
+            BiomarkerObservation.value,
+            BiomarkerObservation.unit,
+            BiomarkerObservation.status,
+            BiomarkerObservation.observed_at,
+        )
+        .where(
+            BiomarkerObservation.user_id == user_id,
+            BiomarkerObservation.marker_code == marker_code,
+        )
+        .order_by(BiomarkerObservation.observed_at.desc())
+        .limit(limit)
+    )
+    # Fetched newest-first so limit keeps the latest points; return chronologically
+    return list(reversed(result.all()))
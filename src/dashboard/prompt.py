@@ -1,5 +1,31 @@
+# The templates below are fully static: the report text is sent as a separate,
+# trailing user message so the system prompt forms a byte-identical prefix that
+# the OpenAI prompt cache can reuse across dashboards.
+
+DASHBOARD_SYSTEM_PROMPTS = {
+    "prescription": (
+        "You are a medical prescription analysis expert. "
+        "Extract ONLY real data from prescriptions. "
+        "NEVER use placeholders like 'Medicine 1', 'Not specified', 'As prescribed'. "
+        "Return EXACTLY 4 metrics in topBar. "
+        "If data is missing, omit the field entirely."
+    ),
+    "blood_test": (
+        "You are a blood report analysis expert. "
+        "Extract ALL biomarkers with actual values. "
+        "Copy each value, unit and reference range exactly as printed; "
+        "biomarker status is computed by the system, do not calculate it. "
+        "Return EXACTLY 4 metrics in topBar."
+    ),
+}
+
+DASHBOARD_INPUT_HEADERS = {
+    "prescription": "### INPUT PRESCRIPTION TEXT:",
+    "blood_test": "### INPUT BLOOD REPORT TEXT:",
+}
+
 PROMPT_MEDICAL_PRESCRIPTION = """
-You are an advanced medical prescription analysis system. Extract REAL data from the prescription provided below.
+You are an advanced medical prescription analysis system. Extract REAL data from the prescription provided in the user message.
 
 ### CRITICAL INSTRUCTIONS:
 1. Extract ACTUAL information from the prescription text - prioritize real data
@@ -188,9 +214,6 @@ Step 4: Add generic but helpful recommendations to reach minimum 3-4 items
 - "Store medications properly according to package instructions"
 - "Inform your doctor of all medications, supplements, and allergies"
 
-### INPUT PRESCRIPTION TEXT:
-{report_text}
-
 REMEMBER: 
 - Extract REAL data when available
 - Recommendations array MUST have 3-4 items minimum
@@ -200,7 +223,7 @@ REMEMBER:
 """
 
 PROMPT_BLOOD_REPORT = """
-You are an advanced blood report analysis system. Extract REAL data from the blood test report provided below.
+You are an advanced blood report analysis system. Extract REAL data from the blood test report provided in the user message.
 
 ### CRITICAL INSTRUCTIONS:
 1. Extract ACTUAL test values from the blood report
@@ -221,7 +244,7 @@ You are an advanced blood report analysis system. Extract REAL data from the blo
 ### MIDDLE SECTION:
 
 **Biomarker Chart:**
-- If biomarkers found → Extract all with actual values
+- If biomarkers found → Extract all with actual values, units and printed reference ranges (no status needed)
 - If limited data → Include available markers and note "Additional tests recommended for comprehensive analysis"
 
 **Trend Chart:**
@@ -341,7 +364,6 @@ Always provide 3-4 actionable tips:
         "currentValue": 12.5,
         "referenceMin": 13.5,
         "referenceMax": 17.5,
-        "status": "Low",
         "unit": "g/dL"
       }
     ],
@@ -393,9 +415,6 @@ Step 4: Include general wellness tips to reach minimum 3-4 items
 - "Keep a detailed health journal tracking symptoms, diet, and lifestyle factors"
 - "Discuss potential underlying causes with your doctor for comprehensive evaluation"
 
-### INPUT BLOOD REPORT TEXT:
-{report_text}
-
 REMEMBER:
 - Analyze ALL biomarkers to provide targeted recommendations
 - Recommendations array MUST have 3-4 items minimum
@@ -403,4 +422,101 @@ REMEMBER:
 - Include both immediate actions and long-term lifestyle changes
 - Never return empty recommendations array
 - Prioritize actionable, evidence-based advice
-"""
\ No newline at end of file
+"""
+# Used when the dashboard is built locally from the stored analysis and only
+# some narrative fields are missing. Static, so it forms a cacheable prefix; the
+# requested fields and the report data are sent in the user message.
+PROMPT_DASHBOARD_NARRATIVE = """
+You are a medical report assistant writing the narrative parts of a patient dashboard.
+The structured data (metrics, biomarkers, medicines) has already been extracted.
+Write ONLY the fields listed under "REQUESTED FIELDS" in the user message, based on the report data provided there.
+
+### FIELD DEFINITIONS:
+- "recommendations": array of 3-4 specific, actionable recommendations tied to the findings
+  (dietary, lifestyle, follow-up). Avoid generic advice like "Take all medications as prescribed".
+- "criticalInsights": array of 2-3 insights explaining the health implications of the findings.
+  If everything is normal, give preventive insights.
+- "safetyInformation": object with three arrays of short strings:
+  "dietaryRestrictions", "lifestyleRecommendations", "drugInteractions".
+
+### RULES:
+- Return ONLY a JSON object whose keys are exactly the requested fields.
+- Never use placeholders such as "Not specified" or "As prescribed".
+- Keep every item to one sentence.
+"""
+
+# Focused per-section prompts. Each one asks for a single top-level key so the
+# sections can be generated concurrently and assembled by validate_dashboard_data;
+# generation time is then bounded by the largest section instead of their sum.
+SECTION_PROMPTS = {
+    "prescription": {
+        "topBar": """
+You are a medical prescription analysis expert. From the prescription data in the user message,
+return ONLY: {"topBar": {...}} with EXACTLY 4 of these metrics, in this priority order:
+- "diagnosisTreatment": diagnosis/condition being treated
+- "medicationCount": number of medicines actually prescribed (integer)
+- "prescriptionDate" or "followUpDate": YYYY-MM-DD, whichever is available
+- "treatmentDuration" or "prescribingDoctorInfo": whichever is available
+Use only real data. Omit a metric rather than using placeholders like "Not specified".
+""",
+        "middleSection": """
+You are a medical prescription analysis expert. From the prescription data in the user message,
+return ONLY: {"middleSection": {"medicines": [...], "safetyInformation": {...}}}
+Each medicine:
+{"name": "...", "medicineInfo": {"strength": "...", "form": "...", "duration": "...", "purpose": "..."},
+ "dosageInstruction": {"frequency": "...", "amount": "...", "timing": "..."},
+ "sideEffects": "...", "warnings": "..."}
+safetyInformation: {"dietaryRestrictions": [...], "lifestyleRecommendations": [...], "drugInteractions": [...]}
+- Extract real medicine names; never use "Medicine 1", "As prescribed" or "Not specified".
+- Omit unknown fields. Safety items are short, practical sentences relevant to the diagnosis.
+""",
+        "safetyInformation": """
+You are a medical prescription analysis expert. From the prescription data in the user message,
+return ONLY: {"safetyInformation": {"dietaryRestrictions": [...], "lifestyleRecommendations": [...], "drugInteractions": [...]}}
+- Extract instructions mentioned in the prescription first; otherwise give general advice relevant to the diagnosis.
+- 2-3 short, practical sentences per list. No placeholders.
+""",
+        "recommendations": """
+You are a medical prescription analysis expert. From the prescription data in the user message,
+return ONLY: {"recommendations": [...]} with 3-4 specific, actionable recommendations.
+- Prefer explicit instructions from the prescription (e.g. take with food, complete the course, follow-up date).
+- Add condition-specific advice (antibiotics, pain/fever, chronic, respiratory, skin) to reach 3-4 items.
+- Avoid generic items like "Take all medications as prescribed" or "Consult healthcare provider".
+""",
+        "criticalInsights": """
+You are a medical prescription analysis expert. From the prescription data in the user message,
+return ONLY: {"criticalInsights": [...]} with 2-3 one-sentence insights about the treatment:
+its clinical intent, what adherence achieves, and when to seek follow-up. No placeholders.
+""",
+    },
+    "blood_test": {
+        "topBar": """
+You are a blood report analysis expert. From the blood report data in the user message,
+return ONLY: {"topBar": {"overallReportStatus": "Normal|Abnormal|Critical|Incomplete Data",
+"abnormalValueCount": <integer>, "mostCriticalMarker": "<marker name>", "reportDate": "YYYY-MM-DD"}}
+Use only real data from the report.
+""",
+        "middleSection": """
+You are a blood report analysis expert. From the blood report data in the user message,
+return ONLY: {"middleSection": {"biomarkerChart": [...], "cbcTrendChart": {...}, "cholesterolBreakdownChart": {...}}}
+- biomarkerChart: every biomarker as {"testName": "...", "currentValue": <number>, "unit": "...",
+  "referenceMin": <number|null>, "referenceMax": <number|null>}. Copy values, units and ranges exactly
+  as printed; status is computed by the system.
+- cbcTrendChart: trend data if historical values exist, else
+  {"note": "Single test result available. Regular monitoring recommended for trend analysis"}
+- cholesterolBreakdownChart: lipid values if present, else
+  {"note": "Lipid panel not included. Consider cholesterol screening if not done recently"}
+""",
+        "recommendations": """
+You are a blood report analysis expert. From the blood report data in the user message,
+return ONLY: {"recommendations": [...]} with 3-4 specific, actionable recommendations targeted at the
+abnormal biomarkers (diet, activity, follow-up testing). If everything is normal, give preventive advice.
+Avoid generic items like "Consult healthcare provider".
+""",
+        "criticalInsights": """
+You are a blood report analysis expert. From the blood report data in the user message,
+return ONLY: {"criticalInsights": [...]} with 2-3 one-sentence insights explaining the health
+implications and urgency of abnormal values, or a preventive message if all values are normal.
+""",
+    },
+}
@@ -0,0 +1,413 @@
+"""
+Local reference-range evaluation engine for blood biomarkers.
+
+- Resolves biomarker names to canonical marker codes (aliases table).
+- Parses values, units and printed reference ranges ("13.5-17.5", "<200", ">40").
+  A comma followed by exactly three digits is a thousands separator
+  ("150,000"); any other comma between digits is a decimal comma ("7,2").
+- Converts values and ranges to each marker's canonical unit (conversion table).
+- Computes Low / Normal / High / Critical for all markers at once with NumPy.
+
+Ranges printed on the report win over the default adult ranges below. Default
+ranges and critical limits only come from the table, and only when the marker
+name matched an alias exactly and the unit is known (or, for default ranges,
+absent). A marker in an unknown unit is evaluated against its printed range
+only, or keeps the status it came with.
+"""
+
+import re
+import numpy as np
+
+# code: canonical unit, default reference range, critical limits, name aliases
+MARKERS = {
+    "hemoglobin": {
+        "unit": "g/dL", "range": (12.0, 17.5), "critical": (7.0, 20.0),
+        "aliases": ["hemoglobin", "haemoglobin", "hb", "hgb"],
+    },
+    "wbc": {
+        "unit": "10^3/µL", "range": (4.0, 11.0), "critical": (2.0, 30.0),
+        "aliases": [
+            "white blood cells", "white blood cell count", "wbc", "total leukocyte count", "total leucocyte count",
+            "tlc", "leukocytes",
+        ],
+    },
+    "rbc": {
+        "unit": "10^6/µL", "range": (4.2, 5.9), "critical": (None, None),
+        "aliases": ["red blood cells", "red blood cell count", "rbc", "erythrocytes"],
+    },
+    "platelets": {
+        "unit": "10^3/µL", "range": (150.0, 450.0), "critical": (50.0, 1000.0),
+        "aliases": ["platelets", "platelet count", "plt"],
+    },
+    "hematocrit": {
+        "unit": "%", "range": (36.0, 52.0), "critical": (20.0, 60.0),
+        "aliases": ["hematocrit", "haematocrit", "hct", "pcv", "packed cell volume"],
+    },
+    "mcv": {
+        "unit": "fL", "range": (80.0, 100.0), "critical": (None, None),
+        "aliases": ["mcv", "mean corpuscular volume"],
+    },
+    "mch": {
+        "unit": "pg", "range": (27.0, 33.0), "critical": (None, None),
+        "aliases": ["mch", "mean corpuscular hemoglobin", "mean corpuscular haemoglobin"],
+    },
+    "mchc": {
+        "unit": "g/dL", "range": (32.0, 36.0), "critical": (None, None),
+        "aliases": [
+            "mchc", "mean corpuscular hemoglobin concentration", "mean corpuscular haemoglobin concentration",
+        ],
+    },
+    "glucose": {
+        "unit": "mg/dL", "range": (70.0, 99.0), "critical": (40.0, 400.0),
+        "aliases": ["glucose", "fasting glucose", "blood sugar", "fasting blood sugar", "fbs"],
+    },
+    "hba1c": {
+        "unit": "%", "range": (4.0, 5.6), "critical": (None, 14.0),
+        "aliases": ["hba1c", "hemoglobin a1c", "glycated hemoglobin", "glycosylated hemoglobin", "a1c"],
+    },
+    "total_cholesterol": {
+        "unit": "mg/dL", "range": (0.0, 200.0), "critical": (None, None),
+        "aliases": ["total cholesterol", "cholesterol", "serum cholesterol"],
+    },
+    "ldl": {
+        "unit": "mg/dL", "range": (0.0, 100.0), "critical": (None, None),
+        "aliases": ["ldl", "ldl cholesterol", "low density lipoprotein"],
+    },
+    "hdl": {
+        "unit": "mg/dL", "range": (40.0, None), "critical": (None, None),
+        "aliases": ["hdl", "hdl cholesterol", "high density lipoprotein"],
+    },
+    "non_hdl": {
+        "unit": "mg/dL", "range": (0.0, 130.0), "critical": (None, None),
+        "aliases": ["non hdl", "non hdl cholesterol"],
+    },
+    "triglycerides": {
+        "unit": "mg/dL", "range": (0.0, 150.0), "critical": (None, 1000.0),
+        "aliases": ["triglycerides", "triglyceride", "tg"],
+    },
+    "creatinine": {
+        "unit": "mg/dL", "range": (0.6, 1.3), "critical": (None, 10.0),
+        "aliases": ["creatinine", "serum creatinine"],
+    },
+    "bun": {
+        "unit": "mg/dL", "range": (7.0, 20.0), "critical": (None, 100.0),
+        "aliases": ["bun", "blood urea nitrogen", "urea nitrogen"],
+    },
+    "alt": {
+        "unit": "U/L", "range": (7.0, 56.0), "critical": (None, 1000.0),
+        "aliases": ["alt", "sgpt", "alanine aminotransferase"],
+    },
+    "ast": {
+        "unit": "U/L", "range": (10.0, 40.0), "critical": (None, 1000.0),
+        "aliases": ["ast", "sgot", "aspartate aminotransferase"],
+    },
+    "tsh": {
+        "unit": "mIU/L", "range": (0.4, 4.0), "critical": (None, None),
+        "aliases": ["tsh", "thyroid stimulating hormone"],
+    },
+    "sodium": {
+        "unit": "mmol/L", "range": (135.0, 145.0), "critical": (120.0, 160.0),
+        "aliases": ["sodium", "serum sodium"],
+    },
+    "potassium": {
+        "unit": "mmol/L", "range": (3.5, 5.1), "critical": (2.5, 6.5),
+        "aliases": ["potassium", "serum potassium"],
+    },
+    "vitamin_d": {
+        "unit": "ng/mL", "range": (30.0, 100.0), "critical": (None, 150.0),
+        "aliases": ["vitamin d", "25 oh vitamin d", "25 hydroxy vitamin d", "vit d"],
+    },
+    "vitamin_b12": {
+        "unit": "pg/mL", "range": (200.0, 900.0), "critical": (None, None),
+        "aliases": ["vitamin b12", "vit b12", "cobalamin"],
+    },
+    "ferritin": {
+        "unit": "ng/mL", "range": (20.0, 300.0), "critical": (None, None),
+        "aliases": ["ferritin", "serum ferritin"],
+    },
+}
+
+# code: {normalized unit: (factor, offset)} -> canonical = value * factor + offset
+UNIT_CONVERSIONS = {
+    "hemoglobin": {"g/dl": (1.0, 0.0), "g/l": (0.1, 0.0), "mmol/l": (1.611, 0.0)},
+    "wbc": {
+        "10^3/ul": (1.0, 0.0), "k/ul": (1.0, 0.0), "10^9/l": (1.0, 0.0), "thou/ul": (1.0, 0.0),
+        "/ul": (0.001, 0.0), "cells/ul": (0.001, 0.0), "/cumm": (0.001, 0.0), "cells/cumm": (0.001, 0.0),
+    },
+    "rbc": {"10^6/ul": (1.0, 0.0), "m/ul": (1.0, 0.0), "10^12/l": (1.0, 0.0), "million/ul": (1.0, 0.0), "mill/cumm": (1.0, 0.0)},
+    "platelets": {
+        "10^3/ul": (1.0, 0.0), "k/ul": (1.0, 0.0), "10^9/l": (1.0, 0.0), "thou/ul": (1.0, 0.0),
+        "/ul": (0.001, 0.0), "/cumm": (0.001, 0.0), "lakh/cumm": (100.0, 0.0), "lakhs/cumm": (100.0, 0.0),
+    },
+    "hematocrit": {"%": (1.0, 0.0), "l/l": (100.0, 0.0)},
+    "mcv": {"fl": (1.0, 0.0)},
+    "mch": {"pg": (1.0, 0.0)},
+    "mchc": {"g/dl": (1.0, 0.0), "g/l": (0.1, 0.0)},
+    "glucose": {"mg/dl": (1.0, 0.0), "mmol/l": (18.016, 0.0)},
+    "hba1c": {"%": (1.0, 0.0), "mmol/mol": (0.0915, 2.15)},
+    "total_cholesterol": {"mg/dl": (1.0, 0.0), "mmol/l": (38.67, 0.0)},
+    "ldl": {"mg/dl": (1.0, 0.0), "mmol/l": (38.67, 0.0)},
+    "hdl": {"mg/dl": (1.0, 0.0), "mmol/l": (38.67, 0.0)},
+    "non_hdl": {"mg/dl": (1.0, 0.0), "mmol/l": (38.67, 0.0)},
+    "triglycerides": {"mg/dl": (1.0, 0.0), "mmol/l": (88.57, 0.0)},
+    "creatinine": {"mg/dl": (1.0, 0.0), "umol/l": (0.01131, 0.0)},
+    "bun": {"mg/dl": (1.0, 0.0), "mmol/l": (2.8, 0.0)},
+    "alt": {"u/l": (1.0, 0.0), "iu/l": (1.0, 0.0)},
+    "ast": {"u/l": (1.0, 0.0), "iu/l": (1.0, 0.0)},
+    "tsh": {"miu/l": (1.0, 0.0), "uiu/ml": (1.0, 0.0), "miu/ml": (1000.0, 0.0)},
+    "sodium": {"mmol/l": (1.0, 0.0), "meq/l": (1.0, 0.0)},
+    "potassium": {"mmol/l": (1.0, 0.0), "meq/l": (1.0, 0.0)},
+    "vitamin_d": {"ng/ml": (1.0, 0.0), "nmol/l": (0.4, 0.0)},
+    "vitamin_b12": {"pg/ml": (1.0, 0.0), "pmol/l": (1.355, 0.0)},
+    "ferritin": {"ng/ml": (1.0, 0.0), "ug/l": (1.0, 0.0)},
+}
+
+STATUS_LABELS = np.array(["Normal", "Low", "High", "Critical"])
+
+# How far outside its table bounds a unitless value may be and still be
+# assumed to be in the canonical unit
+PLAUSIBLE_FACTOR = 5
+
+# A number token; the separators in it are interpreted by to_float
+NUMBER_PATTERN = re.compile(r"-?\d+(?:[.,]\d+)*")
+RANGE_PATTERN = re.compile(r"(-?\d+(?:[.,]\d+)*)\s*(?:-|–|to)\s*(-?\d+(?:[.,]\d+)*)")
+THOUSANDS_PATTERN = re.compile(r"-?\d{1,3}(?:,\d{3})+(?:\.\d+)?")
+DECIMAL_PATTERN = re.compile(r"-?\d+(?:\.\d+)?")
+DECIMAL_COMMA_PATTERN = re.compile(r"-?\d+,(?:\d{1,2}|\d{4,})")
+
+_ALIASES = {alias: code for code, spec in MARKERS.items() for alias in spec["aliases"]}
+# Longest aliases first so "ldl cholesterol" wins over "cholesterol"
+_ALIASES_BY_LENGTH = sorted(_ALIASES.items(), key=lambda item: len(item[0]), reverse=True)
+
+# Names containing one of these are a different marker than any alias they contain
+# (MCH is not hemoglobin, non-HDL is not HDL, a ratio is not its operands)
+NON_MARKER_TERMS = ("mean corpuscular", "non hdl", "vldl", "ratio", "index", "distribution width")
+
+# Qualifiers that do not change which marker a name refers to ("Total WBC", "Serum Sodium Level")
+QUALIFIER_WORDS = {"total", "serum", "plasma", "count", "level", "levels", "value"}
+
+
+def normalize_unit(unit) -> str:
+    if not unit:
+        return ""
+    text = str(unit).strip().lower()
+    text = text.replace("µ", "u").replace("μ", "u").replace(" ", "")
+    text = text.replace("x10", "10").replace("×10", "10").replace("10e", "10^")
+    text = text.replace("mm3", "cumm").replace("/cmm", "/cumm")
+    text = re.sub(r"^gms?/", "g/", text)
+    return text
+
+
+def _normalize_name(name) -> str:
+    return re.sub(r"\s+", " ", re.sub(r"[^a-z0-9 ]+", " ", str(name).lower())).strip()
+
+
+def resolve_marker(name) -> tuple:
+    """
+    (code, exact) for a biomarker name. exact is True when the whole name,
+    the name without a parenthesized part ("Hemoglobin (Hb)") or the name
+    without QUALIFIER_WORDS ("Total WBC") is an alias. Otherwise the longest
+    alias contained in the name is used, unless the name is a different
+    marker (NON_MARKER_TERMS); then the code is a slug of the name.
+    """
+    text = _normalize_name(name)
+    without_parens = _normalize_name(re.sub(r"\([^)]*\)", " ", str(name)))
+    unqualified = " ".join(w for w in without_parens.split() if w not in QUALIFIER_WORDS)
+    for candidate in (text, without_parens, unqualified):
+        if candidate in _ALIASES:
+            return _ALIASES[candidate], True
+
+    if not any(re.search(rf"\b{term}\b", text) for term in NON_MARKER_TERMS):
+        for alias, code in _ALIASES_BY_LENGTH:
+            if re.search(rf"\b{re.escape(alias)}\b", text):
+                return code, False
+    return text.replace(" ", "_") or "unknown", False
+
+
+def resolve_marker_code(name) -> str:
+    """Map a biomarker name to its canonical code (or a slug of the name)."""
+    return resolve_marker(name)[0]
+
+
+def to_float(token: str):
+    """
+    Float of one number token. "150,000" and "1,234.5" use thousands
+    separators, "7,2" a decimal comma; "1234,567" is ambiguous and gives None.
+    """
+    if THOUSANDS_PATTERN.fullmatch(token):
+        return float(token.replace(",", ""))
+    if DECIMAL_PATTERN.fullmatch(token):
+        return float(token)
+    if DECIMAL_COMMA_PATTERN.fullmatch(token):
+        return float(token.replace(",", "."))
+    return None
+
+
+def parse_number(value):
+    if value is None or isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = NUMBER_PATTERN.search(str(value))
+    return to_float(match.group(0)) if match else None
+
+
+def parse_range(text):
+    """Parse a printed reference range into (min, max); either side may be None."""
+    if not text:
+        return None, None
+    text = str(text).strip().lower()
+    match = RANGE_PATTERN.search(text)
+    if match:
+        low, high = to_float(match.group(1)), to_float(match.group(2))
+        if low is None or high is None:
+            return None, None
+        return low, high
+    number = parse_number(text)
+    if number is None:
+        return None, None
+    if text.startswith(("<", "≤", "up to", "upto")):
+        return None, number
+    if text.startswith((">", "≥")):
+        return number, None
+    return None, None
+
+
+def plausible_in_canonical_unit(code: str, value) -> bool:
+    """
+    Whether a value printed without a unit can be in the marker's canonical
+    unit: within PLAUSIBLE_FACTOR of its default and critical bounds. A
+    unitless platelet count of 250000 (/cumm) is not in 10^3/uL.
+    """
+    if value is None or code not in MARKERS:
+        return False
+    bounds = [b for b in MARKERS[code]["range"] + MARKERS[code]["critical"] if b is not None]
+    if not bounds:
+        return False
+    return min(bounds) / PLAUSIBLE_FACTOR <= value <= max(bounds) * PLAUSIBLE_FACTOR
+
+
+def conversion_for(code: str, unit):
+    """(factor, offset) to the canonical unit, or None when the unit is not known for the marker."""
+    return UNIT_CONVERSIONS.get(code, {}).get(normalize_unit(unit))
+
+
+def _nan(value):
+    return np.nan if value is None else float(value)
+
+
+def evaluate_biomarkers(biomarkers: list) -> list:
+    """
+    Compute status for every biomarker in one vectorized pass.
+
+    Each input dict may carry testName, currentValue, unit, referenceMin,
+    referenceMax and/or referenceRange. Values and ranges are converted to the
+    canonical unit when the marker and unit are known. Markers without any
+    usable value or range keep the status they came with.
+    """
+    if not biomarkers:
+        return []
+
+    resolved = [resolve_marker(b.get("testName", "")) for b in biomarkers]
+    codes = [code for code, _ in resolved]
+    known = [conversion_for(c, b.get("unit")) for c, b in zip(codes, biomarkers)]
+    # Printed ranges are in the value's unit, so an unknown unit is left as is
+    conversions = np.array([k or (1.0, 0.0) for k in known], dtype=float)
+    factor, offset = conversions[:, 0], conversions[:, 1]
+
+    parsed_values = [parse_number(b.get("currentValue")) for b in biomarkers]
+
+    # Table bounds are canonical: only trusted for an exact name match in a known unit
+    # (default ranges also when the unit is absent and the value fits the canonical unit)
+    use_defaults = np.array([
+        exact and code in MARKERS and (
+            k is not None
+            or (not normalize_unit(b.get("unit")) and plausible_in_canonical_unit(code, value))
+        )
+        for (code, exact), k, b, value in zip(resolved, known, biomarkers, parsed_values)
+    ])
+    use_critical = np.array([
+        exact and code in MARKERS and k is not None
+        for (code, exact), k in zip(resolved, known)
+    ])
+
+    values = np.array([_nan(value) for value in parsed_values])
+
+    printed = [parse_range(b.get("referenceRange")) for b in biomarkers]
+    ref_min = np.array([
+        _nan(parse_number(b.get("referenceMin")) if b.get("referenceMin") is not None else p[0])
+        for b, p in zip(biomarkers, printed)
+    ])
+    ref_max = np.array([
+        _nan(parse_number(b.get("referenceMax")) if b.get("referenceMax") is not None else p[1])
+        for b, p in zip(biomarkers, printed)
+    ])
+
+    # Convert value and printed range to canonical units
+    values = values * factor + offset
+    ref_min = ref_min * factor + offset
+    ref_max = ref_max * factor + offset
+
+    # Fill missing bounds from the default table (already canonical)
+    default_min = np.array([_nan(MARKERS.get(c, {}).get("range", (None, None))[0]) for c in codes])
+    default_max = np.array([_nan(MARKERS.get(c, {}).get("range", (None, None))[1]) for c in codes])
+    has_printed = ~np.isnan(ref_min) | ~np.isnan(ref_max)
+    ref_min = np.where(has_printed, ref_min, np.where(use_defaults, default_min, np.nan))
+    ref_max = np.where(has_printed, ref_max, np.where(use_defaults, default_max, np.nan))
+
+    crit_min = np.array([_nan(MARKERS.get(c, {}).get("critical", (None, None))[0]) for c in codes])
+    crit_max = np.array([_nan(MARKERS.get(c, {}).get("critical", (None, None))[1]) for c in codes])
+    crit_min = np.where(use_critical, crit_min, np.nan)
+    crit_max = np.where(use_critical, crit_max, np.nan)
+
+    # NaN comparisons are False, so unknown bounds never trigger a status
+    with np.errstate(invalid="ignore"):
+        low = values < ref_min
+        high = values > ref_max
+        critical = (values < crit_min) | (values > crit_max)
+
+    status_index = np.select([critical, low, high], [3, 1, 2], default=0)
+    evaluable = ~np.isnan(values) & (~np.isnan(ref_min) | ~np.isnan(ref_max) | ~np.isnan(crit_min) | ~np.isnan(crit_max))
+
+    canonical_units = [MARKERS[c]["unit"] if c in MARKERS else None for c in codes]
+
+    evaluated = []
+    for i, biomarker in enumerate(biomarkers):
+        item = dict(biomarker)
+        item["markerCode"] = codes[i]
+        if not np.isnan(values[i]):
+            item["currentValue"] = round(float(values[i]), 2)
+            if canonical_units[i] and known[i] is not None:
+                item["unit"] = canonical_units[i]
+        item["referenceMin"] = None if np.isnan(ref_min[i]) else round(float(ref_min[i]), 2)
+        item["referenceMax"] = None if np.isnan(ref_max[i]) else round(float(ref_max[i]), 2)
+        if evaluable[i]:
+            item["status"] = str(STATUS_LABELS[status_index[i]])
+        evaluated.append(item)
+
+    return evaluated
+
+
+def summarize_biomarkers(biomarkers: list) -> dict:
+    """topBar metrics derived from evaluated biomarkers; unclassified ones (status None) are not counted."""
+    severity = {"Critical": 3, "Low": 2, "High": 2, "Abnormal": 2}
+    abnormal = [b for b in biomarkers if severity.get(b.get("status"), 0) > 0]
+
+    if not any(b.get("status") for b in biomarkers):
+        overall = "Incomplete Data"
+    elif any(b.get("status") == "Critical" for b in biomarkers):
+        overall = "Critical"
+    elif abnormal:
+        overall = "Abnormal"
+    else:
+        overall = "Normal"
+
+    most_critical = (
+        max(abnormal, key=lambda b: severity.get(b.get("status"), 0))["testName"] if abnormal else "No abnormal markers"
+    )
+
+    return {
+        "overallReportStatus": overall,
+        "abnormalValueCount": len(abnormal),
+        "mostCriticalMarker": most_critical,
+    }
@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 
@@ -39,3 +39,20 @@ class DashboardResponse(BaseModel):
             recommendations=dashboard.recommendations or [],
             criticalInsights=dashboard.critical_insights or [],
         )
+
+
+class BiomarkerTrendPoint(BaseModel):
+    report_id: UUID
+    marker_name: str
+    value: float
+    unit: Optional[str] = None
+    status: Optional[str] = None
+    observed_at: datetime
+
+    class Config:
+        from_attributes = True
+
+
+class BiomarkerTrendResponse(BaseModel):
+    marker_code: str
+    points: List[BiomarkerTrendPoint] = Field(default_factory=list)
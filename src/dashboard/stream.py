@@ -0,0 +1,69 @@
+import json
+
+
+class SectionStreamParser:
+    """
+    Incremental parser for a streamed top-level JSON object.
+
+    Feed it text chunks as they arrive; it returns each top-level
+    (key, value) pair as soon as that member is complete, without waiting for
+    the rest of the object. Nested objects/arrays and strings (including
+    escaped quotes and braces inside strings) are tracked so only real
+    top-level separators end a member.
+    """
+
+    def __init__(self):
+        self.buffer = ""
+        self.position = 0
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.member_start = None
+
+    def feed(self, chunk: str) -> list:
+        self.buffer += chunk
+        completed = []
+
+        while self.position < len(self.buffer):
+            char = self.buffer[self.position]
+
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == "\\":
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+
+            elif char == '"':
+                self.in_string = True
+
+            elif char in "{[":
+                self.depth += 1
+                if self.depth == 1 and char == "{":
+                    self.member_start = self.position + 1
+
+            elif char in "}]":
+                if self.depth == 1:
+                    completed.extend(self._close_member())
+                self.depth -= 1
+
+            elif char == "," and self.depth == 1:
+                completed.extend(self._close_member())
+                self.member_start = self.position + 1
+
+            self.position += 1
+
+        return completed
+
+    def _close_member(self) -> list:
+        if self.member_start is None:
+            return []
+        member = self.buffer[self.member_start:self.position].strip()
+        if not member:
+            return []
+        try:
+            return list(json.loads("{" + member + "}").items())
+        except json.JSONDecodeError:
+            # Malformed member: skip it, the final validation handles gaps
+            return []
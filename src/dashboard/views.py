@@ -1,21 +1,89 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Header, Request
+from fastapi.responses import StreamingResponse, Response
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.gets import get_db
+from database.settings import AsyncSessionLocal
 from src.auth.dependency import get_current_user
-from .manager import create_dashboard,get_dashboard_by_file_id
-from .schema import DashboardResponse, DashboardCreateRequest
+from .manager import create_dashboard,generate_dashboard,get_dashboard_version,get_dashboard_response_body
+from .schema import DashboardResponse, DashboardCreateRequest, BiomarkerTrendResponse
+from .observations import get_marker_trend
+from .reference import resolve_marker_code
+from .cache import build_etag, etag_matches
+from src.llm.disconnect import abandon_task, run_until_disconnect
+import config
+import metrics
 from uuid import UUID
 
 dashboard_router = APIRouter(tags=["Dashboard"])
 
+async def create_dashboard_in_own_session(file_id: UUID):
+    # Own session: creation may outlive the request (see run_until_disconnect)
+    async with AsyncSessionLocal() as session:
+        return await create_dashboard(file_id, session)
+
+async def generate_dashboard_in_own_session(file_id: UUID, queue: asyncio.Queue):
+    # Own session: generation may outlive the stream (see abandon_task)
+    async with AsyncSessionLocal() as session:
+        async for event in generate_dashboard(file_id, session):
+            queue.put_nowait(event)
+
+async def stream_dashboard_events(file_id: UUID):
+    """
+    NDJSON stream: one {"section": ..., "data": ...} line per ready section,
+    then {"section": "done", "data": <DashboardResponse>}. Errors after the
+    stream has started are sent as {"section": "error", ...}.
+
+    Generation runs as its own task; if the client disconnects it is still
+    finished and stored (DASHBOARD_DETACH_ON_DISCONNECT) or cancelled.
+    """
+    queue = asyncio.Queue()
+    task = asyncio.create_task(generate_dashboard_in_own_session(file_id, queue))
+    # None marks the end of the events, however the task ends
+    task.add_done_callback(lambda _: queue.put_nowait(None))
+
+    try:
+        while (event := await queue.get()) is not None:
+            section, value = event
+            if section == "dashboard":
+                data = DashboardResponse.from_dashboard_model(value).model_dump(mode="json")
+                yield json.dumps({"section": "done", "data": data}) + "\n"
+            else:
+                yield json.dumps({"section": section, "data": value}) + "\n"
+        task.result()
+
+    except HTTPException as e:
+        yield json.dumps({"section": "error", "status_code": e.status_code, "detail": e.detail}) + "\n"
+    except Exception as e:
+        yield json.dumps({"section": "error", "status_code": 500, "detail": f"Dashboard creation failed: {str(e)}"}) + "\n"
+    finally:
+        if not task.done():
+            abandon_task(task, "dashboard.create", detach=config.DASHBOARD_DETACH_ON_DISCONNECT)
+
 @dashboard_router.post("/create", response_model=DashboardResponse)
 async def create_dashboard_api(
     payload: DashboardCreateRequest,
+    request: Request,
+    stream: bool = Query(False, description="Stream sections as NDJSON as soon as each is ready"),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     try:
-        dashboard = await create_dashboard(payload.file_id, db)
+        if stream:
+            return StreamingResponse(
+                stream_dashboard_events(payload.file_id),
+                media_type="application/x-ndjson",
+            )
+
+        # If the client leaves, the dashboard is still built and stored
+        # (DASHBOARD_DETACH_ON_DISCONNECT) or creation is cancelled
+        dashboard = await run_until_disconnect(
+            request,
+            create_dashboard_in_own_session(payload.file_id),
+            "dashboard.create",
+            detach=config.DASHBOARD_DETACH_ON_DISCONNECT,
+        )
         return DashboardResponse.from_dashboard_model(dashboard)
 
     except HTTPException:
@@ -23,15 +91,46 @@ async def create_dashboard_api(
     except Exception as e:
         raise HTTPException(500, f"Dashboard creation failed: {str(e)}")
 
+@dashboard_router.get("/trend/{marker}", response_model=BiomarkerTrendResponse)
+async def get_biomarker_trend_api(
+    marker: str,
+    limit: int = Query(100, ge=1, le=500),
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user),
+):
+    """
+    History of one biomarker across the user's reports, oldest first.
+    Accepts a marker code ("ldl") or a name ("LDL Cholesterol").
+    """
+    try:
+        marker_code = resolve_marker_code(marker)
+        points = await get_marker_trend(db, current_user.user_id, marker_code, limit)
+        return BiomarkerTrendResponse(marker_code=marker_code, points=points)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(500, f"Trend fetch failed: {str(e)}")
+
 @dashboard_router.get("/{file_id}", response_model=DashboardResponse)
 async def get_dashboard_api(
     file_id: UUID,
+    if_none_match: str = Header(None),
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user),
 ):
     try:
-        dashboard = await get_dashboard_by_file_id(file_id, db)
-        return DashboardResponse.from_dashboard_model(dashboard)
+        version = await get_dashboard_version(file_id, db)
+        etag = build_etag(version.dashboard_id, version.updated_at)
+        # Dashboards are revalidated on every view; unchanged ones cost a 304
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if etag_matches(if_none_match, etag):
+            metrics.incr("dashboard.not_modified")
+            return Response(status_code=304, headers=headers)
+
+        body = await get_dashboard_response_body(version, db)
+        return Response(content=body, media_type="application/json", headers=headers)
 
     except HTTPException:
         raise
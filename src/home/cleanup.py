@@ -0,0 +1,81 @@
+"""
+Background vector-store cleanup.
+
+Deleting a report only writes a VectorCleanup row in its transaction; this
+worker deletes the Pinecone namespaces afterwards, so the request never waits
+on (or fails because of) the vector store. Rows are claimed with
+FOR UPDATE SKIP LOCKED, so every worker process can run the loop. Failed
+deletions are retried with exponential backoff.
+"""
+
+import asyncio
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select
+from database.models.vector_cleanup import VectorCleanup
+from database.settings import AsyncSessionLocal
+from src.upload.dependency import pinecone_index
+import config
+import metrics
+
+# Set after a deletion is committed so the worker runs without waiting for the poll
+cleanup_wakeup = asyncio.Event()
+
+
+def is_missing_namespace(error: Exception) -> bool:
+    # Nothing left to delete (never upserted, or deleted by an earlier attempt)
+    return getattr(error, "status", None) == 404 or "not found" in str(error).lower()
+
+
+async def drain_vector_cleanup() -> int:
+    """Process one batch of due cleanups. Returns the number of rows handled."""
+    now = datetime.now(timezone.utc)
+
+    async with AsyncSessionLocal() as session:
+        result = await session.execute(
+            select(VectorCleanup)
+            .where(VectorCleanup.next_attempt_at <= now)
+            .order_by(VectorCleanup.next_attempt_at)
+            .limit(config.VECTOR_CLEANUP_BATCH_SIZE)
+            .with_for_update(skip_locked=True)
+        )
+        jobs = result.scalars().all()
+
+        for job in jobs:
+            try:
+                await asyncio.to_thread(pinecone_index.delete, delete_all=True, namespace=job.namespace)
+                await session.delete(job)
+                metrics.incr("vector_cleanup.deleted")
+
+            except Exception as e:
+                if is_missing_namespace(e):
+                    await session.delete(job)
+                    metrics.incr("vector_cleanup.missing")
+                    continue
+
+                job.attempts += 1
+                job.last_error = str(e)
+                backoff = min(2 ** job.attempts, config.VECTOR_CLEANUP_MAX_BACKOFF)
+                job.next_attempt_at = now + timedelta(seconds=backoff)
+                metrics.incr("vector_cleanup.error")
+                print(f"[WARN] Pinecone namespace deletion failed for {job.namespace}: {str(e)}")
+
+        await session.commit()
+        return len(jobs)
+
+
+async def vector_cleanup_worker():
+    """Started at app startup; runs until cancelled at shutdown."""
+    while True:
+        # Cleared before draining, so a deletion committed meanwhile is not missed
+        cleanup_wakeup.clear()
+        try:
+            handled = await drain_vector_cleanup()
+        except Exception as e:
+            print(f"[WARN] Vector cleanup batch failed: {str(e)}")
+            handled = 0
+
+        if handled < config.VECTOR_CLEANUP_BATCH_SIZE:
+            try:
+                await asyncio.wait_for(cleanup_wakeup.wait(), timeout=config.VECTOR_CLEANUP_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
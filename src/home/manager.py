@@ -6,8 +6,12 @@ from typing import List,Tuple
 from sqlalchemy.orm import selectinload
 from sqlalchemy.exc import SQLAlchemyError
 from database.models import *
-from sqlalchemy import func, asc, desc
-from src.upload.dependency import pinecone_index
+from sqlalchemy import func, asc, desc, delete, update, case
+from .cleanup import cleanup_wakeup
+from src.dashboard.cache import invalidate_cached_response
+from src.llm.retrieval import drop_local_index
+from src.chat.answer_cache import invalidate_report_answers
+import metrics
 
 async def get_all_report_types(db: AsyncSession) -> ReportType:
     """
@@ -102,59 +106,85 @@ async def update_report_name(db: AsyncSession, report_id, new_name):
         await db.rollback()
         raise Exception(f"Unexpected error: {str(e)}")
     
-async def delete_report(db: AsyncSession, report_id: UUID):
-    try:
-        # 1. Fetch the report
-        result = await db.execute(
-            select(Report).where(Report.report_id == report_id)
-        )
-        report = result.scalar_one_or_none()
+async def delete_reports(db: AsyncSession, report_ids: List[UUID]) -> dict:
+    """
+    Delete reports with a fixed number of set-based statements in one
+    transaction, however many reports, chats and messages are involved.
+    Their chats and those chats' messages are soft-deleted; the Pinecone
+    namespaces are queued in the vector_cleanup outbox and removed by the
+    background worker. Returns {report_id: report_name} of the deleted reports.
+    """
+    # 1. Fetch the reports
+    result = await db.execute(
+        select(Report.report_id, Report.report_name, Report.insights).where(Report.report_id.in_(report_ids))
+    )
+    reports = result.all()
+    if not reports:
+        return {}
+    report_ids = [r.report_id for r in reports]
 
-        if not report:
-            return None
+    # 2. Queue the Pinecone namespaces (if saved) for deletion
+    namespaces = []
+    for r in reports:
+        namespace = (r.insights or {}).get("namespace")
+        if namespace:
+            namespaces.append(namespace)
+            db.add(VectorCleanup(namespace=namespace, report_id=r.report_id))
 
-        deleted_report_name = report.report_name
+    # 3. Soft delete the chats linked to these reports and their messages;
+    # the chats are detached from the reports, which are removed below
+    # (no session synchronization: none of these rows are loaded, and
+    # fetching them would make the request proportional to their number)
+    report_chats = select(Chat.chat_id).where(Chat.file_id.in_(report_ids))
+    await db.execute(
+        update(Message).where(Message.chat_id.in_(report_chats)).values(is_valid=False),
+        execution_options={"synchronize_session": False},
+    )
+    await db.execute(
+        update(Chat).where(Chat.file_id.in_(report_ids)).values(is_valid_chat=False, file_id=None),
+        execution_options={"synchronize_session": False},
+    )
 
-        # 2. Delete Pinecone namespace (if saved)
-        try:
-            namespace = None
-            if report.insights and "namespace" in report.insights:
-                namespace = report.insights["namespace"]
+    # 4. Delete dashboards if they exist
+    await db.execute(
+        delete(Dashboard).where(Dashboard.report_id.in_(report_ids))
+    )
 
-            if namespace:
-                pinecone_index.delete(delete_all=True, namespace=namespace)
-                print(f"Deleted Pinecone namespace: {namespace}")
+    # 5. Delete biomarker observations derived from these reports
+    await db.execute(
+        delete(BiomarkerObservation).where(BiomarkerObservation.report_id.in_(report_ids))
+    )
 
-        except Exception as e:
-            # Do NOT cancel deletion — log & continue
-            print(f"[WARN] Pinecone namespace deletion failed: {str(e)}")
+    # 6. Delete the reports
+    await db.execute(
+        delete(Report).where(Report.report_id.in_(report_ids)),
+        execution_options={"synchronize_session": False},
+    )
 
-        # 3. Invalidate chats linked to this report
-        chat_result = await db.execute(
-            select(Chat).where(Chat.file_id == report_id)
-        )
-        chat_items = chat_result.scalars().all()
-        for chat in chat_items:
-            chat.is_valid_chat = False
+    # Commit DB changes
+    await db.commit()
 
-        # 4. Delete dashboard if exists
-        dashboard_result = await db.execute(
-            select(Dashboard).where(Dashboard.report_id == report_id)
-        )
-        dashboard = dashboard_result.scalar_one_or_none()
-        if dashboard:
-            await db.delete(dashboard)
+    # In-process indexes/caches built from these reports
+    for report_id in report_ids:
+        invalidate_cached_response(report_id)
+        drop_local_index(report_id)
+        invalidate_report_answers(report_id)
+    if namespaces:
+        cleanup_wakeup.set()
 
-        # 5. Delete the report
-        await db.delete(report)
+    return {r.report_id: r.report_name for r in reports}
 
-        # Commit DB changes
-        await db.commit()
+async def delete_report(db: AsyncSession, report_id: UUID):
+    try:
+        deleted = await delete_reports(db, [report_id])
+
+        if not deleted:
+            return None
 
         return {
             "report_id": report_id,
-            "report_name": deleted_report_name,
-            "message": "Report deleted successfully (including Pinecone namespace)"
+            "report_name": deleted[report_id],
+            "message": "Report deleted successfully (Pinecone cleanup queued)"
         }
 
     except SQLAlchemyError as e:
@@ -164,3 +194,75 @@ async def delete_report(db: AsyncSession, report_id: UUID):
     except Exception as e:
         await db.rollback()
         raise Exception(f"Unexpected error: {str(e)}")
+
+async def bulk_report_operation(db: AsyncSession, user_id: UUID, operation: str, items: list):
+    """
+    Apply one operation to many reports. Ownership is checked with one query
+    and DB changes are set-based; re-analysis is only validated here and the
+    returned report IDs are queued by the caller as one background batch.
+    Returns (per-item results in request order, report IDs to re-analyze).
+    """
+    report_ids = list(dict.fromkeys(item.report_id for item in items))
+
+    result = await db.execute(
+        select(
+            Report.report_id,
+            Report.status,
+            Report.insights["namespace"].as_string().label("namespace"),
+        ).where(Report.report_id.in_(report_ids), Report.user_id == user_id)
+    )
+    owned = {r.report_id: r for r in result.all()}
+
+    # Other users' reports are indistinguishable from missing ones
+    outcomes = {
+        report_id: ("not_found", "Report not found")
+        for report_id in report_ids if report_id not in owned
+    }
+    queued = []
+
+    try:
+        if operation == "delete":
+            deleted = await delete_reports(db, list(owned))
+            for report_id in owned:
+                outcomes[report_id] = ("deleted", None) if report_id in deleted else ("not_found", "Report not found")
+
+        elif operation == "rename":
+            names = {}
+            for item in items:
+                if item.report_id not in owned:
+                    continue
+                name = (item.report_name or "").strip()
+                if name:
+                    names[item.report_id] = name
+                    outcomes[item.report_id] = ("renamed", None)
+                else:
+                    outcomes[item.report_id] = ("invalid", "report_name is required")
+
+            if names:
+                await db.execute(
+                    update(Report)
+                    .where(Report.report_id.in_(names))
+                    .values(report_name=case(names, value=Report.report_id)),
+                    execution_options={"synchronize_session": False},
+                )
+                await db.commit()
+
+        elif operation == "reanalyze":
+            for report_id, report in owned.items():
+                if report.status == "completed" and report.namespace:
+                    queued.append(report_id)
+                    outcomes[report_id] = ("queued", None)
+                else:
+                    outcomes[report_id] = ("not_ready", f"Report is {report.status}")
+
+    except SQLAlchemyError as e:
+        await db.rollback()
+        raise Exception(f"Database error: {str(e)}")
+
+    metrics.incr(f"report.bulk.{operation}", len(report_ids))
+
+    results = [
+        {"report_id": report_id, "status": outcomes[report_id][0], "detail": outcomes[report_id][1]}
+        for report_id in report_ids
+    ]
+    return results, queued
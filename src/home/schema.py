@@ -1,6 +1,6 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from uuid import UUID
-from typing import List, Optional, Union
+from typing import List, Optional, Union, Literal
 from datetime import datetime
 
 class ReportTypeResponse(BaseModel):
@@ -51,4 +51,23 @@ class ReportDeleteResponse(BaseModel):
     message: str
 
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class BulkReportItem(BaseModel):
+    report_id: UUID
+    # New name; required for "rename"
+    report_name: Optional[str] = None
+
+class BulkReportRequest(BaseModel):
+    operation: Literal["delete", "rename", "reanalyze"]
+    items: List[BulkReportItem] = Field(..., min_length=1)
+
+class BulkReportItemResult(BaseModel):
+    report_id: UUID
+    # deleted | renamed | queued | not_found | invalid | not_ready
+    status: str
+    detail: Optional[str] = None
+
+class BulkReportResponse(BaseModel):
+    operation: str
+    results: List[BulkReportItemResult]
@@ -1,5 +1,5 @@
 from typing import List
-from fastapi import APIRouter, Depends, status, Request, HTTPException
+from fastapi import APIRouter, Depends, status, Request, HTTPException, BackgroundTasks
 import uuid
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import SQLAlchemyError
@@ -9,6 +9,8 @@ from . import manager
 from . import schema
 from database.gets import get_db
 from src.auth.dependency import get_current_user
+from src.upload.manager import reanalyze_reports
+import config
 
 report_router = APIRouter(tags=["Report"])
 
@@ -166,3 +168,45 @@ async def delete_report(
             status_code=500,
             detail=f"Unexpected error: {str(e)}"
         )
+
+@report_router.post(
+    "/bulk",
+    response_model=schema.BulkReportResponse,
+    status_code=status.HTTP_200_OK
+)
+async def bulk_report_operation(
+    payload: schema.BulkReportRequest,
+    background_tasks: BackgroundTasks,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """
+    Delete, rename or re-analyze many reports in one call. Returns one
+    result per report; re-analyses run in the background after the response.
+    """
+    if len(payload.items) > config.BULK_REPORT_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {config.BULK_REPORT_MAX_ITEMS} reports per request"
+        )
+
+    try:
+        results, queued = await manager.bulk_report_operation(
+            db,
+            user_id=current_user.user_id,
+            operation=payload.operation,
+            items=payload.items
+        )
+
+        if queued:
+            background_tasks.add_task(reanalyze_reports, queued)
+
+        return schema.BulkReportResponse(operation=payload.operation, results=results)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Unexpected error: {str(e)}"
+        )
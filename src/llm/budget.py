@@ -0,0 +1,132 @@
+"""
+Prompt token budgets.
+
+Every LLM call measures its prompt locally (tiktoken, see serializer.py)
+before sending it and trims it to the call's budget instead of failing at
+the API or cutting by characters. Prompts are built from PromptParts with a
+priority; over budget, the least important parts go first:
+
+    INSTRUCTIONS     system instructions and the request itself (never trimmed)
+    RECENT_TURNS     the last turns of a conversation
+    REPORT_DATA      the report / document the call is about
+    REPORT_EXCERPTS  retrieved supporting text
+    HISTORY          older turns and the conversation summary
+
+Conversation turns are dropped whole (oldest first); other parts are cut at
+the end. Estimated and trimmed prompt tokens are recorded per call site; the
+actual prompt and completion counts come from record_usage.
+"""
+
+from collections import namedtuple
+from fastapi import HTTPException
+from src.llm.serializer import count_tokens, get_encoding, DEFAULT_TOKENIZER_MODEL
+import metrics
+
+INSTRUCTIONS = 0
+RECENT_TURNS = 1
+REPORT_DATA = 2
+REPORT_EXCERPTS = 3
+HISTORY = 4
+
+# Parts of these priorities are whole conversation turns: dropped, never cut
+DROP_ONLY = {RECENT_TURNS, HISTORY}
+
+# A part is one or more messages that are kept or dropped together
+PromptPart = namedtuple("PromptPart", ["priority", "messages"])
+
+MODEL_CONTEXT_WINDOWS = {"gpt-4o": 128_000, "gpt-4o-mini": 128_000}
+DEFAULT_CONTEXT_WINDOW = 128_000
+
+# Per-message framing overhead of the chat format
+MESSAGE_OVERHEAD_TOKENS = 4
+# Upper bound for a high-detail image of at most 2000px (ocr_image resizes to that)
+IMAGE_TOKENS = 1105
+
+TRUNCATION_MARKER = "\n[...truncated]"
+
+
+def prompt_budget(model: str, configured: int, max_completion_tokens: int = 4096) -> int:
+    """The configured prompt budget, capped by what the model's context window leaves."""
+    window = MODEL_CONTEXT_WINDOWS.get(model, DEFAULT_CONTEXT_WINDOW)
+    return min(configured, window - max_completion_tokens)
+
+
+def message_tokens(message: dict, model: str = DEFAULT_TOKENIZER_MODEL) -> int:
+    content = message.get("content")
+    if isinstance(content, list):
+        tokens = 0
+        for item in content:
+            if item.get("type") == "text":
+                tokens += count_tokens(item.get("text", ""), model)
+            else:
+                tokens += IMAGE_TOKENS
+    else:
+        tokens = count_tokens(content or "", model)
+    return tokens + MESSAGE_OVERHEAD_TOKENS
+
+
+def truncate_to_tokens(text: str, max_tokens: int, model: str = DEFAULT_TOKENIZER_MODEL, marker: str = TRUNCATION_MARKER) -> str:
+    """Cut text to at most max_tokens tokens (including the marker)."""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    max_tokens = max(max_tokens - count_tokens(marker, model), 0)
+
+    encoding = get_encoding(model)
+    if encoding is None:
+        return text[:max_tokens * 4] + marker
+    return encoding.decode(encoding.encode(text)[:max_tokens]) + marker
+
+
+def fit_prompt(parts: list, budget: int, call_site: str, model: str = DEFAULT_TOKENIZER_MODEL) -> list:
+    """
+    The messages of `parts`, in order, trimmed by priority to `budget` tokens.
+    Raises 413 when the untrimmable parts alone exceed the budget.
+    """
+    sizes = [sum(message_tokens(m, model) for m in part.messages) for part in parts]
+    total = sum(sizes)
+    metrics.observe(f"llm.{call_site}.prompt_tokens_estimated", total)
+
+    kept = [list(part.messages) for part in parts]
+    excess = total - budget
+    if excess <= 0:
+        return [m for messages in kept for m in messages]
+
+    # Least important first; oldest first within a priority
+    for i in sorted(range(len(parts)), key=lambda i: (-parts[i].priority, i)):
+        if excess <= 0 or parts[i].priority == INSTRUCTIONS:
+            break
+
+        messages = parts[i].messages
+        content = messages[0].get("content")
+        if sizes[i] <= excess or parts[i].priority in DROP_ONLY or len(messages) > 1 or not isinstance(content, str):
+            kept[i] = []
+            excess -= sizes[i]
+        else:
+            allowed = sizes[i] - excess - MESSAGE_OVERHEAD_TOKENS
+            kept[i] = [{**messages[0], "content": truncate_to_tokens(content, allowed, model)}]
+            excess = 0
+
+    if excess > 0:
+        metrics.incr(f"llm.{call_site}.over_budget")
+        raise HTTPException(413, "Request is too large for the model's token budget")
+
+    trimmed = total - budget - excess
+    metrics.incr(f"llm.{call_site}.trimmed_calls")
+    metrics.incr(f"llm.{call_site}.trimmed_tokens", trimmed)
+    return [m for messages in kept for m in messages]
+
+
+def fit_messages(messages: list, budget: int, call_site: str, model: str = DEFAULT_TOKENIZER_MODEL) -> list:
+    """fit_prompt for plain messages: system messages are instructions, the rest is report data."""
+    parts = [
+        PromptPart(INSTRUCTIONS if m.get("role") == "system" else REPORT_DATA, [m])
+        for m in messages
+    ]
+    return fit_prompt(parts, budget, call_site, model)
+
+
+def measure_prompt(messages: list, call_site: str, model: str = DEFAULT_TOKENIZER_MODEL) -> int:
+    """Record the estimated size of a prompt that cannot be trimmed (e.g. an image)."""
+    tokens = sum(message_tokens(m, model) for m in messages)
+    metrics.observe(f"llm.{call_site}.prompt_tokens_estimated", tokens)
+    return tokens
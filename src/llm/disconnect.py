@@ -0,0 +1,87 @@
+"""
+Client-disconnect handling for long LLM-backed requests.
+
+The request's work runs as a task while the handler polls the connection.
+When the client goes away the work is either cancelled, which closes the
+upstream HTTP request so the completion stops, or detached, so it still
+finishes and persists in the background. Detached work must own its DB
+session, because the request-scoped one closes when the handler returns.
+"""
+
+import asyncio
+from fastapi import HTTPException, Request
+from src.llm.serializer import count_tokens
+import config
+import metrics
+
+# Keeps references to detached work until it finishes
+detached_tasks = set()
+
+# Non-standard "client closed request"; nobody receives it
+CLIENT_CLOSED_REQUEST = 499
+
+
+def record_wasted_tokens(call_site: str, messages: list, generated_text: str = ""):
+    """
+    Estimate the tokens an abandoned completion was billed for: the whole
+    prompt plus whatever was generated before it was stopped.
+    """
+    prompt_tokens = sum(count_tokens(str(m.get("content") or "")) for m in messages)
+    metrics.incr(f"llm.{call_site}.wasted_tokens", prompt_tokens + count_tokens(generated_text))
+
+
+async def finish_detached(task: asyncio.Task, call_site: str, on_result=None):
+    try:
+        result = await task
+        if on_result is not None:
+            await on_result(result)
+        metrics.incr(f"llm.{call_site}.detached_completed")
+    except Exception as e:
+        print(f"[WARN] Detached {call_site} failed: {str(e)}")
+        metrics.incr(f"llm.{call_site}.detached_failed")
+
+
+def abandon_task(task: asyncio.Task, call_site: str, detach: bool = False, on_detached_result=None):
+    """
+    The client of `task` has gone: leave it running in the background with
+    detach=True (on_detached_result is awaited with its result), otherwise
+    cancel it. Returns without waiting, so it is safe in a closing generator.
+    """
+    metrics.incr(f"llm.{call_site}.client_disconnected")
+
+    if detach:
+        background = asyncio.create_task(finish_detached(task, call_site, on_detached_result))
+        detached_tasks.add(background)
+        background.add_done_callback(detached_tasks.discard)
+        metrics.incr(f"llm.{call_site}.detached")
+    else:
+        task.cancel()
+        metrics.incr(f"llm.{call_site}.cancelled")
+        metrics.incr("llm.disconnect.freed_slots")
+
+
+async def run_until_disconnect(request: Request, work, call_site: str, detach: bool = False, on_detached_result=None):
+    """
+    Await the coroutine `work` unless the client disconnects first. Then the
+    work is cancelled, or with detach=True left running (on_detached_result
+    is awaited with its result), and a 499 HTTPException is raised.
+    """
+    task = asyncio.create_task(work)
+
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=config.DISCONNECT_POLL_INTERVAL)
+            if done:
+                return task.result()
+            if await request.is_disconnected():
+                break
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+    abandon_task(task, call_site, detach, on_detached_result)
+    if not detach:
+        # Let the work release its locks and connections before the handler returns
+        await asyncio.wait({task})
+
+    raise HTTPException(CLIENT_CLOSED_REQUEST, "Client disconnected")
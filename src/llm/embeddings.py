@@ -0,0 +1,27 @@
+import time
+import numpy as np
+from src.upload.dependency import async_openai_client, EMBEDDING_MODEL, EMBEDDING_DIMENSION
+from src.llm.usage import record_usage
+
+# Inputs per embeddings request
+EMBEDDING_BATCH_SIZE = 256
+
+
+async def embed_texts(texts: list, call_site: str) -> np.ndarray:
+    """
+    Embed texts with the async client. Returns an (n, EMBEDDING_DIMENSION)
+    float32 matrix with L2-normalized rows, so a dot product is the cosine.
+    """
+    vectors = []
+    for start in range(0, len(texts), EMBEDDING_BATCH_SIZE):
+        started_at = time.perf_counter()
+        response = await async_openai_client.embeddings.create(
+            model=EMBEDDING_MODEL,
+            input=texts[start:start + EMBEDDING_BATCH_SIZE],
+        )
+        record_usage(call_site, response, started_at)
+        vectors.extend(item.embedding for item in response.data)
+
+    matrix = np.array(vectors, dtype=np.float32).reshape(-1, EMBEDDING_DIMENSION)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
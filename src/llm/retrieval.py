@@ -0,0 +1,177 @@
+"""
+Chunk-level retrieval over a report's extracted text.
+
+At upload the document text is split into overlapping chunks, embedded and
+upserted into the report's Pinecone namespace (ids "<file_id>#chunk-<n>",
+metadata kind="chunk"), next to the whole-document vector the analysis reads.
+For a chat question the embedded question is matched against the top-k
+chunks of that namespace.
+
+A bounded in-process NumPy index is the fallback: it is seeded at upload and
+built on demand from the stored document text when Pinecone is unavailable
+or the report predates chunking (such reports are then indexed in Pinecone
+too, so the fallback is only paid once).
+"""
+
+import asyncio
+from collections import OrderedDict
+from threading import Lock
+from uuid import UUID
+import numpy as np
+from src.upload.dependency import pinecone_index
+from src.llm.embeddings import embed_texts
+import config
+import metrics
+
+_local_lock = Lock()
+_local_indexes = OrderedDict()
+
+
+def chunk_text(text: str, size: int = None, overlap: int = None) -> list:
+    """
+    Split text into chunks of about `size` characters on line boundaries;
+    consecutive chunks share about `overlap` characters of context.
+    """
+    size = size or config.RAG_CHUNK_SIZE
+    overlap = config.RAG_CHUNK_OVERLAP if overlap is None else overlap
+
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        # Hard-split lines that alone exceed a chunk
+        while len(line) > size:
+            lines.append(line[:size])
+            line = line[size - overlap:] if overlap < size else line[size:]
+        if line:
+            lines.append(line)
+
+    chunks = []
+    current = []
+    length = 0
+    for line in lines:
+        if current and length + len(line) + 1 > size:
+            chunks.append("\n".join(current))
+            # Carry trailing lines over as overlap
+            carried = []
+            carried_length = 0
+            for previous in reversed(current):
+                if carried_length + len(previous) + 1 > overlap:
+                    break
+                carried.insert(0, previous)
+                carried_length += len(previous) + 1
+            current, length = carried, carried_length
+        current.append(line)
+        length += len(line) + 1
+
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def chunk_id(file_id: UUID, index: int) -> str:
+    return f"{file_id}#chunk-{index}"
+
+
+def store_local_index(report_id: UUID, chunks: list, embeddings: np.ndarray):
+    with _local_lock:
+        _local_indexes[report_id] = (chunks, embeddings)
+        _local_indexes.move_to_end(report_id)
+        while len(_local_indexes) > config.RAG_LOCAL_INDEX_MAX_REPORTS:
+            _local_indexes.popitem(last=False)
+
+
+def drop_local_index(report_id: UUID):
+    with _local_lock:
+        _local_indexes.pop(report_id, None)
+
+
+def search_local_index(report_id: UUID, query_embedding: np.ndarray, top_k: int):
+    """Top-k chunks by cosine similarity, or None when the report is not indexed."""
+    with _local_lock:
+        entry = _local_indexes.get(report_id)
+        if entry is None:
+            return None
+        _local_indexes.move_to_end(report_id)
+
+    chunks, embeddings = entry
+    if not chunks:
+        return []
+    scores = embeddings @ query_embedding
+    top = np.argsort(-scores)[:top_k]
+    return [chunks[i] for i in top]
+
+
+async def index_document_chunks(file_id: UUID, filename: str, namespace: str, text: str) -> int:
+    """Chunk, embed and upsert a document's text. Returns the number of chunks."""
+    chunks = chunk_text(text)
+    if not chunks:
+        return 0
+
+    embeddings = await embed_texts(chunks, "upload.chunks")
+    store_local_index(file_id, chunks, embeddings)
+
+    vectors = [
+        (chunk_id(file_id, i), embedding.tolist(), {"filename": filename, "kind": "chunk", "chunk_index": i, "text": chunk})
+        for i, (chunk, embedding) in enumerate(zip(chunks, embeddings))
+    ]
+    for start in range(0, len(vectors), 100):
+        await asyncio.to_thread(pinecone_index.upsert, vectors=vectors[start:start + 100], namespace=namespace)
+
+    return len(chunks)
+
+
+async def build_local_index(report_id: UUID, namespace: str) -> bool:
+    """Build the local index of a report from the whole-document text in Pinecone."""
+    fetched = await asyncio.to_thread(pinecone_index.fetch, ids=[str(report_id)], namespace=namespace)
+    vector_data = fetched.vectors.get(str(report_id))
+    if not vector_data or not vector_data.metadata.get("text"):
+        return False
+
+    text = vector_data.metadata["text"]
+    filename = vector_data.metadata.get("filename", "")
+    try:
+        # Reports uploaded before chunking existed get their chunks stored now;
+        # the local index is filled first, so an upsert failure still leaves it usable
+        await index_document_chunks(report_id, filename, namespace, text)
+        metrics.incr("retrieval.backfilled_reports")
+    except Exception as e:
+        print(f"[WARN] Chunk backfill failed for {report_id}: {str(e)}")
+    return True
+
+
+async def retrieve_report_chunks(report_id: UUID, namespace: str, query_embedding: np.ndarray, top_k: int = None) -> list:
+    """
+    The report text chunks most similar to an (embedded) question, best first.
+    Retrieval problems never fail the chat: they return no chunks.
+    """
+    top_k = top_k or config.RAG_TOP_K
+    if not namespace or query_embedding is None:
+        return []
+
+    try:
+        result = await asyncio.to_thread(
+            pinecone_index.query,
+            vector=query_embedding.tolist(),
+            top_k=top_k,
+            namespace=namespace,
+            filter={"kind": {"$eq": "chunk"}},
+            include_metadata=True,
+        )
+        chunks = [m.metadata["text"] for m in result.matches if m.metadata and m.metadata.get("text")]
+        if chunks:
+            metrics.incr("retrieval.vector_store")
+            return chunks
+    except Exception as e:
+        print(f"[WARN] Vector store query failed, using local index: {str(e)}")
+        metrics.incr("retrieval.vector_store_error")
+
+    try:
+        chunks = search_local_index(report_id, query_embedding, top_k)
+        if chunks is None and await build_local_index(report_id, namespace):
+            chunks = search_local_index(report_id, query_embedding, top_k)
+        metrics.incr("retrieval.local_index")
+        return chunks or []
+    except Exception as e:
+        print(f"[WARN] Local retrieval failed: {str(e)}")
+        metrics.incr("retrieval.error")
+        return []
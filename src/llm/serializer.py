@@ -0,0 +1,129 @@
+"""
+Compact report serialization for LLM prompts.
+
+Report data is rendered as minimal JSON (no indentation, no spaces after
+separators, non-ASCII kept as-is) with empty and placeholder values dropped.
+Output is deterministic for a given input: keys keep the order in which they
+were stored, which for key_findings is the priority order of the analysis.
+"""
+
+import asyncio
+import json
+import time
+import tiktoken
+import metrics
+
+# Values that carry no information for the model. The string "None" is kept on
+# purpose: "Allergies: None" is a finding, not a missing value.
+EMPTY_MARKERS = {"", "null", "nan", "undefined", "n/a", "not specified"}
+
+DEFAULT_TOKENIZER_MODEL = "gpt-4o"
+
+# A failed load (e.g. the BPE file could not be downloaded) is retried in the
+# background at most this often
+ENCODING_RETRY_INTERVAL = 300
+
+# model -> loaded encoding; failures are not cached
+_encodings = {}
+_failed_at = {}
+_loading = {}
+
+
+def prune(value):
+    """Recursively drop empty values; JSON stored as text is parsed first."""
+    if isinstance(value, dict):
+        pruned = {}
+        for key, item in value.items():
+            item = prune(item)
+            if item is not None:
+                pruned[str(key)] = item
+        return pruned or None
+
+    if isinstance(value, (list, tuple)):
+        pruned = [item for item in (prune(v) for v in value) if item is not None]
+        return pruned or None
+
+    if isinstance(value, str):
+        text = value.strip()
+        if text.lower() in EMPTY_MARKERS:
+            return None
+        if text[0] in "{[":
+            try:
+                return prune(json.loads(text))
+            except ValueError:
+                pass
+        return text
+
+    return value
+
+
+def serialize_report_data(data, call_site: str = None) -> str:
+    """
+    Render report data as compact JSON ("" when nothing is left after pruning).
+
+    When call_site is given, the token count of the rendered text is recorded
+    as the llm.<call_site>.report_tokens metric.
+    """
+    pruned = prune(data)
+    if pruned is None:
+        return ""
+
+    text = json.dumps(pruned, ensure_ascii=False, separators=(",", ":"), default=str)
+
+    if call_site:
+        metrics.observe(f"llm.{call_site}.report_tokens", count_tokens(text))
+
+    return text
+
+
+def load_encoding_sync(model: str):
+    """Load (possibly downloading) the encoding of a model; blocking."""
+    try:
+        encoding = tiktoken.encoding_for_model(model)
+    except Exception as e:
+        # e.g. the BPE file cannot be downloaded; counts fall back to an estimate
+        print(f"[WARN] tiktoken encoding unavailable for {model}: {str(e)}")
+        _failed_at[model] = time.monotonic()
+        return None
+    _encodings[model] = encoding
+    _failed_at.pop(model, None)
+    return encoding
+
+
+async def load_encodings(models):
+    """Load encodings off the event loop; called once at startup."""
+    await asyncio.gather(*(asyncio.to_thread(load_encoding_sync, model) for model in set(models)))
+
+
+def get_encoding(model: str):
+    """
+    tiktoken encoding for a model, or None while it is not loaded. Inside the
+    event loop a missing encoding is (re)loaded in a thread instead of
+    blocking; scripts without a loop load it directly.
+    """
+    encoding = _encodings.get(model)
+    if encoding is not None:
+        return encoding
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return load_encoding_sync(model)
+
+    failed_at = _failed_at.get(model)
+    if model not in _loading and (failed_at is None or time.monotonic() - failed_at >= ENCODING_RETRY_INTERVAL):
+        task = loop.create_task(asyncio.to_thread(load_encoding_sync, model))
+        _loading[model] = task
+        task.add_done_callback(lambda _: _loading.pop(model, None))
+    return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_TOKENIZER_MODEL) -> int:
+    """Exact token count with tiktoken, ~4 characters per token otherwise."""
+    if not text:
+        return 0
+    encoding = get_encoding(model)
+    if encoding is None:
+        metrics.incr("llm.token_count.estimated")
+        return (len(text) + 3) // 4
+    return len(encoding.encode(text))
@@ -0,0 +1,156 @@
+"""
+Token savings of the compact serializer on a small sample corpus.
+
+Compares the formats previously sent to the model (dashboard: every field
+pretty-printed with indent=2, including the whole insights dict; chat: the
+Python repr of the report dict) with serialize_report_data.
+
+Run with:
+    python -m src.llm.serializer_bench
+"""
+
+import json
+from src.llm.serializer import serialize_report_data, count_tokens
+
+SAMPLE_REPORTS = [
+    {
+        "summary": "Complete blood count and lipid profile of a 45 year old male. Hemoglobin and white cell count are within range; LDL cholesterol and triglycerides are elevated.",
+        "key_findings": {
+            "Hemoglobin": "14.5 g/dL (Normal)",
+            "WBC": "7.2 K/µL (Normal)",
+            "Platelets": "250 K/µL (Normal)",
+            "Total Cholesterol": "232 mg/dL (Slightly Elevated)",
+            "LDL Cholesterol": "162 mg/dL (High)",
+            "HDL Cholesterol": "41 mg/dL (Normal)",
+            "Triglycerides": "210 mg/dL (High)",
+            "Fasting Glucose": "98 mg/dL (Normal)",
+        },
+        "recommendations": [
+            "Reduce saturated fat intake and increase dietary fiber",
+            "Exercise at least 150 minutes per week",
+            "Repeat lipid profile in 3 months",
+        ],
+        "insights": {
+            "analysis": {
+                "summary": "Complete blood count and lipid profile of a 45 year old male. Hemoglobin and white cell count are within range; LDL cholesterol and triglycerides are elevated.",
+                "key_findings": {
+                    "Hemoglobin": "14.5 g/dL (Normal)",
+                    "WBC": "7.2 K/µL (Normal)",
+                    "Platelets": "250 K/µL (Normal)",
+                    "Total Cholesterol": "232 mg/dL (Slightly Elevated)",
+                    "LDL Cholesterol": "162 mg/dL (High)",
+                    "HDL Cholesterol": "41 mg/dL (Normal)",
+                    "Triglycerides": "210 mg/dL (High)",
+                    "Fasting Glucose": "98 mg/dL (Normal)",
+                },
+                "recommendations": [
+                    "Reduce saturated fat intake and increase dietary fiber",
+                    "Exercise at least 150 minutes per week",
+                    "Repeat lipid profile in 3 months",
+                ],
+                "insights": "Raised LDL and triglycerides indicate increased cardiovascular risk.",
+            },
+            "insights_one_line": "Raised LDL and triglycerides indicate increased cardiovascular risk.",
+            "medications": None,
+            "analyzed_at": "2025-10-21T09:14:03.512345+00:00",
+            "document_text_length": 3184,
+            "namespace": "report_2b0c6f3e-6c1f-4f1e-9d7a-3c8e5b1f2a90",
+        },
+    },
+    {
+        "summary": "Prescription for acute bronchitis with a five day antibiotic course and symptomatic relief.",
+        "key_findings": {
+            "Diagnosis": "Acute bronchitis",
+            "Doctor": "Dr. A. Sharma",
+            "Follow-up Required": "After 5 days",
+            "Treatment Duration": "5 days",
+            "Allergies": "None",
+        },
+        "recommendations": [
+            "Complete the full antibiotic course",
+            "Drink warm fluids and rest",
+            "N/A",
+        ],
+        "insights": {
+            "analysis": {
+                "summary": "Prescription for acute bronchitis with a five day antibiotic course and symptomatic relief.",
+                "key_findings": {
+                    "Diagnosis": "Acute bronchitis",
+                    "Doctor": "Dr. A. Sharma",
+                    "Follow-up Required": "After 5 days",
+                    "Treatment Duration": "5 days",
+                    "Allergies": "None",
+                },
+                "recommendations": [
+                    "Complete the full antibiotic course",
+                    "Drink warm fluids and rest",
+                    "N/A",
+                ],
+                "insights": "Short antibiotic course for a lower respiratory infection.",
+            },
+            "insights_one_line": "Short antibiotic course for a lower respiratory infection.",
+            "medications": [
+                {"name": "Azithromycin", "dosage": "500 mg", "frequency": "Once daily", "duration": "5 days", "instructions": "After food"},
+                {"name": "Paracetamol", "dosage": "650 mg", "frequency": "SOS", "duration": "Not specified", "instructions": "Not specified"},
+                {"name": "Ambroxol syrup", "dosage": "10 ml", "frequency": "Thrice daily", "duration": "5 days", "instructions": ""},
+            ],
+            "analyzed_at": "2025-10-22T16:40:11.009871+00:00",
+            "document_text_length": 1207,
+            "namespace": "report_91d4a7c2-0f3b-4a55-8e0d-6b2c1d9e7f41",
+        },
+    },
+]
+
+
+def legacy_dashboard_text(report: dict) -> str:
+    parts = []
+    for title, key in (
+        ("Summary", "summary"),
+        ("Key Findings", "key_findings"),
+        ("Insights", "insights"),
+        ("Recommendations", "recommendations"),
+    ):
+        value = report.get(key)
+        if value:
+            rendered = json.dumps(value, indent=2) if isinstance(value, (dict, list)) else str(value)
+            parts.append(f"{title}:\n{rendered}")
+    return "\n\n".join(parts)
+
+
+def compact_dashboard_text(report: dict) -> str:
+    insights = report.get("insights") or {}
+    return serialize_report_data({
+        "summary": report.get("summary"),
+        "key_findings": report.get("key_findings"),
+        "insights": insights.get("insights_one_line"),
+        "medications": insights.get("medications"),
+        "recommendations": report.get("recommendations"),
+    })
+
+
+def chat_report_data(report: dict) -> dict:
+    return {
+        "summary": report.get("summary"),
+        "key_findings": report.get("key_findings"),
+        "recommendations": report.get("recommendations"),
+        "insights": (report.get("insights") or {}).get("analysis", {}).get("insights"),
+    }
+
+
+def main():
+    totals = {"dashboard": [0, 0], "chat": [0, 0]}
+
+    for report in SAMPLE_REPORTS:
+        totals["dashboard"][0] += count_tokens(legacy_dashboard_text(report))
+        totals["dashboard"][1] += count_tokens(compact_dashboard_text(report))
+        totals["chat"][0] += count_tokens(str(chat_report_data(report)))
+        totals["chat"][1] += count_tokens(serialize_report_data(chat_report_data(report)))
+
+    print(f"{'path':<10} {'before':>8} {'after':>8} {'saved':>7}")
+    for path, (before, after) in totals.items():
+        saved = (1 - after / before) * 100 if before else 0.0
+        print(f"{path:<10} {before:>8} {after:>8} {saved:>6.1f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,35 @@
+import time
+import metrics
+
+
+def record_usage(call_site: str, response, started_at: float = None) -> dict:
+    """
+    Record token usage (including prompt-cache hits) and latency for an LLM call.
+
+    call_site is a short stable name such as "upload.analyze" or "chat.continue".
+    """
+    try:
+        usage = getattr(response, "usage", None)
+        prompt_tokens = getattr(usage, "prompt_tokens", 0) or 0
+        completion_tokens = getattr(usage, "completion_tokens", 0) or 0
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached_tokens = getattr(details, "cached_tokens", 0) or 0
+
+        metrics.incr(f"llm.{call_site}.calls")
+        metrics.incr(f"llm.{call_site}.prompt_tokens", prompt_tokens)
+        metrics.incr(f"llm.{call_site}.cached_tokens", cached_tokens)
+        metrics.incr(f"llm.{call_site}.completion_tokens", completion_tokens)
+
+        if started_at is not None:
+            metrics.observe(f"llm.{call_site}.latency", time.perf_counter() - started_at)
+
+        return {
+            "prompt_tokens": prompt_tokens,
+            "cached_tokens": cached_tokens,
+            "completion_tokens": completion_tokens,
+        }
+
+    except Exception as e:
+        # Usage accounting must never break the call site
+        print(f"[WARN] Failed to record LLM usage for {call_site}: {str(e)}")
+        return {}
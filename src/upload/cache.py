@@ -0,0 +1,117 @@
+import copy
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, update, delete, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from database.models.llm_cache import LLMCache
+from .prompt import PROMPTS, PROMPT_VERSIONS
+import config
+import metrics
+
+
+def prompt_version(report_type_name: str) -> str:
+    """Version string for a report type: manual version + hash of its template."""
+    template = PROMPTS.get(report_type_name, "")
+    template_hash = hashlib.sha256(template.encode("utf-8")).hexdigest()[:12]
+    return f"{PROMPT_VERSIONS.get(report_type_name, '0')}:{template_hash}"
+
+
+def build_cache_key(report_type_name: str, messages: list, model: str, **params) -> str:
+    """Hash every input that influences the LLM result into a stable cache key."""
+    payload = {
+        "report_type": report_type_name,
+        "prompt_version": prompt_version(report_type_name),
+        "model": model,
+        "params": params,
+        "messages": messages,
+    }
+    raw = json.dumps(payload, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+async def get_cached_analysis(db: AsyncSession, cache_key: str):
+    """Return a cached analysis for the key, or None on miss/expiry."""
+    try:
+        now = datetime.now(timezone.utc)
+        # Savepoint so a cache failure cannot abort the caller's transaction
+        async with db.begin_nested():
+            result = await db.execute(
+                select(LLMCache.response).where(
+                    LLMCache.cache_key == cache_key,
+                    LLMCache.expires_at > now,
+                )
+            )
+            response = result.scalar_one_or_none()
+
+            if response is None:
+                metrics.incr("analysis_cache.miss")
+                return None
+
+            await db.execute(
+                update(LLMCache)
+                .where(LLMCache.cache_key == cache_key)
+                .values(last_accessed_at=now, hit_count=LLMCache.hit_count + 1)
+            )
+        metrics.incr("analysis_cache.hit")
+        return copy.deepcopy(response)
+
+    except Exception as e:
+        # A broken cache must never break analysis
+        print(f"[WARN] Analysis cache lookup failed: {str(e)}")
+        metrics.incr("analysis_cache.error")
+        return None
+
+
+async def store_cached_analysis(db: AsyncSession, cache_key: str, report_type_name: str, model: str, analysis: dict):
+    """Add (or refresh) a cache entry and evict expired / superseded / overflow entries."""
+    try:
+        now = datetime.now(timezone.utc)
+        entry = LLMCache(
+            cache_key=cache_key,
+            report_type=report_type_name,
+            prompt_version=prompt_version(report_type_name),
+            model=model,
+            response=copy.deepcopy(analysis),
+            hit_count=0,
+            created_at=now,
+            expires_at=now + timedelta(seconds=config.ANALYSIS_CACHE_TTL_SECONDS),
+            last_accessed_at=now,
+        )
+        async with db.begin_nested():
+            await db.merge(entry)
+            await db.flush()
+            await evict_cache_entries(db, report_type_name)
+
+    except Exception as e:
+        print(f"[WARN] Analysis cache store failed: {str(e)}")
+        metrics.incr("analysis_cache.error")
+
+
+async def evict_cache_entries(db: AsyncSession, report_type_name: str):
+    """TTL, prompt-version and size based eviction, all as set-based deletes."""
+    now = datetime.now(timezone.utc)
+
+    expired = await db.execute(delete(LLMCache).where(LLMCache.expires_at <= now))
+
+    # Entries produced by an older prompt of this report type can never hit again
+    superseded = await db.execute(
+        delete(LLMCache).where(
+            and_(
+                LLMCache.report_type == report_type_name,
+                LLMCache.prompt_version != prompt_version(report_type_name),
+            )
+        )
+    )
+
+    # Keep only the most recently used entries
+    overflow_keys = (
+        select(LLMCache.cache_key)
+        .order_by(LLMCache.last_accessed_at.desc())
+        .offset(config.ANALYSIS_CACHE_MAX_ENTRIES)
+    )
+    overflow = await db.execute(delete(LLMCache).where(LLMCache.cache_key.in_(overflow_keys)))
+
+    evicted = (expired.rowcount or 0) + (superseded.rowcount or 0) + (overflow.rowcount or 0)
+    if evicted:
+        metrics.incr("analysis_cache.evicted", evicted)
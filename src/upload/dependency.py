@@ -1,7 +1,7 @@
 from fastapi import HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models.report_type import ReportType
-from langfuse.openai import OpenAI
+from langfuse.openai import OpenAI, AsyncOpenAI
 from pinecone import Pinecone
 from slowapi import Limiter
 from slowapi.util import get_remote_address
@@ -9,6 +9,7 @@ import config
 
 # OpenAI Initialization
 openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
+async_openai_client = AsyncOpenAI(api_key=config.OPENAI_API_KEY)
 
 # Pinecone Initialization
 pinecone_client = Pinecone(api_key=config.PINECONE_API_KEY)
@@ -4,13 +4,29 @@ from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 from database.models.report import Report
 from database.models.report_type import ReportType
-from .dependency import pinecone_index
+from .dependency import pinecone_index, async_openai_client
+from database.settings import AsyncSessionLocal
 from .prompt import PROMPTS
+from .cache import build_cache_key, get_cached_analysis, store_cached_analysis
+from src.llm.usage import record_usage
+from src.dashboard.observations import biomarkers_from_key_findings, replace_observations, observation_time
+from src.chat.answer_cache import invalidate_report_answers
+from src.chat.faq import generate_report_faq
+from src.llm.disconnect import record_wasted_tokens
+from src.llm.budget import fit_messages, prompt_budget
+import config
+import metrics
+import asyncio
 import json
 import re
+import time
 from uuid import UUID
 from datetime import datetime, timezone
 
+ANALYSIS_MODEL = "gpt-4o"
+ANALYSIS_TEMPERATURE = 0.2
+ANALYSIS_MAX_TOKENS = 2000
+
 async def file_upload(
     file: UploadFile,
     file_id: UUID,
@@ -29,6 +45,29 @@ async def file_upload(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"File upload failed: {str(e)}")
 
+def build_analysis_messages(prompt_template: str, document_text: str) -> list:
+    """
+    Build the analysis messages so that everything static for a report type
+    comes first and byte-identical, and the document text is the last message.
+    """
+    system_content = (
+        "You are a medical analysis engine. Always output valid JSON.\n"
+        f"{prompt_template}\n"
+        "IMPORTANT:\n"
+        "- Return ONLY valid JSON.\n"
+        "- No markdown, no comments, no extra text.\n"
+        "- insights MUST be a ONE-LINE meaningful interpretation."
+    )
+    user_content = (
+        "=== DOCUMENT TEXT TO ANALYZE ===\n"
+        f"{document_text}\n"
+        "=== END DOCUMENT TEXT ==="
+    )
+    return [
+        {"role": "system", "content": system_content},
+        {"role": "user", "content": user_content},
+    ]
+
 def extract_json_from_text(text: str) -> dict:
     """Extract clean JSON from LLM output."""
     try:
@@ -61,7 +100,7 @@ async def analyze_report(file_id: str, db: AsyncSession, openai_client):
         
         # Fetch stored text from Pinecone
         try:
-            fetched = pinecone_index.fetch(ids=[str(file_id)], namespace=namespace)
+            fetched = await asyncio.to_thread(pinecone_index.fetch, ids=[str(file_id)], namespace=namespace)
             vector_data = fetched.vectors.get(str(file_id))
             
             if not vector_data or "text" not in vector_data.metadata:
@@ -90,59 +129,71 @@ async def analyze_report(file_id: str, db: AsyncSession, openai_client):
         if not prompt_template:
             raise HTTPException(400, f"No analysis prompt for report type: {report_type.name}")
         
-        # Prepare OpenAI Prompt
-        full_prompt = f"""
-            {prompt_template}
-            === DOCUMENT TEXT TO ANALYZE ===
-            {document_text}
-            === END DOCUMENT TEXT ===
-            IMPORTANT:
-            - Return ONLY valid JSON.
-            - No markdown, no comments, no extra text.
-            - insights MUST be a ONE-LINE meaningful interpretation.
-        """
+        # Static instructions first (cacheable prefix), document text last
+        messages = build_analysis_messages(prompt_template, document_text)
+        # Very long documents are cut to the budget rather than failing at the API
+        messages = fit_messages(
+            messages,
+            prompt_budget(ANALYSIS_MODEL, config.ANALYSIS_PROMPT_TOKEN_BUDGET, ANALYSIS_MAX_TOKENS),
+            "upload.analyze",
+            ANALYSIS_MODEL,
+        )
+        
+        # Identical inputs -> reuse the previous analysis instead of calling OpenAI
+        cache_key = build_cache_key(
+            report_type.name,
+            messages,
+            ANALYSIS_MODEL,
+            temperature=ANALYSIS_TEMPERATURE,
+            max_tokens=ANALYSIS_MAX_TOKENS,
+        )
+        analysis = await get_cached_analysis(db, cache_key)
         
         # OpenAI Call
-        try:
-            completion = openai_client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are a medical analysis engine. Always output valid JSON."
-                    },
-                    {"role": "user", "content": full_prompt}
-                ],
-                max_tokens=2000,
-                temperature=0.2,
-                response_format={"type": "json_object"}
-            )
-            
-            ai_response = completion.choices[0].message.content.strip()
-            analysis = extract_json_from_text(ai_response)
-            
-            # Fix schema issues
-            analysis.setdefault("summary", "Medical document analyzed successfully")
-            analysis.setdefault("key_findings", {})
-            analysis.setdefault("recommendations", [])
-            
-            # Ensure insights is one-liner
-            insights_value = analysis.get("insights", "")
-            if isinstance(insights_value, list):
-                insights_value = " | ".join(map(str, insights_value))
-            elif isinstance(insights_value, dict):
-                insights_value = " | ".join(f"{k}: {v}" for k, v in insights_value.items())
-            insights_value = str(insights_value).replace("\n", " ").strip()
-            analysis["insights"] = insights_value[:500]
-            
-        except Exception as e:
-            # Fallback response
-            analysis = {
-                "summary": "Analysis failed",
-                "key_findings": {"error": str(e)},
-                "insights": "Analysis failed due to AI processing error.",
-                "recommendations": ["Please try again with a clearer document"]
-            }
+        if analysis is None:
+            try:
+                started_at = time.perf_counter()
+                try:
+                    completion = await openai_client.chat.completions.create(
+                        model=ANALYSIS_MODEL,
+                        messages=messages,
+                        max_tokens=ANALYSIS_MAX_TOKENS,
+                        temperature=ANALYSIS_TEMPERATURE,
+                        response_format={"type": "json_object"}
+                    )
+                except asyncio.CancelledError:
+                    record_wasted_tokens("upload.analyze", messages)
+                    raise
+                record_usage("upload.analyze", completion, started_at)
+                
+                ai_response = completion.choices[0].message.content.strip()
+                analysis = extract_json_from_text(ai_response)
+                
+                # Fix schema issues
+                analysis.setdefault("summary", "Medical document analyzed successfully")
+                analysis.setdefault("key_findings", {})
+                analysis.setdefault("recommendations", [])
+                
+                # Ensure insights is one-liner
+                insights_value = analysis.get("insights", "")
+                if isinstance(insights_value, list):
+                    insights_value = " | ".join(map(str, insights_value))
+                elif isinstance(insights_value, dict):
+                    insights_value = " | ".join(f"{k}: {v}" for k, v in insights_value.items())
+                insights_value = str(insights_value).replace("\n", " ").strip()
+                analysis["insights"] = insights_value[:500]
+                
+                # Only successful analyses are cached
+                await store_cached_analysis(db, cache_key, report_type.name, ANALYSIS_MODEL, analysis)
+                
+            except Exception as e:
+                # Fallback response
+                analysis = {
+                    "summary": "Analysis failed",
+                    "key_findings": {"error": str(e)},
+                    "insights": "Analysis failed due to AI processing error.",
+                    "recommendations": ["Please try again with a clearer document"]
+                }
         
         # Update DB
         try:
@@ -151,11 +202,12 @@ async def analyze_report(file_id: str, db: AsyncSession, openai_client):
             report.key_findings = analysis["key_findings"]
             report.recommendations = analysis["recommendations"]
             
-            # Update insights dictionary
-            if not report.insights:
-                report.insights = {}
-            
-            report.insights.update({
+            # Update insights dictionary. Reassigned rather than updated in
+            # place: a plain JSON column does not track in-place mutations
+            insights = dict(report.insights or {})
+            # Suggested questions belong to the previous analysis
+            insights.pop("faq", None)
+            insights.update({
                 "analysis": analysis,
                 "insights_one_line": analysis["insights"],
                 "medications": medications,
@@ -163,11 +215,25 @@ async def analyze_report(file_id: str, db: AsyncSession, openai_client):
                 "document_text_length": len(document_text),
                 "namespace": namespace,
             })
+            report.insights = insights
+            
+            # Keep the biomarker time series in sync with the latest analysis
+            if "blood" in report_type.name.lower() and "error" not in analysis["key_findings"]:
+                await replace_observations(
+                    db,
+                    report.user_id,
+                    report.report_id,
+                    observation_time(analysis.get("report_date"), report.uploaded_at),
+                    biomarkers_from_key_findings(analysis["key_findings"]),
+                )
             
             db.add(report)
             await db.commit()
             await db.refresh(report)
             
+            # Answers given for the previous analysis may no longer hold
+            invalidate_report_answers(report.report_id)
+            
             if medications:
                 analysis["medications"] = medications
                 
@@ -180,4 +246,26 @@ async def analyze_report(file_id: str, db: AsyncSession, openai_client):
     except HTTPException:
         raise
     except Exception as e:
-        raise HTTPException(500, f"Analysis failed: {str(e)}")
\ No newline at end of file
+        raise HTTPException(500, f"Analysis failed: {str(e)}")
+
+async def reanalyze_reports(report_ids: list):
+    """
+    Background batch for bulk re-analysis: at most BULK_REANALYZE_CONCURRENCY
+    analyses at a time, each in its own session, followed by its suggested
+    questions. One failing report does not stop the others.
+    """
+    semaphore = asyncio.Semaphore(config.BULK_REANALYZE_CONCURRENCY)
+
+    async def reanalyze(report_id):
+        async with semaphore:
+            try:
+                async with AsyncSessionLocal() as session:
+                    analysis = await analyze_report(str(report_id), session, async_openai_client)
+                if "error" not in analysis.get("key_findings", {}):
+                    await generate_report_faq(report_id)
+                metrics.incr("report.bulk.reanalyzed")
+            except Exception as e:
+                print(f"[WARN] Bulk re-analysis failed for {report_id}: {str(e)}")
+                metrics.incr("report.bulk.reanalyze_error")
+
+    await asyncio.gather(*(reanalyze(report_id) for report_id in report_ids))
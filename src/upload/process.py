@@ -7,8 +7,15 @@ from pdf2image import convert_from_bytes
 from PIL import Image
 from database.models.report import Report
 from database.settings import AsyncSessionLocal
-from .dependency import openai_client, pinecone_index
+from .dependency import openai_client, pinecone_index, EMBEDDING_MODEL
 from .utils import generate_namespace, ocr_image, create_file_id
+from src.llm.retrieval import index_document_chunks
+from src.llm.usage import record_usage
+from src.llm.budget import truncate_to_tokens
+import time
+
+# Input limit of the embedding model
+EMBEDDING_MAX_TOKENS = 8191
 
 MIN_TEXT_LENGTH = 20
 
@@ -91,12 +98,15 @@ async def generate_embedding(text: str):
                 f"(minimum {MIN_TEXT_LENGTH} required)"
             )
         
-        truncated_text = text[:80000]
+        # The model rejects longer input; cut by tokens, not characters
+        truncated_text = truncate_to_tokens(text, EMBEDDING_MAX_TOKENS, EMBEDDING_MODEL, marker="")
         
+        started_at = time.perf_counter()
         response = openai_client.embeddings.create(
-            model="text-embedding-3-small",
+            model=EMBEDDING_MODEL,
             input=truncated_text
         )
+        record_usage("upload.embedding", response, started_at)
         embedding = response.data[0].embedding
         
         if len(embedding) != 1536:
@@ -129,7 +139,7 @@ async def process_upload(file: UploadFile, file_id=None, content: bytes = None):
     Main pipeline:
     1. Extract text using OpenAI Vision
     2. Generate embedding
-    3. Upload to Pinecone
+    3. Upload to Pinecone (whole document + retrieval chunks)
     4. Update Postgres report status
     """
     try:
@@ -159,6 +169,13 @@ async def process_upload(file: UploadFile, file_id=None, content: bytes = None):
         # Upload to Pinecone
         namespace = await upload_to_pinecone(file_id, file.filename, embedding, text)
         
+        # Chunks for chat retrieval; chat falls back to a local index if this fails
+        chunk_count = 0
+        try:
+            chunk_count = await index_document_chunks(file_id, file.filename, namespace, text)
+        except Exception as e:
+            print(f"[WARN] Chunk indexing failed for {file_id}: {str(e)}")
+        
         # Update database
         async with AsyncSessionLocal() as session:
             stmt = (
@@ -166,7 +183,7 @@ async def process_upload(file: UploadFile, file_id=None, content: bytes = None):
                 .where(Report.report_id == file_id)
                 .values(
                     summary={"text_length": len(text), "preview": text[:500]},
-                    insights={"namespace": namespace, "extraction_method": "vision_api"},
+                    insights={"namespace": namespace, "extraction_method": "vision_api", "chunk_count": chunk_count},
                     status="completed",
                     uploaded_at=datetime.now(timezone.utc)
                 )
@@ -107,6 +107,7 @@ PROMPTS = {
         OUTPUT FORMAT (JSON):
         {
             "summary": "One concise sentence describing overall results",
+            "report_date": "Sample collection (or report) date as YYYY-MM-DD, or Not specified",
             "key_findings": {
                 "Parameter 1 Name": "X.XX unit (Status)",
                 "Parameter 2 Name": "X.XX unit (Status)",
@@ -140,6 +141,7 @@ PROMPTS = {
         EXAMPLE OUTPUT:
         {
             "summary": "Blood test results show normal hemoglobin and white blood cells with slightly elevated cholesterol levels.",
+            "report_date": "2025-03-14",
             "key_findings": {
                 "Hemoglobin": "14.5 g/dL (Normal)",
                 "White Blood Cells": "7.2 K/µL (Normal)",
@@ -162,4 +164,12 @@ PROMPTS = {
         - Make recommendations specific to findings
         - If all normal: provide general health recommendations
     """)
-}
\ No newline at end of file
+}
+
+# Bump a report type's version when its prompt semantics change without the
+# template text changing (e.g. post-processing rules). Cached analyses are keyed
+# on this version and on a hash of the template, so only that type is invalidated.
+PROMPT_VERSIONS = {
+    "medical_prescription": "1",
+    "blood_test_report": "1",
+}
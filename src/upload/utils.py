@@ -3,7 +3,10 @@ import base64
 from io import BytesIO
 from PIL import Image, ImageOps, ImageEnhance
 from langfuse.openai import OpenAI
+from src.llm.usage import record_usage
+from src.llm.budget import measure_prompt
 import config
+import time
 
 openai_client = OpenAI(api_key=config.OPENAI_API_KEY)
 
@@ -96,30 +99,36 @@ If there are tables, preserve their structure.
 Pay special attention to handwritten text - decode it carefully.
 Do not add any explanations or descriptions."""
         
-        # Call OpenAI Vision API
+        # Call OpenAI Vision API (static instructions before the image)
+        messages = [
+            {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "text",
+                        "text": extraction_prompt
+                    },
+                    {
+                        "type": "image_url",
+                        "image_url": {
+                            "url": f"data:image/{img_format.lower()};base64,{base64_image}",
+                            "detail": "high"
+                        }
+                    }
+                ]
+            }
+        ]
+        # Fixed instructions plus one bounded image: measured, nothing to trim
+        measure_prompt(messages, "upload.ocr")
+
+        started_at = time.perf_counter()
         response = openai_client.chat.completions.create(
             model="gpt-4o",
-            messages=[
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": extraction_prompt
-                        },
-                        {
-                            "type": "image_url",
-                            "image_url": {
-                                "url": f"data:image/{img_format.lower()};base64,{base64_image}",
-                                "detail": "high"
-                            }
-                        }
-                    ]
-                }
-            ],
+            messages=messages,
             max_tokens=4096,
             temperature=0.1
         )
+        record_usage("upload.ocr", response, started_at)
         
         text = response.choices[0].message.content.strip()
         return text if text else ""
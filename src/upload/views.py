@@ -1,18 +1,31 @@
 import os
 from fastapi import APIRouter, UploadFile, Form, File, Depends, HTTPException, Request, BackgroundTasks
 from sqlalchemy.ext.asyncio import AsyncSession
-from .dependency import limiter, get_report_type, allowed_file, openai_client
+from .dependency import limiter, get_report_type, allowed_file, async_openai_client
 from .manager import file_upload, analyze_report
 from .schema import FileUploadResponse, AnalysisResponse
 from database.gets import get_db
+from database.settings import AsyncSessionLocal
 from database.models.report import Report
 from datetime import datetime, timezone
 from src.auth.dependency import get_current_user
+from src.chat.faq import generate_report_faq
+from src.llm.disconnect import run_until_disconnect
+import config
 from sqlalchemy import insert, select
 from uuid import uuid4
 
 upload_router = APIRouter(tags=["Upload"])
 
+async def analyze_in_own_session(file_id: str):
+    # Own session: the analysis may outlive the request (see run_until_disconnect)
+    async with AsyncSessionLocal() as session:
+        return await analyze_report(file_id, session, async_openai_client)
+
+async def generate_faq_after_analysis(report_id, analysis: dict):
+    if "error" not in analysis.get("key_findings", {}):
+        await generate_report_faq(report_id)
+
 @upload_router.post("/upload-file", response_model=FileUploadResponse)
 @limiter.limit("5/minute")
 async def upload_file(
@@ -120,6 +133,8 @@ async def get_report_status(
 @upload_router.post("/analyze/{file_id}", response_model=AnalysisResponse)
 async def analyze_report_file(
     file_id: str, 
+    request: Request,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
@@ -140,7 +155,20 @@ async def analyze_report_file(
         if not report:
             raise HTTPException(status_code=404, detail="Report not found")
         
-        analysis = await analyze_report(file_id, db, openai_client)
+        # If the client leaves, the analysis still completes and is stored
+        # (ANALYSIS_DETACH_ON_DISCONNECT) or is cancelled
+        analysis = await run_until_disconnect(
+            request,
+            analyze_in_own_session(file_id),
+            "upload.analyze",
+            detach=config.ANALYSIS_DETACH_ON_DISCONNECT,
+            on_detached_result=lambda result: generate_faq_after_analysis(report.report_id, result),
+        )
+        
+        # Suggested questions are answered after the response is sent
+        if "error" not in analysis.get("key_findings", {}):
+            background_tasks.add_task(generate_report_faq, report.report_id)
+        
         return analysis
         
     except HTTPException:
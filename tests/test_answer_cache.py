@@ -0,0 +1,19 @@
+from uuid import uuid4
+import numpy as np
+from src.chat import answer_cache
+
+
+def unit(vector):
+    vector = np.asarray(vector, dtype=np.float32)
+    return vector / np.linalg.norm(vector)
+
+
+def test_answers_of_an_older_analysis_are_not_served():
+    report_id = uuid4()
+    question = unit([1.0, 0.0])
+    answer_cache.store_answer(report_id, "2025-01-01T00:00:00", "Is my LDL high?", question, "Yes, slightly.")
+
+    assert answer_cache.lookup_answer(report_id, "2025-01-01T00:00:00", question)[0] == "Yes, slightly."
+    # Re-analyzed, possibly in another worker
+    assert answer_cache.lookup_answer(report_id, "2025-02-01T00:00:00", question) is None
+    assert answer_cache.lookup_answer(report_id, "2025-01-01T00:00:00", question) is None
@@ -0,0 +1,142 @@
+from types import SimpleNamespace
+import pytest
+import config
+from src.dashboard.builder import build_dashboard_from_analysis, finish_built_dashboard, missing_narrative_fields, parse_finding
+from src.dashboard.reference import evaluate_biomarkers, summarize_biomarkers
+
+
+@pytest.fixture
+def dashboard_manager(monkeypatch):
+    """src.dashboard.manager without contacting OpenAI or Pinecone at import."""
+    import pinecone
+    for name in ("OPENAI_API_KEY", "PINECONE_API_KEY", "PINECONE_INDEX_NAME"):
+        monkeypatch.setattr(config, name, getattr(config, name) or "test")
+    monkeypatch.setattr(pinecone.Pinecone, "has_index", lambda self, name: True)
+    monkeypatch.setattr(pinecone.Pinecone, "Index", lambda self, name: None)
+    from src.dashboard import manager
+    return manager
+
+
+def blood_report(key_findings, one_line="Most values are normal."):
+    return SimpleNamespace(
+        key_findings=key_findings,
+        recommendations=["Repeat the CBC in 3 months"],
+        insights={"insights_one_line": one_line},
+        uploaded_at=None,
+    )
+
+
+def test_thousands_separator_value():
+    finding = parse_finding("Platelet Count", "150,000 /cumm (Normal)")
+    assert finding["currentValue"] == 150000.0
+    assert finding["unit"] == "/cumm"
+
+
+def test_units_starting_with_digit_or_slash():
+    assert parse_finding("WBC", "7.2 10^3/µL (Normal)")["unit"] == "10^3/µL"
+    finding = parse_finding("Platelets", "250 /cumm")
+    assert finding["currentValue"] == 250.0
+    assert finding["unit"] == "/cumm"
+
+
+def test_two_part_values_are_not_numeric():
+    finding = parse_finding("Blood Pressure", "128/82 mmHg (Elevated)")
+    assert finding["currentValue"] is None
+    assert finding["status"] == "High"
+
+
+def validated(dashboard):
+    """What validate_dashboard_data does to a blood test's chart and topBar."""
+    middle = dashboard["middleSection"]
+    middle["biomarkerChart"] = [{"status": None, **b} for b in evaluate_biomarkers(middle["biomarkerChart"])]
+    dashboard["topBar"].update(summarize_biomarkers(middle["biomarkerChart"]))
+    return dashboard
+
+
+def test_blood_test_critical_insights_skip_the_narrative_call():
+    report = blood_report({"Hemoglobin": "10.1 g/dL (Low)", "WBC": "7.2 10^3/µL (Normal)"})
+    dashboard = build_dashboard_from_analysis(report, "blood_test")
+    assert missing_narrative_fields(dashboard, "blood_test") == []
+
+    dashboard = finish_built_dashboard(validated(dashboard), report, "blood_test")
+    assert dashboard["criticalInsights"] == ["Hemoglobin is low at 10.1 g/dL", "Most values are normal."]
+
+
+def test_critical_insights_follow_the_evaluated_status():
+    # The analysis called it low; 14.5 g/dL is within the default range
+    report = blood_report({"Hemoglobin": "14.5 g/dL (Low)"}, one_line="Hemoglobin is low, suggesting anemia.")
+    dashboard = finish_built_dashboard(
+        validated(build_dashboard_from_analysis(report, "blood_test")), report, "blood_test"
+    )
+    assert dashboard["middleSection"]["biomarkerChart"][0]["status"] == "Normal"
+    assert dashboard["topBar"]["overallReportStatus"] == "Normal"
+    assert dashboard["criticalInsights"] == ["All evaluated markers are within their reference ranges."]
+
+
+def test_report_date_prefers_the_extracted_test_date():
+    from datetime import datetime, timezone
+    from src.dashboard.builder import report_date
+
+    report = blood_report({})
+    report.uploaded_at = datetime(2025, 6, 1, 9, 30, tzinfo=timezone.utc)
+    assert report_date(report) == "2025-06-01"
+
+    report.insights["analysis"] = {"report_date": "14/03/2025"}
+    assert report_date(report) == "2025-03-14"
+
+
+def test_unclassified_markers_survive_validation(dashboard_manager):
+    dashboard = {
+        "topBar": {"overallReportStatus": "Normal", "abnormalValueCount": 0, "mostCriticalMarker": "None", "testDate": "2025-03-14"},
+        "middleSection": {"biomarkerChart": [
+            {"testName": "ESR", "currentValue": "10", "unit": "mm/hr"},
+            {"testName": "Uric Acid", "currentValue": "9.1", "unit": "mg/dL"},
+            {"testName": "Hemoglobin", "currentValue": "10.1", "unit": "g/dL"},
+        ]},
+    }
+    chart = dashboard_manager.validate_dashboard_data(dashboard, "blood_test")["middleSection"]["biomarkerChart"]
+    assert [(b["testName"], b["status"]) for b in chart] == [("ESR", None), ("Uric Acid", None), ("Hemoglobin", "Low")]
+    assert dashboard["topBar"]["abnormalValueCount"] == 1
+
+
+class VersionRowSession:
+    """Stub AsyncSession: execute() returns the dashboard version row; any other use fails."""
+
+    def __init__(self, row):
+        self.row = row
+        self.executed = 0
+
+    async def execute(self, statement, *args, **kwargs):
+        self.executed += 1
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+    def __getattr__(self, name):
+        raise AssertionError(f"unexpected session call: {name}")
+
+
+def test_dashboard_read_is_one_query_on_a_miss_and_a_hit(dashboard_manager):
+    import asyncio
+    from datetime import datetime, timezone
+    from uuid import uuid4
+
+    row = SimpleNamespace(
+        dashboard_id=uuid4(), updated_at=datetime.now(timezone.utc), dashboard_type="blood_test",
+        user_id=uuid4(), report_id=uuid4(), created_at=datetime.now(timezone.utc),
+        top_bar={"overallReportStatus": "Normal"}, middle_section={}, recommendations=[], critical_insights=[],
+        cached=False,
+    )
+
+    async def read(session):
+        version = await dashboard_manager.get_dashboard_version(row.report_id, session)
+        return await dashboard_manager.get_dashboard_response_body(version, session)
+
+    miss = VersionRowSession(row)
+    body = asyncio.run(read(miss))
+    assert b'"overallReportStatus":"Normal"' in body
+    assert miss.executed == 1
+
+    # The cached version comes back without its JSON columns
+    cached_row = SimpleNamespace(**{**vars(row), "top_bar": None, "middle_section": None, "cached": True})
+    hit = VersionRowSession(cached_row)
+    assert asyncio.run(read(hit)) == body
+    assert hit.executed == 1
@@ -0,0 +1,223 @@
+"""
+Per-request query counts of a chat turn.
+
+The first tests count db.execute calls on a stub session and always run. The
+Postgres tests count real statements with a before_cursor_execute listener on
+the engine; they need the configured database with the schema created (run
+the app once), are skipped when it is not reachable, and run in a
+transaction that is rolled back.
+"""
+
+import asyncio
+from contextlib import contextmanager
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from sqlalchemy import event, text
+import config
+
+
+@pytest.fixture
+def chat_manager(monkeypatch):
+    """src.chat.manager without contacting OpenAI or Pinecone at import."""
+    import pinecone
+    for name in ("OPENAI_API_KEY", "PINECONE_API_KEY"):
+        monkeypatch.setattr(config, name, getattr(config, name) or "test")
+    monkeypatch.setattr(pinecone.Pinecone, "has_index", lambda self, name: True)
+    monkeypatch.setattr(pinecone.Pinecone, "Index", lambda self, name: None)
+    monkeypatch.setattr(config, "RAG_ENABLED", False)
+    from src.chat import manager
+    return manager
+
+
+class CountingSession:
+    """Stub AsyncSession: execute() returns the joined chat row; any other use fails."""
+
+    def __init__(self, row):
+        self.row = row
+        self.executed = 0
+
+    async def execute(self, statement, *args, **kwargs):
+        self.executed += 1
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+    def __getattr__(self, name):
+        raise AssertionError(f"unexpected session call: {name}")
+
+
+def stub_chat_row():
+    from database.models import Chat, Report, ReportType
+
+    report = Report(
+        report_id=uuid4(),
+        key_findings={"Hemoglobin": "14.5 g/dL (Normal)"},
+        insights={
+            "analyzed_at": "2025-01-01T00:00:00+00:00",
+            "faq": {"items": [{"id": "faq-1", "question": "Is my hemoglobin normal?", "answer": "Yes."}]},
+        },
+        is_valid_report=True,
+    )
+    chat = Chat(chat_id=uuid4(), chat_name="CBC", is_valid_chat=True, file_id=report.report_id)
+    recent_turns = [{"user_query": f"q{i}", "bot_response": f"a{i}"} for i in range(3)]
+    return chat, report, ReportType(name="Blood Test"), recent_turns
+
+
+def test_prepare_chat_turn_executes_one_query(chat_manager):
+    from src.chat.schema import ContinueChatRequest
+
+    row = stub_chat_row()
+    chat = row[0]
+    session = CountingSession(row)
+    turn = asyncio.run(chat_manager.prepare_chat_turn(
+        ContinueChatRequest(chat_id=chat.chat_id, user_query="What is MCV?"), session
+    ))
+    assert turn["messages"]
+    assert session.executed == 1
+
+
+def test_suggested_question_executes_one_query(chat_manager):
+    from src.chat.schema import ContinueChatRequest
+
+    row = stub_chat_row()
+    chat = row[0]
+    session = CountingSession(row)
+    turn = asyncio.run(chat_manager.prepare_chat_turn(
+        ContinueChatRequest(chat_id=chat.chat_id, suggested_question_id="faq-1"), session
+    ))
+    assert turn["ready_answer"] == "Yes."
+    assert session.executed == 1
+
+
+def test_summary_only_when_turns_fall_outside_the_window(chat_manager, monkeypatch):
+    from src.chat.context import ContextTurn, select_context_window
+
+    monkeypatch.setattr(config, "CHAT_CONTEXT_MAX_TURNS", 3)
+    recent = [ContextTurn(f"q{i}", f"a{i}") for i in range(4)]
+
+    turns, has_older = select_context_window(recent[:3])
+    assert len(turns) == 3
+    assert not has_older
+
+    # The look-ahead row only signals that older turns exist
+    turns, has_older = select_context_window(recent)
+    assert turns == list(reversed(recent[:3]))
+    assert has_older
+
+
+@pytest.fixture(scope="module")
+def database():
+    if not config.DB_HOST:
+        pytest.skip("DB_HOST is not configured")
+
+    async def ping():
+        from database.settings import engine
+        try:
+            async with engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+        finally:
+            await engine.dispose()
+
+    try:
+        asyncio.run(asyncio.wait_for(ping(), 5))
+    except Exception as e:
+        pytest.skip(f"database unavailable: {e}")
+
+
+@contextmanager
+def count_statements(engine):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(engine.sync_engine, "before_cursor_execute", record)
+
+
+async def seed_chat(session):
+    from database.models import User, ReportType, Report, Chat, Message
+
+    user = User(user_email=f"{uuid4()}@example.com", hashed_password="x")
+    report_type = ReportType(name=f"blood test {uuid4()}")
+    session.add_all([user, report_type])
+    await session.flush()
+
+    report = Report(
+        user_id=user.user_id,
+        report_type_id=report_type.report_type_id,
+        report_name="cbc.pdf",
+        key_findings={"Hemoglobin": "14.5 g/dL (Normal)"},
+        insights={
+            "analyzed_at": "2025-01-01T00:00:00+00:00",
+            "faq": {"items": [{"id": "faq-1", "question": "Is my hemoglobin normal?", "answer": "Yes."}]},
+        },
+        is_valid_report=True,
+    )
+    session.add(report)
+    await session.flush()
+
+    chat = Chat(chat_name="CBC", created_by=user.user_id, file_id=report.report_id)
+    session.add(chat)
+    await session.flush()
+
+    session.add_all([
+        Message(chat_id=chat.chat_id, user_id=user.user_id, user_query=f"q{i}", bot_response=f"a{i}", metadatas={})
+        for i in range(3)
+    ])
+    await session.flush()
+    return chat
+
+
+def run_turn(body):
+    """Seed a chat, run body(session, chat) and return the statements it executed."""
+    async def run():
+        from database.settings import AsyncSessionLocal, engine
+        try:
+            async with AsyncSessionLocal() as session:
+                try:
+                    chat = await seed_chat(session)
+                    with count_statements(engine) as statements:
+                        await body(session, chat)
+                    return statements
+                finally:
+                    await session.rollback()
+        finally:
+            await engine.dispose()
+
+    return asyncio.run(run())
+
+
+def test_load_chat_turn_is_one_statement(database, chat_manager):
+    load_chat_turn = chat_manager.load_chat_turn
+    from src.chat.schema import ContinueChatRequest
+
+    async def body(session, chat):
+        _, _, _, recent = await load_chat_turn(ContinueChatRequest(chat_id=chat.chat_id, user_query="hi"), session)
+        assert len(recent) == 3
+
+    assert len(run_turn(body)) == 1
+
+
+def test_prepare_chat_turn_is_one_statement(database, chat_manager):
+    prepare_chat_turn = chat_manager.prepare_chat_turn
+    from src.chat.schema import ContinueChatRequest
+
+    async def body(session, chat):
+        turn = await prepare_chat_turn(ContinueChatRequest(chat_id=chat.chat_id, user_query="What is MCV?"), session)
+        assert turn["messages"]
+
+    assert len(run_turn(body)) == 1
+
+
+def test_suggested_question_is_one_statement(database, chat_manager):
+    prepare_chat_turn = chat_manager.prepare_chat_turn
+    from src.chat.schema import ContinueChatRequest
+
+    async def body(session, chat):
+        turn = await prepare_chat_turn(ContinueChatRequest(chat_id=chat.chat_id, suggested_question_id="faq-1"), session)
+        assert turn["ready_answer"] == "Yes."
+
+    assert len(run_turn(body)) == 1
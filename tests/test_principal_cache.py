@@ -0,0 +1,79 @@
+import asyncio
+from types import SimpleNamespace
+from uuid import uuid4
+import pytest
+from fastapi import HTTPException
+from src.auth import dependency
+from src.auth import cache
+from src.auth.cache import Principal, invalidate_principal, store_principal
+
+
+def request_for(user_id):
+    return SimpleNamespace(session={"user_id": user_id} if user_id else {})
+
+
+def test_cache_hit_opens_no_session(monkeypatch):
+    def no_session():
+        raise AssertionError("a cache hit must not open a session")
+
+    monkeypatch.setattr(dependency, "AsyncSessionLocal", no_session)
+    principal = Principal(uuid4(), "user@example.com")
+    store_principal(principal)
+
+    assert asyncio.run(dependency.get_current_user(request_for(str(principal.user_id)))) == principal
+
+
+@pytest.mark.parametrize("user_id", [None, "not-a-uuid"])
+def test_missing_or_malformed_session_is_401(user_id):
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(dependency.get_current_user(request_for(user_id)))
+    assert error.value.status_code == 401
+
+
+class UserRowSession:
+    """Stub AsyncSessionLocal() whose one query returns the given user row."""
+
+    def __init__(self, row):
+        self.row = row
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, statement):
+        return SimpleNamespace(one_or_none=lambda: self.row)
+
+
+def test_invalidated_principal_is_re_read(monkeypatch):
+    published = []
+
+    async def publish(user_id):
+        published.append(user_id)
+
+    monkeypatch.setattr(cache, "publish_invalidation", publish)
+    principal = Principal(uuid4(), "old@example.com")
+    store_principal(principal)
+
+    asyncio.run(invalidate_principal(principal.user_id))
+    assert published == [principal.user_id]
+
+    session = UserRowSession(SimpleNamespace(user_id=principal.user_id, user_email="new@example.com"))
+    monkeypatch.setattr(dependency, "AsyncSessionLocal", session)
+    current = asyncio.run(dependency.get_current_user(request_for(str(principal.user_id))))
+    assert current == Principal(principal.user_id, "new@example.com")
+    assert session.opened == 1
+
+
+def test_notification_from_another_worker_drops_the_entry(monkeypatch):
+    principal = Principal(uuid4(), "user@example.com")
+    store_principal(principal)
+
+    cache.on_invalidation(None, 0, cache.INVALIDATION_CHANNEL, str(principal.user_id))
+    assert cache.get_cached_principal(principal.user_id) is None
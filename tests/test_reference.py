@@ -0,0 +1,88 @@
+from src.dashboard.reference import evaluate_biomarkers, parse_number, parse_range, resolve_marker
+
+
+def evaluate_one(**biomarker):
+    return evaluate_biomarkers([biomarker])[0]
+
+
+def test_comma_followed_by_three_digits_is_thousands_separator():
+    assert parse_number("150,000") == 150000.0
+    assert parse_number("7,200 cells/cumm") == 7200.0
+    assert parse_number("1,234.5") == 1234.5
+
+
+def test_other_commas_are_decimal_commas():
+    assert parse_number("7,2") == 7.2
+    assert parse_number("13,45 g/dL") == 13.45
+
+
+def test_ambiguous_comma_is_rejected():
+    assert parse_number("1234,567") is None
+
+
+def test_range_with_thousands_separators():
+    assert parse_range("150,000 - 450,000") == (150000.0, 450000.0)
+    assert parse_range("4,0-11,0") == (4.0, 11.0)
+    assert parse_range("<200") == (None, 200.0)
+
+
+def test_indian_cbc_counts_are_converted_not_critical():
+    platelets = evaluate_one(testName="Platelet Count", currentValue="150,000", unit="/cumm")
+    assert platelets["currentValue"] == 150.0
+    assert platelets["unit"] == "10^3/µL"
+    assert platelets["status"] == "Normal"
+
+    wbc = evaluate_one(testName="Total WBC", currentValue="7,200", unit="cells/cumm")
+    assert wbc["currentValue"] == 7.2
+    assert wbc["status"] == "Normal"
+
+
+def test_names_containing_another_alias_resolve_to_their_own_marker():
+    assert resolve_marker("Mean Corpuscular Hemoglobin") == ("mch", True)
+    assert resolve_marker("Non-HDL Cholesterol") == ("non_hdl", True)
+    assert resolve_marker("Cholesterol/HDL Ratio") == ("cholesterol_hdl_ratio", False)
+    assert resolve_marker("Hemoglobin (Hb)") == ("hemoglobin", True)
+
+
+def test_mch_within_printed_range_is_normal():
+    mch = evaluate_one(testName="Mean Corpuscular Hemoglobin", currentValue="29", unit="pg", referenceRange="27-32")
+    assert mch["markerCode"] == "mch"
+    assert mch["status"] == "Normal"
+
+
+def test_uncertain_name_match_never_applies_critical_limits():
+    hb = evaluate_one(testName="Haemoglobin in blood", currentValue="5", unit="g/dL", status="Low")
+    assert hb["markerCode"] == "hemoglobin"
+    assert hb["status"] == "Low"
+
+
+def test_known_unit_alias_is_converted():
+    hb = evaluate_one(testName="Hemoglobin", currentValue="145", unit="gm/L")
+    assert hb["currentValue"] == 14.5
+    assert hb["status"] == "Normal"
+
+
+def test_unknown_unit_keeps_incoming_status():
+    hb = evaluate_one(testName="Hemoglobin", currentValue="145", unit="mg/mL", status="Normal")
+    assert hb["status"] == "Normal"
+    assert hb["referenceMin"] is None and hb["referenceMax"] is None
+
+
+def test_unknown_unit_uses_printed_range_in_same_unit():
+    hb = evaluate_one(testName="Hemoglobin", currentValue="165", unit="mg/mL", referenceRange="120-160")
+    assert hb["status"] == "High"
+
+
+def test_unitless_value_outside_canonical_magnitude_gets_no_default_range():
+    platelets = evaluate_one(testName="Platelet Count", currentValue="250000", unit="", status="Normal")
+    assert platelets["status"] == "Normal"
+    assert platelets["referenceMin"] is None and platelets["referenceMax"] is None
+
+
+def test_unitless_value_in_canonical_magnitude_uses_default_range():
+    assert evaluate_one(testName="Hemoglobin", currentValue="10.2", unit="")["status"] == "Low"
+
+
+def test_up_to_prefix_is_case_insensitive():
+    assert parse_range("Up to 200") == (None, 200.0)
+    assert parse_range("UPTO 40 U/L") == (None, 40.0)
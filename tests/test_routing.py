@@ -0,0 +1,34 @@
+import pytest
+from src.chat.routing import classify_question
+
+
+@pytest.mark.parametrize("question", [
+    "what is HbA1c",
+    "What does mg mean?",
+    "what is vitamin d",
+    "what’s an MCV",
+    "define hematocrit",
+    "full form of TSH",
+])
+def test_bare_term_definitions_are_fast(question):
+    assert classify_question(question) == ("fast", "definition")
+
+
+@pytest.mark.parametrize("question", ["hi", "Thanks!", "ok thanks", "good morning", "thank you so much."])
+def test_whole_message_small_talk_is_fast(question):
+    assert classify_question(question) == ("fast", "small_talk")
+
+
+@pytest.mark.parametrize("question", [
+    "what is wrong",
+    "what are the abnormal values",
+    "what is the prognosis",
+    "what does this mean",
+    "what is this report about",
+    "ok so is this bad",
+    "thanks, what should I do next",
+    "what is my ldl",
+    "what next",
+])
+def test_report_questions_stay_on_the_default_model(question):
+    assert classify_question(question)[0] == "default"
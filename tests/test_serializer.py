@@ -0,0 +1,51 @@
+import asyncio
+import pytest
+from src.llm import serializer
+
+
+@pytest.fixture(autouse=True)
+def fresh_encodings(monkeypatch):
+    monkeypatch.setattr(serializer, "_encodings", {})
+    monkeypatch.setattr(serializer, "_failed_at", {})
+    monkeypatch.setattr(serializer, "_loading", {})
+
+
+class FakeEncoding:
+    def encode(self, text):
+        return text.split()
+
+
+def test_failed_load_is_not_cached(monkeypatch):
+    def unavailable(model):
+        raise OSError("download failed")
+
+    monkeypatch.setattr(serializer.tiktoken, "encoding_for_model", unavailable)
+    assert serializer.get_encoding("gpt-4o") is None
+    assert serializer.count_tokens("one two three") == 4
+
+    monkeypatch.setattr(serializer.tiktoken, "encoding_for_model", lambda model: FakeEncoding())
+    assert serializer.count_tokens("one two three") == 3
+
+
+def test_event_loop_never_loads_inline(monkeypatch):
+    calls = []
+
+    def load(model):
+        calls.append(model)
+        return FakeEncoding()
+
+    monkeypatch.setattr(serializer.tiktoken, "encoding_for_model", load)
+
+    async def run():
+        assert serializer.get_encoding("gpt-4o") is None
+        await asyncio.gather(*serializer._loading.values())
+        return serializer.get_encoding("gpt-4o")
+
+    assert isinstance(asyncio.run(run()), FakeEncoding)
+    assert calls == ["gpt-4o"]
+
+
+def test_load_encodings_at_startup(monkeypatch):
+    monkeypatch.setattr(serializer.tiktoken, "encoding_for_model", lambda model: FakeEncoding())
+    asyncio.run(serializer.load_encodings(["gpt-4o", "gpt-4o-mini", "gpt-4o"]))
+    assert set(serializer._encodings) == {"gpt-4o", "gpt-4o-mini"}
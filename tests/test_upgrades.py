@@ -0,0 +1,30 @@
+import asyncio
+from types import SimpleNamespace
+from database.upgrades import SCHEMA_UPGRADES, apply_schema_upgrades
+
+
+class RecordingConnection:
+    def __init__(self, applied):
+        self.applied = applied
+        self.executed = []
+
+    async def execute(self, statement, params=None):
+        self.executed.append((" ".join(str(statement).split()), params))
+        return SimpleNamespace(scalars=lambda: list(self.applied))
+
+
+def test_only_unrecorded_upgrades_run_in_order():
+    names = [name for name, _ in SCHEMA_UPGRADES]
+    conn = RecordingConnection(applied=names[:2])
+    asyncio.run(apply_schema_upgrades(conn))
+
+    recorded = [params["name"] for sql, params in conn.executed if sql.startswith("INSERT INTO schema_upgrade")]
+    assert recorded == names[2:]
+    ran = [sql for sql, _ in conn.executed]
+    assert not any("ix_message_chat_created_id" in sql for sql in ran)
+    assert any("ix_chat_file_id" in sql for sql in ran)
+
+
+def test_upgrade_names_are_unique():
+    names = [name for name, _ in SCHEMA_UPGRADES]
+    assert len(names) == len(set(names))